@@ -5,7 +5,7 @@ import time
 import uuid
 from collections import OrderedDict
 from datetime import datetime
-from typing import Any, Dict, Optional, Union, List
+from typing import Any, Dict, Iterable, Optional, Union, List
 
 import boto3  # type: ignore
 import requests  # type: ignore
@@ -63,6 +63,82 @@ def push_data_to_bucket(
     logger.info(f"Data pushed to bucket: s3://{bucket}/{key}")
 
 
+# Minimal size of S3 multipart upload part, except the last one, is 5MB
+S3_MULTIPART_PART_SIZE = 8 * 1024 * 1024
+
+
+def push_stream_to_bucket(
+    chunks: Iterable[bytes],
+    key: str,
+    bucket: str,
+    metadata: Dict[str, Any] = {},
+    content_type: str = "application/json",
+    content_encoding: Optional[str] = None,
+    part_size: int = S3_MULTIPART_PART_SIZE,
+) -> None:
+    """
+    Uploads chunks of data to S3 with multipart upload, only one part is kept in memory.
+
+    Data smaller than one part is uploaded with a single put.
+    """
+    s3 = boto3.client("s3")
+    object_kwargs: Dict[str, Any] = {
+        "Bucket": bucket,
+        "Key": key,
+        "ContentType": content_type,
+        "Metadata": metadata,
+    }
+    if content_encoding is not None:
+        object_kwargs["ContentEncoding"] = content_encoding
+
+    buffer = bytearray()
+    upload_id: Optional[str] = None
+    parts: List[Dict[str, Any]] = []
+    try:
+        for chunk in chunks:
+            buffer.extend(chunk)
+            if len(buffer) < part_size:
+                continue
+            if upload_id is None:
+                upload_id = s3.create_multipart_upload(**object_kwargs)["UploadId"]
+            response = s3.upload_part(
+                Bucket=bucket,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=len(parts) + 1,
+                Body=bytes(buffer),
+            )
+            parts.append({"ETag": response["ETag"], "PartNumber": len(parts) + 1})
+            buffer = bytearray()
+
+        if upload_id is None:
+            s3.put_object(Body=bytes(buffer), **object_kwargs)
+        else:
+            if len(buffer) > 0:
+                response = s3.upload_part(
+                    Bucket=bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=len(parts) + 1,
+                    Body=bytes(buffer),
+                )
+                parts.append({"ETag": response["ETag"], "PartNumber": len(parts) + 1})
+            s3.complete_multipart_upload(
+                Bucket=bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+    except Exception:
+        if upload_id is not None:
+            s3.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+
+    logger.info(
+        f"Data pushed to bucket: s3://{bucket}/{key} in {max(len(parts), 1)} parts"
+    )
+
+
 def generate_s3_access_links(
     method_name: str,
     bucket: str,
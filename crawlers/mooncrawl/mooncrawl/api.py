@@ -6,12 +6,13 @@ import logging
 import time
 from cgi import test
 from datetime import timedelta
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 
 import boto3  # type: ignore
 from bugout.data import BugoutJournalEntity, BugoutResource
-from fastapi import BackgroundTasks, FastAPI
+from fastapi import BackgroundTasks, FastAPI, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
 from . import data
@@ -24,6 +25,7 @@ from .actions import (
     resolve_table_names,
     QueryTextClauseException,
 )
+from .jobs import JobExecutor, JobQueueFull, create_jobs_store
 from .middleware import MoonstreamHTTPException
 from .settings import (
     BUGOUT_RESOURCE_TYPE_ENTITY_SUBSCRIPTION,
@@ -68,6 +70,18 @@ app.add_middleware(
 )
 
 
+# Executor of query and stats jobs, worker processes are started on first job.
+# Executors of API workers share limits and deduplication through Redis if it is set
+job_executor = JobExecutor(store=create_jobs_store())
+
+MAX_JOB_STATUS_WAIT_SECONDS = 60
+
+
+@app.on_event("shutdown")
+async def shutdown_handler() -> None:
+    job_executor.shutdown()
+
+
 @app.get("/ping", response_model=data.PingResponse)
 async def ping_handler() -> data.PingResponse:
     """
@@ -92,10 +106,32 @@ async def now_handler() -> data.NowResponse:
     return data.NowResponse(epoch_time=time.time())
 
 
+@app.get("/jobs/stats", tags=["jobs"], response_model=data.JobsStatsResponse)
+async def jobs_stats_handler() -> data.JobsStatsResponse:
+    """
+    Queue depth and latency of background jobs.
+    """
+    return job_executor.stats()
+
+
+@app.get("/jobs/{job_id}/status", tags=["jobs"], response_model=data.JobStatusResponse)
+async def job_status_handler(
+    job_id: str, wait: float = Query(0, ge=0, le=MAX_JOB_STATUS_WAIT_SECONDS)
+) -> data.JobStatusResponse:
+    """
+    Status of background job. With wait, responds when job is finished or after
+    wait seconds, whichever comes first.
+    """
+    job_status = await run_in_threadpool(job_executor.wait, job_id, wait)
+    if job_status is None:
+        raise MoonstreamHTTPException(status_code=404, detail="Job not found")
+
+    return job_status
+
+
 @app.post("/jobs/stats_update", tags=["jobs"])
 async def status_handler(
     stats_update: data.StatsUpdateRequest,
-    background_tasks: BackgroundTasks,
 ):
     """
     Update dashboard endpoint create are tasks for update.
@@ -143,13 +179,17 @@ async def status_handler(
         subscription_by_id[str(subscription.id)] = subscription
 
     try:
-        background_tasks.add_task(
+        job_executor.submit(
             dashboard.stats_generate_api_task,
+            job_key=f"stats:{stats_update.dashboard_id}:{','.join(sorted(stats_update.timescales))}",
+            job_customer=stats_update.user_id,
             timescales=stats_update.timescales,
             dashboard=dashboard_resource,
             subscription_by_id=subscription_by_id,
         )
-
+    except JobQueueFull as e:
+        logger.warning(f"Could not queue /jobs/stats_update task: {e}")
+        raise MoonstreamHTTPException(status_code=503, detail="Too many jobs in queue")
     except Exception as e:
         logger.error(
             f"Unhandled /jobs/stats_update start background task exception, error: {e}"
@@ -263,20 +303,48 @@ async def queries_data_update_handler(
     key = f"{MOONSTREAM_S3_QUERIES_BUCKET_PREFIX}/queries/{query_id}/{params_hash}/data.{request_data.file_type}"
 
     try:
-        background_tasks.add_task(
-            queries.data_generate,
-            query_id=f"{query_id}",
-            file_type=request_data.file_type,
+        is_up_to_date = await run_in_threadpool(
+            queries.is_result_up_to_date,
             bucket=bucket,
             key=key,
             query=query,
-            params=passed_params,
-            params_hash=params_hash,
             customer_id=request_data.customer_id,
             instance_id=request_data.instance_id,
             blockchain_table=tables["labels_table"],
-            # Add any additional parameters needed for the task
         )
+    except Exception as e:
+        logger.warning(
+            f"Could not check query result for query id: {query_id}, error: {e}"
+        )
+        is_up_to_date = False
+
+    job_id: Optional[str] = None
+    try:
+        if is_up_to_date:
+            logger.info(
+                f"Query result is up to date, skip execution for query id: {query_id}"
+            )
+            background_tasks.add_task(queries.refresh_result, bucket=bucket, key=key)
+        else:
+            job_id = job_executor.submit(
+                queries.data_generate,
+                job_key=f"query:{query_id}:{params_hash}:{request_data.file_type}",
+                job_customer=request_data.customer_id,
+                query_id=f"{query_id}",
+                file_type=request_data.file_type,
+                bucket=bucket,
+                key=key,
+                query=query,
+                params=passed_params,
+                params_hash=params_hash,
+                customer_id=request_data.customer_id,
+                instance_id=request_data.instance_id,
+                blockchain_table=tables["labels_table"],
+                # Add any additional parameters needed for the task
+            )
+    except JobQueueFull as e:
+        logger.warning(f"Could not queue query job for query id: {query_id}: {e}")
+        raise MoonstreamHTTPException(status_code=503, detail="Too many jobs in queue")
     except Exception as e:
         logger.error(f"Unhandled query execute exception, error: {e}")
         raise MoonstreamHTTPException(status_code=500)
@@ -289,4 +357,4 @@ async def queries_data_update_handler(
         http_method="GET",
     )
 
-    return {"url": stats_presigned_url}
+    return {"url": stats_presigned_url, "up_to_date": is_up_to_date, "job_id": job_id}
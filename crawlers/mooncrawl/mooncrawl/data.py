@@ -45,6 +45,39 @@ class NowResponse(BaseModel):
     epoch_time: float
 
 
+class JobStatusResponse(BaseModel):
+    """
+    Schema for responses on /jobs/{job_id}/status endpoint
+    """
+
+    job_id: str
+    status: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+
+class JobsStatsResponse(BaseModel):
+    """
+    Schema for responses on /jobs/stats endpoint, queue depth and latency of
+    background jobs
+    """
+
+    max_workers: int
+    max_queue_size: int
+    running: int
+    queued: int
+    queued_by_customer: Dict[str, int] = Field(default_factory=dict)
+    succeeded: int
+    failed: int
+    deduplicated: int
+    rejected: int
+    average_wait_seconds: float
+    average_run_seconds: float
+    oldest_queued_seconds: float
+
+
 class QueryDataUpdate(BaseModel):
     file_type: str
     query: str
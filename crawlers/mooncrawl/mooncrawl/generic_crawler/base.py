@@ -23,7 +23,9 @@ from web3 import Web3
 from web3._utils.events import get_event_data
 
 from ..moonworm_crawler.db import add_events_to_session, commit_session
-from ..moonworm_crawler.event_crawler import Event, get_block_timestamp
+from ..labels_copy import copy_labels, label_to_record
+from ..moonworm_crawler.block_timestamps import BlockTimestampsResolver
+from ..moonworm_crawler.event_crawler import Event
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -102,7 +104,9 @@ def add_function_calls_with_gas_price_to_session(
     ]
 
     logger.info(f"Saving {len(labels_to_save)} labels to session")
-    db_session.add_all(labels_to_save)
+    copy_labels(
+        db_session, label_model, [label_to_record(label) for label in labels_to_save]
+    )
 
 
 def _transform_to_w3_tx(
@@ -143,7 +147,7 @@ def process_transaction(
     contract: Any,
     secondary_abi: List[Dict[str, Any]],
     transaction: Dict[str, Any],
-    blocks_cache: Dict[int, int],
+    blocks_cache: BlockTimestampsResolver,
 ):
     try:
         raw_function_call = contract.decode_function_input(transaction["input"])
@@ -156,13 +160,10 @@ def process_transaction(
         function_args = "unknown"
 
     transaction_reciept = web3.eth.getTransactionReceipt(transaction["hash"])
-    block_timestamp = get_block_timestamp(
+    block_timestamp = blocks_cache.get_block_timestamp(
         db_session,
         web3,
-        blockchain_type,
         transaction["blockNumber"],
-        blocks_cache,
-        100,
     )
 
     function_call = ExtededFunctionCall(
@@ -340,7 +341,7 @@ def crawl(
 ) -> None:
     current_block = from_block
 
-    db_blocks_cache: Dict[int, int] = {}
+    db_blocks_cache = BlockTimestampsResolver(blockchain_type)
     contract = web3.eth.contract(abi=abi)
     # TODO(yhtiyar): load checkpoint
     events_abi = [item for item in abi if item["type"] == "event"]  # type: ignore
@@ -366,15 +367,13 @@ def crawl(
                 batch_end,
                 addresses,
             )
+            block_timestamps = db_blocks_cache.resolve(
+                db_session,
+                web3,
+                [raw_event["blockNumber"] for raw_event in raw_events],
+            )
             for raw_event in raw_events:
-                raw_event["blockTimestamp"] = get_block_timestamp(
-                    db_session,
-                    web3,
-                    blockchain_type,
-                    raw_event["blockNumber"],
-                    blocks_cache=db_blocks_cache,
-                    max_blocks_batch=1000,
-                )
+                raw_event["blockTimestamp"] = block_timestamps[raw_event["blockNumber"]]
                 event = _processEvent(raw_event)
                 events.append(event)
 
@@ -0,0 +1,737 @@
+"""
+Executor of crawlers API background jobs.
+
+Jobs run in a bounded pool of worker processes, so heavy queries do not compete
+with request handling of the API process. Queued jobs wait in per customer
+queues served round robin, jobs with the same key are deduplicated while they
+are queued or running.
+
+Every API worker process has its own executor. With RedisJobsStore the queue
+bound, running jobs bound, deduplication and stats are shared by all of them.
+"""
+
+import logging
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from . import data
+from .settings import (
+    MOONSTREAM_JOBS_HISTORY_SECONDS,
+    MOONSTREAM_JOBS_MAX_QUEUE_SIZE,
+    MOONSTREAM_JOBS_MAX_WORKERS,
+    MOONSTREAM_REDIS_PASSWORD,
+    MOONSTREAM_REDIS_URL,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+DEFAULT_CUSTOMER = "moonstream"
+
+# Active jobs are heartbeated in Redis, jobs of stopped API workers are dropped
+# from shared queue and running set when heartbeat is older than stale seconds
+JOBS_HEARTBEAT_SECONDS = 5
+JOBS_STALE_SECONDS = 30
+# Retry period of dispatcher waiting for a free global slot
+JOBS_SLOT_RETRY_SECONDS = 1
+# Poll period of status of job run by another API worker
+JOBS_STATUS_POLL_SECONDS = 1
+
+
+class JobQueueFull(Exception):
+    """
+    Raised when job is submitted to executor with full queue.
+    """
+
+
+@dataclass
+class Job:
+    func: Callable[..., Any]
+    args: Tuple[Any, ...]
+    kwargs: Dict[str, Any]
+    customer: str
+    key: Optional[str] = None
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    status: str = JOB_QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+    def status_response(self) -> data.JobStatusResponse:
+        return data.JobStatusResponse(
+            job_id=self.id,
+            status=self.status,
+            created_at=self.created_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            error=self.error,
+        )
+
+
+# Returns ["queued", job_id], ["deduplicated", job_id of existing job] or ["rejected", ""]
+ADD_JOB_SCRIPT = """
+if ARGV[6] == "1" then
+    local existing = redis.call("GET", KEYS[2])
+    if existing then
+        return {"deduplicated", existing}
+    end
+end
+redis.call("ZREMRANGEBYSCORE", KEYS[1], "-inf", ARGV[3])
+if redis.call("ZCARD", KEYS[1]) >= tonumber(ARGV[4]) then
+    return {"rejected", ""}
+end
+redis.call("ZADD", KEYS[1], ARGV[2], ARGV[1])
+if ARGV[6] == "1" then
+    redis.call("SET", KEYS[2], ARGV[1], "EX", ARGV[5])
+end
+return {"queued", ARGV[1]}
+"""
+
+# Moves job from queued to running set if there is a free slot, returns 1 or 0
+ACQUIRE_SLOT_SCRIPT = """
+redis.call("ZREMRANGEBYSCORE", KEYS[1], "-inf", ARGV[3])
+if redis.call("ZCARD", KEYS[1]) >= tonumber(ARGV[4]) then
+    return 0
+end
+redis.call("ZREM", KEYS[2], ARGV[1])
+redis.call("ZADD", KEYS[1], ARGV[2], ARGV[1])
+return 1
+"""
+
+RELEASE_JOB_SCRIPT = """
+redis.call("ZREM", KEYS[1], ARGV[1])
+redis.call("ZREM", KEYS[2], ARGV[1])
+if ARGV[2] == "1" and redis.call("GET", KEYS[3]) == ARGV[1] then
+    redis.call("DEL", KEYS[3])
+end
+return 1
+"""
+
+
+def create_redis_client() -> Optional[Any]:
+    """
+    Returns Redis client if MOONSTREAM_REDIS_URL is set and redis package is installed.
+    """
+    if not MOONSTREAM_REDIS_URL:
+        return None
+    try:
+        import redis  # type: ignore
+    except ImportError:
+        logger.warning("MOONSTREAM_REDIS_URL is set, but redis is not installed")
+        return None
+
+    pool = redis.ConnectionPool.from_url(
+        MOONSTREAM_REDIS_URL,
+        password=MOONSTREAM_REDIS_PASSWORD,
+        decode_responses=True,
+        socket_timeout=5,
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+class RedisJobsStore:
+    """
+    Jobs state shared by executors of all API worker processes.
+
+    Queued and running jobs are sorted sets scored by last heartbeat, job keys
+    map to ids of active jobs and statuses of jobs are hashes kept for
+    history_seconds after job is finished.
+    """
+
+    def __init__(
+        self,
+        redis_client: Any,
+        prefix: str = "mooncrawl:jobs",
+        history_seconds: int = MOONSTREAM_JOBS_HISTORY_SECONDS,
+    ) -> None:
+        self.redis_client = redis_client
+        self.prefix = prefix
+        self.history_seconds = history_seconds
+
+        self._add_job = redis_client.register_script(ADD_JOB_SCRIPT)
+        self._acquire_slot = redis_client.register_script(ACQUIRE_SLOT_SCRIPT)
+        self._release_job = redis_client.register_script(RELEASE_JOB_SCRIPT)
+
+    def _name(self, *parts: str) -> str:
+        return ":".join([self.prefix, *parts])
+
+    @property
+    def _queued_name(self) -> str:
+        return self._name("queued")
+
+    @property
+    def _running_name(self) -> str:
+        return self._name("running")
+
+    @property
+    def _stats_name(self) -> str:
+        return self._name("stats")
+
+    def _job_name(self, job_id: str) -> str:
+        return self._name("job", job_id)
+
+    def _key_name(self, key: Optional[str]) -> str:
+        return self._name("key", key if key is not None else "")
+
+    def add(self, job: Job, max_queue_size: int) -> Tuple[str, str]:
+        """
+        Queues job globally. Returns ("queued", job.id), ("deduplicated", id of
+        active job with the same key) or ("rejected", "").
+        """
+        now = time.time()
+        result, job_id = self._add_job(
+            keys=[self._queued_name, self._key_name(job.key)],
+            args=[
+                job.id,
+                now,
+                now - JOBS_STALE_SECONDS,
+                max_queue_size,
+                JOBS_STALE_SECONDS,
+                "1" if job.key is not None else "0",
+            ],
+        )
+        if result == "queued":
+            pipeline = self.redis_client.pipeline()
+            pipeline.hset(
+                self._job_name(job.id),
+                mapping={
+                    "status": job.status,
+                    "customer": job.customer,
+                    "created_at": job.created_at,
+                },
+            )
+            pipeline.expire(self._job_name(job.id), self.history_seconds)
+            pipeline.execute()
+        else:
+            self.count(result)
+        return result, job_id
+
+    def count(self, counter: str) -> None:
+        self.redis_client.hincrby(self._stats_name, counter, 1)
+
+    def acquire(self, job: Job, max_running: int) -> bool:
+        """
+        Takes one of max_running global slots for the job.
+        """
+        now = time.time()
+        return bool(
+            self._acquire_slot(
+                keys=[self._running_name, self._queued_name],
+                args=[job.id, now, now - JOBS_STALE_SECONDS, max_running],
+            )
+        )
+
+    def started(self, job: Job) -> None:
+        assert job.started_at is not None
+        pipeline = self.redis_client.pipeline()
+        pipeline.hset(
+            self._job_name(job.id),
+            mapping={"status": job.status, "started_at": job.started_at},
+        )
+        pipeline.hincrby(self._stats_name, "started", 1)
+        pipeline.hincrbyfloat(
+            self._stats_name, "wait_seconds_total", job.started_at - job.created_at
+        )
+        pipeline.execute()
+
+    def finished(self, job: Job) -> None:
+        assert job.finished_at is not None
+        fields: Dict[str, Any] = {"status": job.status, "finished_at": job.finished_at}
+        if job.error is not None:
+            fields["error"] = job.error
+        pipeline = self.redis_client.pipeline()
+        pipeline.hset(self._job_name(job.id), mapping=fields)
+        pipeline.expire(self._job_name(job.id), self.history_seconds)
+        pipeline.hincrby(self._stats_name, job.status, 1)
+        if job.started_at is not None:
+            pipeline.hincrbyfloat(
+                self._stats_name, "run_seconds_total", job.finished_at - job.started_at
+            )
+        pipeline.execute()
+        # Status is written first, so job is never seen active but out of sets
+        self._release_job(
+            keys=[self._running_name, self._queued_name, self._key_name(job.key)],
+            args=[job.id, "1" if job.key is not None else "0"],
+        )
+
+    def get(self, job_id: str) -> Optional[data.JobStatusResponse]:
+        """
+        Returns status of job run by any API worker, None if job is unknown.
+        Active job of stopped API worker is reported as failed.
+        """
+        pipeline = self.redis_client.pipeline()
+        pipeline.hgetall(self._job_name(job_id))
+        pipeline.zscore(self._queued_name, job_id)
+        pipeline.zscore(self._running_name, job_id)
+        fields, queued_score, running_score = pipeline.execute()
+        if not fields:
+            return None
+
+        status = fields.get("status", JOB_QUEUED)
+        error = fields.get("error")
+        if status in (JOB_QUEUED, JOB_RUNNING):
+            stale_before = time.time() - JOBS_STALE_SECONDS
+            if all(
+                score is None or score < stale_before
+                for score in (queued_score, running_score)
+            ):
+                status = JOB_FAILED
+                error = "Job was lost, API worker running it stopped"
+
+        return data.JobStatusResponse(
+            job_id=job_id,
+            status=status,
+            created_at=float(fields.get("created_at", 0)),
+            started_at=(
+                float(fields["started_at"]) if "started_at" in fields else None
+            ),
+            finished_at=(
+                float(fields["finished_at"]) if "finished_at" in fields else None
+            ),
+            error=error,
+        )
+
+    def heartbeat(self, jobs: List[Job]) -> None:
+        """
+        Keeps active jobs of this process from being dropped as stale.
+        """
+        now = time.time()
+        pipeline = self.redis_client.pipeline()
+        for job in jobs:
+            if job.status == JOB_QUEUED:
+                pipeline.zadd(self._queued_name, {job.id: now}, xx=True)
+            else:
+                pipeline.zadd(self._running_name, {job.id: now}, xx=True)
+            if job.key is not None:
+                pipeline.expire(self._key_name(job.key), JOBS_STALE_SECONDS)
+            pipeline.expire(self._job_name(job.id), self.history_seconds)
+        pipeline.execute()
+
+    def stats(self, max_workers: int, max_queue_size: int) -> data.JobsStatsResponse:
+        now = time.time()
+        stale_before = now - JOBS_STALE_SECONDS
+        pipeline = self.redis_client.pipeline()
+        pipeline.zremrangebyscore(self._queued_name, "-inf", stale_before)
+        pipeline.zremrangebyscore(self._running_name, "-inf", stale_before)
+        pipeline.zrange(self._queued_name, 0, -1)
+        pipeline.zcard(self._running_name)
+        pipeline.hgetall(self._stats_name)
+        _, _, queued_ids, running, counters = pipeline.execute()
+
+        pipeline = self.redis_client.pipeline()
+        for job_id in queued_ids:
+            pipeline.hmget(self._job_name(job_id), "customer", "created_at")
+        queued_jobs = pipeline.execute()
+
+        queued_by_customer: Dict[str, int] = {}
+        oldest_queued_seconds = 0.0
+        for customer, created_at in queued_jobs:
+            if customer is None:
+                continue
+            queued_by_customer[customer] = queued_by_customer.get(customer, 0) + 1
+            oldest_queued_seconds = max(oldest_queued_seconds, now - float(created_at))
+
+        succeeded = int(counters.get(JOB_SUCCEEDED, 0))
+        failed = int(counters.get(JOB_FAILED, 0))
+        started = int(counters.get("started", 0))
+        finished = succeeded + failed
+        return data.JobsStatsResponse(
+            max_workers=max_workers,
+            max_queue_size=max_queue_size,
+            running=running,
+            queued=len(queued_ids),
+            queued_by_customer=queued_by_customer,
+            succeeded=succeeded,
+            failed=failed,
+            deduplicated=int(counters.get("deduplicated", 0)),
+            rejected=int(counters.get("rejected", 0)),
+            average_wait_seconds=(
+                float(counters.get("wait_seconds_total", 0)) / started
+                if started > 0
+                else 0.0
+            ),
+            average_run_seconds=(
+                float(counters.get("run_seconds_total", 0)) / finished
+                if finished > 0
+                else 0.0
+            ),
+            oldest_queued_seconds=oldest_queued_seconds,
+        )
+
+
+def create_jobs_store() -> Optional[RedisJobsStore]:
+    redis_client = create_redis_client()
+    if redis_client is None:
+        return None
+    return RedisJobsStore(redis_client)
+
+
+class JobExecutor:
+    """
+    Runs jobs in worker processes, at most max_workers at once.
+
+    With store, max_workers and max_queue_size bound jobs of all executors
+    sharing the store, otherwise jobs of this executor only.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = MOONSTREAM_JOBS_MAX_WORKERS,
+        max_queue_size: int = MOONSTREAM_JOBS_MAX_QUEUE_SIZE,
+        finished_history_size: int = 1000,
+        store: Optional[RedisJobsStore] = None,
+    ) -> None:
+        assert max_workers > 0, "max_workers must be greater than 0"
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.finished_history_size = finished_history_size
+        self.store = store
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._condition = threading.Condition()
+        self._closed = False
+
+        # Customer -> queued jobs, customers are served in order of this dict
+        self._queues: "OrderedDict[str, Deque[Job]]" = OrderedDict()
+        self._queued = 0
+        self._running = 0
+        self._active_jobs: Dict[str, Job] = {}
+        self._active_jobs_by_key: Dict[str, Job] = {}
+        self._finished_jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+        self._succeeded = 0
+        self._failed = 0
+        self._deduplicated = 0
+        self._rejected = 0
+        self._wait_seconds_total = 0.0
+        self._run_seconds_total = 0.0
+
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned workers do not inherit database connections of API process
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def submit(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        job_key: Optional[str] = None,
+        job_customer: Optional[str] = None,
+        **kwargs: Any,
+    ) -> str:
+        """
+        Queues job and returns its id, returns id of already queued or running
+        job if there is one with the same job_key. Jobs of different job_customer
+        are run in turns. Raises JobQueueFull if queue is full.
+        """
+        with self._condition:
+            if job_key is not None:
+                existing_job = self._active_jobs_by_key.get(job_key)
+                if existing_job is not None:
+                    self._deduplicated += 1
+                    self._store_count("deduplicated")
+                    return existing_job.id
+
+            if self._queued >= self.max_queue_size:
+                self._rejected += 1
+                self._store_count("rejected")
+                raise JobQueueFull(
+                    f"Jobs queue is full, {self._queued} jobs are waiting"
+                )
+
+            job = Job(
+                func=func,
+                args=args,
+                kwargs=kwargs,
+                customer=job_customer if job_customer is not None else DEFAULT_CUSTOMER,
+                key=job_key,
+            )
+            if self.store is None:
+                self._enqueue(job)
+                return job.id
+
+        try:
+            result, job_id = self.store.add(job, self.max_queue_size)
+        except Exception as e:
+            logger.error(f"Could not queue job in Redis, queueing locally: {e}")
+        else:
+            if result == "deduplicated":
+                return job_id
+            elif result == "rejected":
+                raise JobQueueFull("Jobs queue is full")
+
+        with self._condition:
+            self._enqueue(job)
+        return job.id
+
+    def _enqueue(self, job: Job) -> None:
+        """
+        Must be called with condition acquired.
+        """
+        if job.customer not in self._queues:
+            self._queues[job.customer] = deque()
+        self._queues[job.customer].append(job)
+        self._queued += 1
+        self._active_jobs[job.id] = job
+        if job.key is not None:
+            self._active_jobs_by_key[job.key] = job
+        self._condition.notify_all()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._condition:
+            job = self._active_jobs.get(job_id)
+            if job is None:
+                job = self._finished_jobs.get(job_id)
+            return job
+
+    def wait(self, job_id: str, timeout: float) -> Optional[data.JobStatusResponse]:
+        """
+        Waits up to timeout seconds until job is finished, returns status of the
+        job or None if job is unknown. Jobs of other API workers are looked up
+        in store.
+        """
+        with self._condition:
+            if job_id in self._active_jobs or job_id in self._finished_jobs:
+                self._condition.wait_for(
+                    lambda: job_id not in self._active_jobs, timeout=timeout
+                )
+                job = self._active_jobs.get(job_id)
+                if job is None:
+                    job = self._finished_jobs.get(job_id)
+                if job is not None:
+                    return job.status_response()
+
+        if self.store is None:
+            return None
+
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                status = self.store.get(job_id)
+            except Exception as e:
+                logger.warning(f"Could not get status of job {job_id} from Redis: {e}")
+                return None
+            if (
+                status is None
+                or status.status not in (JOB_QUEUED, JOB_RUNNING)
+                or time.monotonic() >= deadline
+            ):
+                return status
+            time.sleep(
+                max(min(JOBS_STATUS_POLL_SECONDS, deadline - time.monotonic()), 0)
+            )
+
+    def _peek_job(self) -> Job:
+        return next(iter(self._queues.values()))[0]
+
+    def _next_job(self) -> Job:
+        # Round robin, customer of taken job goes to the end of the line
+        customer, queue = self._queues.popitem(last=False)
+        job = queue.popleft()
+        if len(queue) > 0:
+            self._queues[customer] = queue
+        self._queued -= 1
+        return job
+
+    def _acquire_slot(self, job: Job) -> bool:
+        if self.store is None:
+            return True
+        try:
+            return self.store.acquire(job, self.max_workers)
+        except Exception as e:
+            logger.error(f"Could not acquire job slot in Redis, running job: {e}")
+            return True
+
+    def _heartbeat(self) -> None:
+        if self.store is None:
+            return
+        with self._condition:
+            jobs = list(self._active_jobs.values())
+        try:
+            self.store.heartbeat(jobs)
+        except Exception as e:
+            logger.warning(f"Could not heartbeat jobs in Redis: {e}")
+
+    def _dispatch(self) -> None:
+        last_heartbeat = 0.0
+        while True:
+            if time.monotonic() - last_heartbeat >= JOBS_HEARTBEAT_SECONDS:
+                self._heartbeat()
+                last_heartbeat = time.monotonic()
+
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._closed
+                    or (self._queued > 0 and self._running < self.max_workers),
+                    timeout=JOBS_HEARTBEAT_SECONDS,
+                )
+                if self._closed:
+                    return
+                if self._queued == 0 or self._running >= self.max_workers:
+                    continue
+                # Dispatcher is the only consumer, peeked job is taken next
+                job = self._peek_job()
+
+            if not self._acquire_slot(job):
+                time.sleep(JOBS_SLOT_RETRY_SECONDS)
+                continue
+
+            with self._condition:
+                job = self._next_job()
+                job.status = JOB_RUNNING
+                job.started_at = time.time()
+                self._wait_seconds_total += job.started_at - job.created_at
+                self._running += 1
+
+                future: Optional[Future] = None
+                try:
+                    pool = self._get_pool()
+                    future = pool.submit(job.func, *job.args, **job.kwargs)
+                except Exception as err:
+                    if isinstance(err, BrokenProcessPool):
+                        self._pool = None
+                    self._finish(job, err)
+
+            if future is None:
+                self._store_finished(job)
+                continue
+            self._store_started(job)
+            future.add_done_callback(
+                lambda future, job=job, pool=pool: self._on_done(  # type: ignore
+                    job, pool, future
+                )
+            )
+
+    def _on_done(self, job: Job, pool: ProcessPoolExecutor, future: Future) -> None:
+        error: Optional[BaseException] = None
+        if future.cancelled():
+            error = Exception("Job was cancelled")
+        else:
+            error = future.exception()
+        with self._condition:
+            if isinstance(error, BrokenProcessPool) and self._pool is pool:
+                # Worker died (e.g. killed by OOM), following jobs get new pool
+                logger.error(f"Jobs process pool is broken, recreating it: {error}")
+                pool.shutdown(wait=False)
+                self._pool = None
+            self._finish(job, error)
+        self._store_finished(job)
+
+    def _finish(self, job: Job, error: Optional[BaseException]) -> None:
+        """
+        Must be called with condition acquired.
+        """
+        job.finished_at = time.time()
+        if job.started_at is not None:
+            self._run_seconds_total += job.finished_at - job.started_at
+        if error is None:
+            job.status = JOB_SUCCEEDED
+            self._succeeded += 1
+        else:
+            job.status = JOB_FAILED
+            job.error = str(error)
+            self._failed += 1
+            logger.error(f"Job {job.id} with key {job.key} failed: {error}")
+
+        self._running -= 1
+        self._active_jobs.pop(job.id, None)
+        if job.key is not None and self._active_jobs_by_key.get(job.key) is job:
+            del self._active_jobs_by_key[job.key]
+        self._finished_jobs[job.id] = job
+        while len(self._finished_jobs) > self.finished_history_size:
+            self._finished_jobs.popitem(last=False)
+        self._condition.notify_all()
+
+    def _store_count(self, counter: str) -> None:
+        if self.store is None:
+            return
+        try:
+            self.store.count(counter)
+        except Exception as e:
+            logger.warning(f"Could not count {counter} jobs in Redis: {e}")
+
+    def _store_started(self, job: Job) -> None:
+        if self.store is None:
+            return
+        try:
+            self.store.started(job)
+        except Exception as e:
+            logger.warning(f"Could not save start of job {job.id} in Redis: {e}")
+
+    def _store_finished(self, job: Job) -> None:
+        if self.store is None:
+            return
+        try:
+            self.store.finished(job)
+        except Exception as e:
+            logger.warning(f"Could not save finish of job {job.id} in Redis: {e}")
+
+    def stats(self) -> data.JobsStatsResponse:
+        if self.store is not None:
+            try:
+                return self.store.stats(self.max_workers, self.max_queue_size)
+            except Exception as e:
+                logger.warning(f"Could not get jobs stats from Redis: {e}")
+
+        now = time.time()
+        with self._condition:
+            finished = self._succeeded + self._failed
+            started = finished + self._running
+            oldest_queued_seconds = max(
+                (
+                    now - queue[0].created_at
+                    for queue in self._queues.values()
+                    if len(queue) > 0
+                ),
+                default=0.0,
+            )
+            return data.JobsStatsResponse(
+                max_workers=self.max_workers,
+                max_queue_size=self.max_queue_size,
+                running=self._running,
+                queued=self._queued,
+                queued_by_customer={
+                    customer: len(queue) for customer, queue in self._queues.items()
+                },
+                succeeded=self._succeeded,
+                failed=self._failed,
+                deduplicated=self._deduplicated,
+                rejected=self._rejected,
+                average_wait_seconds=(
+                    self._wait_seconds_total / started if started > 0 else 0.0
+                ),
+                average_run_seconds=(
+                    self._run_seconds_total / finished if finished > 0 else 0.0
+                ),
+                oldest_queued_seconds=oldest_queued_seconds,
+            )
+
+    def shutdown(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            pool = self._pool
+            self._pool = None
+        if pool is not None:
+            pool.shutdown(wait=False)
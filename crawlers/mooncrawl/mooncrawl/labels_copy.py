@@ -0,0 +1,151 @@
+"""
+Bulk labels writer based on COPY FROM STDIN.
+
+Labels are streamed in CSV form into a temporary table and merged into the
+labels table with INSERT ... SELECT ... ON CONFLICT DO NOTHING, so it skips
+ORM objects construction and statement compilation for big batches.
+
+Works for both v2 and v3 label tables and runs in the transaction of the given session.
+"""
+
+import csv
+import io
+import json
+import logging
+import uuid
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import JSON
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+COPY_NULL = "\\N"
+DEFAULT_COPY_CHUNK_SIZE = 10000
+
+# Columns filled by database defaults
+SKIP_COLUMNS = {"created_at"}
+
+
+def label_to_record(label: Any) -> Dict[str, Any]:
+    """
+    Converts label model object to record for copy_labels.
+    """
+    return {
+        column.name: getattr(label, column.name)
+        for column in label.__table__.columns
+        if column.name not in SKIP_COLUMNS
+    }
+
+
+def _copy_value(value: Any, is_json: bool) -> str:
+    if value is None:
+        return COPY_NULL
+    if is_json:
+        return json.dumps(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        # bytea hex format
+        return "\\x" + bytes(value).hex()
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _records_to_csv(
+    records: List[Dict[str, Any]], columns: List[str], json_columns: List[bool]
+) -> io.StringIO:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for record in records:
+        if record.get("id") is None:
+            record["id"] = uuid.uuid4()
+        writer.writerow(
+            [
+                _copy_value(record.get(column), is_json)
+                for column, is_json in zip(columns, json_columns)
+            ]
+        )
+    buffer.seek(0)
+    return buffer
+
+
+def _chunks(
+    records: Iterable[Dict[str, Any]], chunk_size: int
+) -> Iterator[List[Dict[str, Any]]]:
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+
+def copy_labels(
+    db_session: Session,
+    label_model: Any,
+    records: Iterable[Dict[str, Any]],
+    chunk_size: int = DEFAULT_COPY_CHUNK_SIZE,
+    columns: Optional[List[str]] = None,
+) -> int:
+    """
+    Saves label records to label_model table with COPY FROM STDIN into
+    temporary table and INSERT ... SELECT ... ON CONFLICT DO NOTHING.
+
+    Records are dictionaries with label_model column names as keys, missing keys
+    are saved as NULL. If columns are not provided, keys of the first record are used.
+    Records are consumed lazily in chunks of chunk_size rows.
+
+    Returns number of inserted labels.
+    """
+    chunks = _chunks(records, chunk_size)
+    first_chunk = next(chunks, None)
+    if first_chunk is None:
+        return 0
+
+    table = label_model.__table__
+    if columns is None:
+        columns = [column for column in first_chunk[0].keys()]
+    if "id" not in columns and "id" in table.columns:
+        columns = ["id"] + columns
+    json_columns = [
+        isinstance(table.columns[column].type, (JSON, JSONB)) for column in columns
+    ]
+
+    preparer = db_session.get_bind().dialect.identifier_preparer
+    target_table = preparer.format_table(table)
+    temp_table = preparer.quote(f"tmp_{table.name}_{uuid.uuid4().hex[:8]}")
+    columns_list = ", ".join(preparer.quote(column) for column in columns)
+
+    dbapi_connection = db_session.connection().connection
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(
+            f"CREATE TEMP TABLE {temp_table} (LIKE {target_table} INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+
+        copied = 0
+        chunk: Optional[List[Dict[str, Any]]] = first_chunk
+        while chunk is not None:
+            cursor.copy_expert(
+                f"COPY {temp_table} ({columns_list}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                _records_to_csv(chunk, columns, json_columns),
+            )
+            copied += len(chunk)
+            chunk = next(chunks, None)
+
+        cursor.execute(
+            f"INSERT INTO {target_table} ({columns_list}) "
+            f"SELECT {columns_list} FROM {temp_table} ON CONFLICT DO NOTHING"
+        )
+        inserted = cursor.rowcount
+        cursor.execute(f"DROP TABLE {temp_table}")
+    finally:
+        cursor.close()
+
+    logger.info(f"Copied {copied} labels, inserted {inserted} into {table.name}")
+
+    return inserted
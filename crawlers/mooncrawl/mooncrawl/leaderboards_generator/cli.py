@@ -2,6 +2,7 @@ import argparse
 import json
 import logging
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, cast
 
 import requests  # type: ignore
@@ -26,163 +27,182 @@ green_c = "\033[92m"
 end_c = "\033[0m"
 
 
-def handle_leaderboards(args: argparse.Namespace) -> None:
+def process_leaderboard(
+    leaderboard: BugoutSearchResult, args: argparse.Namespace
+) -> None:
     """
-    Run the leaderboard generator.
-
-    Get query from journal and push results to leaderboard API.
+    Runs query of the leaderboard and pushes results to leaderboard API.
     """
-
-    ### get leaderboard journal
-
     leaderboard_push_batch_size = args.leaderboard_push_batch_size
 
     leaderboard_push_timeout_seconds = args.leaderboard_push_timeout_seconds
 
-    query = "#leaderboard #status:active"
+    logger.info(
+        f"Processing leaderboard: {leaderboard.title} with id: {[tag for tag in leaderboard.tags if tag.startswith('leaderboard_id')]}"
+    )
 
-    if args.leaderboard_id:  # way to run only one leaderboard without status:active
-        query = f"#leaderboard #leaderboard_id:{args.leaderboard_id}"
+    if leaderboard.content is None:
+        return
 
     try:
-        leaderboards = bc.search(
-            token=MOONSTREAM_ADMIN_ACCESS_TOKEN,
-            journal_id=MOONSTREAM_LEADERBOARD_GENERATOR_JOURNAL_ID,
-            query=query,
-            limit=100,
-            timeout=10,
+        leaderboard_data = json.loads(leaderboard.content)
+    except json.JSONDecodeError:
+        logger.error(
+            f"Could not parse leaderboard content: {[tag for tag in leaderboard.tags if tag.startswith('leaderboard_id')]} in entry {leaderboard.entry_url.split('/')[-1]}"
         )
-        leaderboards_results = cast(List[BugoutSearchResult], leaderboards.results)
-    except Exception as e:
-        logger.error(f"Could not get leaderboards from journal: {e}")
         return
 
-    if len(leaderboards_results) == 0:
-        logger.error("No leaderboard found")
-        return
+    ### get results from query API
 
-    logger.info(f"Found {len(leaderboards_results)} leaderboards")
+    leaderboard_id = leaderboard_data["leaderboard_id"]
 
-    for leaderboard in leaderboards_results:
-        logger.info(
-            f"Processing leaderboard: {leaderboard.title} with id: {[tag for tag in leaderboard.tags if tag.startswith('leaderboard_id')]}"
-        )
+    query_name = leaderboard_data["query_name"]
 
-        if leaderboard.content is None:
-            continue
+    if args.params:
+        params = json.loads(args.params)
+    else:
+        params = leaderboard_data["params"]
 
-        try:
-            leaderboard_data = json.loads(leaderboard.content)
-        except json.JSONDecodeError:
-            logger.error(
-                f"Could not parse leaderboard content: {[tag for tag in leaderboard.tags if tag.startswith('leaderboard_id')]} in entry {leaderboard.entry_url.split('/')[-1]}"
-            )
-            continue
+    blockchain = leaderboard_data.get("blockchain", None)
+    query_params = {}
 
-        ### get results from query API
+    if leaderboard_data.get("customer_id", False):
+        query_params["customer_id"] = leaderboard_data["customer_id"]
 
-        leaderboard_id = leaderboard_data["leaderboard_id"]
+    if leaderboard_data.get("instance_id", False):
+        query_params["instance_id"] = str(leaderboard_data["instance_id"])
 
-        query_name = leaderboard_data["query_name"]
+    ### execute query
+    try:
+        query_results = get_results_for_moonstream_query(
+            args.query_api_access_token,
+            query_name,
+            params,
+            query_params,
+            blockchain,
+            MOONSTREAM_API_URL,
+            args.max_retries,
+            args.interval,
+            args.query_api_retries,
+        )
+    except Exception as e:
+        logger.error(f"Could not get results for query {query_name}: error: {e}")
+        return
 
-        if args.params:
-            params = json.loads(args.params)
-        else:
-            params = leaderboard_data["params"]
+    ### push results to leaderboard API
 
-        blockchain = leaderboard_data.get("blockchain", None)
-        query_params = {}
+    if query_results is None:
+        logger.error(f"Could not get results for query {query_name} in time")
+        return
+
+    leaderboard_push_api_url = f"{MOONSTREAM_ENGINE_URL}/leaderboard/{leaderboard_id}/scores?normalize_addresses={leaderboard_data['normalize_addresses']}&overwrite=true"
 
-        if leaderboard_data.get("customer_id", False):
-            query_params["customer_id"] = leaderboard_data["customer_id"]
+    leaderboard_api_headers = {
+        "Authorization": f"Bearer {args.query_api_access_token}",
+        "Content-Type": "application/json",
+    }
 
-        if leaderboard_data.get("instance_id", False):
-            query_params["instance_id"] = str(leaderboard_data["instance_id"])
+    if len(query_results["data"]) > leaderboard_push_batch_size:
+        logger.info(
+            f"Pushing {len(query_results['data'])} scores to leaderboard {leaderboard_id} in batches of {leaderboard_push_batch_size}"
+        )
+        leaderboard_push_batch(
+            leaderboard_id,
+            leaderboard_data,
+            query_results["data"],
+            leaderboard_api_headers,
+            leaderboard_push_batch_size,
+            timeout=leaderboard_push_timeout_seconds,
+        )
 
-        ### execute query
+    else:
         try:
-            query_results = get_results_for_moonstream_query(
-                args.query_api_access_token,
-                query_name,
-                params,
-                query_params,
-                blockchain,
-                MOONSTREAM_API_URL,
-                args.max_retries,
-                args.interval,
-                args.query_api_retries,
+            leaderboard_api_response = requests.put(
+                leaderboard_push_api_url,
+                json=query_results["data"],
+                headers=leaderboard_api_headers,
+                timeout=leaderboard_push_timeout_seconds,
             )
-        except Exception as e:
-            logger.error(f"Could not get results for query {query_name}: error: {e}")
-            continue
+            leaderboard_api_response.raise_for_status()
+        except requests.exceptions.HTTPError as http_error:
+            logger.error(
+                f"Could not push results to leaderboard API: {http_error.response.text} with status code {http_error.response.status_code}"
+            )
+            return
 
-        ### push results to leaderboard API
+    ### get leaderboard from leaderboard API
 
-        if query_results is None:
-            logger.error(f"Could not get results for query {query_name} in time")
-            continue
+    leaderboard_api_info_url = (
+        f"{MOONSTREAM_ENGINE_URL}/leaderboard/info?leaderboard_id={leaderboard_id}"
+    )
 
-        leaderboard_push_api_url = f"{MOONSTREAM_ENGINE_URL}/leaderboard/{leaderboard_id}/scores?normalize_addresses={leaderboard_data['normalize_addresses']}&overwrite=true"
+    leaderboard_api_response = requests.get(
+        leaderboard_api_info_url, headers=leaderboard_api_headers, timeout=10
+    )
 
-        leaderboard_api_headers = {
-            "Authorization": f"Bearer {args.query_api_access_token}",
-            "Content-Type": "application/json",
-        }
+    try:
+        leaderboard_api_response.raise_for_status()
+    except requests.exceptions.HTTPError as http_error:
+        logger.error(
+            f"Could not get leaderboard info from leaderboard API: {http_error.response.text} with status code {http_error.response.status_code}"
+        )
+        return
 
-        if len(query_results["data"]) > leaderboard_push_batch_size:
-            logger.info(
-                f"Pushing {len(query_results['data'])} scores to leaderboard {leaderboard_id} in batches of {leaderboard_push_batch_size}"
-            )
-            leaderboard_push_batch(
-                leaderboard_id,
-                leaderboard_data,
-                query_results["data"],
-                leaderboard_api_headers,
-                leaderboard_push_batch_size,
-                timeout=leaderboard_push_timeout_seconds,
-            )
+    info = leaderboard_api_response.json()
 
-        else:
-            try:
-                leaderboard_api_response = requests.put(
-                    leaderboard_push_api_url,
-                    json=query_results["data"],
-                    headers=leaderboard_api_headers,
-                    timeout=leaderboard_push_timeout_seconds,
-                )
-                leaderboard_api_response.raise_for_status()
-            except requests.exceptions.HTTPError as http_error:
-                logger.error(
-                    f"Could not push results to leaderboard API: {http_error.response.text} with status code {http_error.response.status_code}"
-                )
-                continue
+    logger.info(
+        f"Successfully pushed results to leaderboard {info['id']}:{blue_c} {info['title']} {end_c}"
+    )
+    logger.info(
+        f"can be check on:{green_c} {MOONSTREAM_ENGINE_URL}/leaderboard/?leaderboard_id={leaderboard_id} {end_c}"
+    )
 
-        ### get leaderboard from leaderboard API
 
-        leaderboard_api_info_url = (
-            f"{MOONSTREAM_ENGINE_URL}/leaderboard/info?leaderboard_id={leaderboard_id}"
-        )
+def handle_leaderboards(args: argparse.Namespace) -> None:
+    """
+    Run the leaderboard generator.
 
-        leaderboard_api_response = requests.get(
-            leaderboard_api_info_url, headers=leaderboard_api_headers, timeout=10
-        )
+    Get query from journal and push results to leaderboard API.
+    """
 
-        try:
-            leaderboard_api_response.raise_for_status()
-        except requests.exceptions.HTTPError as http_error:
-            logger.error(
-                f"Could not get leaderboard info from leaderboard API: {http_error.response.text} with status code {http_error.response.status_code}"
-            )
-            continue
+    ### get leaderboard journal
 
-        info = leaderboard_api_response.json()
+    query = "#leaderboard #status:active"
 
-        logger.info(
-            f"Successfully pushed results to leaderboard {info['id']}:{blue_c} {info['title']} {end_c}"
-        )
-        logger.info(
-            f"can be check on:{green_c} {MOONSTREAM_ENGINE_URL}/leaderboard/?leaderboard_id={leaderboard_id} {end_c}"
+    if args.leaderboard_id:  # way to run only one leaderboard without status:active
+        query = f"#leaderboard #leaderboard_id:{args.leaderboard_id}"
+
+    try:
+        leaderboards = bc.search(
+            token=MOONSTREAM_ADMIN_ACCESS_TOKEN,
+            journal_id=MOONSTREAM_LEADERBOARD_GENERATOR_JOURNAL_ID,
+            query=query,
+            limit=100,
+            timeout=10,
         )
+        leaderboards_results = cast(List[BugoutSearchResult], leaderboards.results)
+    except Exception as e:
+        logger.error(f"Could not get leaderboards from journal: {e}")
+        return
+
+    if len(leaderboards_results) == 0:
+        logger.error("No leaderboard found")
+        return
+
+    logger.info(f"Found {len(leaderboards_results)} leaderboards")
+
+    with ThreadPoolExecutor(max_workers=args.max_concurrent_leaderboards) as executor:
+        futures = {
+            executor.submit(process_leaderboard, leaderboard, args): leaderboard
+            for leaderboard in leaderboards_results
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(
+                    f"Could not process leaderboard {futures[future].entry_url}: {e}"
+                )
 
 
 def main():
@@ -246,6 +266,13 @@ def main():
         help="Timeout for leaderboard API requests",
     )
 
+    leaderboard_generator_parser.add_argument(
+        "--max-concurrent-leaderboards",
+        type=int,
+        default=8,
+        help="Number of leaderboards refreshed concurrently",
+    )
+
     leaderboard_generator_parser.set_defaults(func=handle_leaderboards)
 
     args = parser.parse_args()
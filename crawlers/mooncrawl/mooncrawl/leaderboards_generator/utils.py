@@ -17,6 +17,10 @@ from ..settings import (
 logging.basicConfig()
 logger = logging.getLogger(__name__)
 
+# Max wait of one query job status request supported by API
+QUERY_JOB_MAX_WAIT_SECONDS = 60
+QUERY_JOB_FINISHED_STATUSES = {"succeeded", "failed"}
+
 
 def get_results_for_moonstream_query(
     moonstream_access_token: str,
@@ -32,6 +36,7 @@ def get_results_for_moonstream_query(
     """
 
     Run update of query data and waiting update of query result on S3.
+    Completion is taken from status of query job if API returns job id.
     TODO: Move to moonstream-client.
 
     :param moonstream_access_token: Moonstream access token.
@@ -84,6 +89,29 @@ def get_results_for_moonstream_query(
         response_body = response.json()
         data_url = response_body["url"]
 
+        # Query was not executed, result at the URL is up to date
+        if response_body.get("up_to_date", False):
+            result = get_data_from_url(data_url)
+            break
+
+        job_id = response_body.get("job_id")
+        if job_id is not None:
+            job_status = wait_for_query_job(
+                api_url, headers, job_id, max_retries, interval
+            )
+            if job_status == "succeeded":
+                result = get_data_from_url(data_url)
+                break
+            elif job_status is not None:
+                logger.error(
+                    f"Query {query_name} job {job_id} ended with: {job_status}"
+                )
+                continue
+            logger.warning(
+                f"Status of query {query_name} job {job_id} is not available, waiting for result on S3"
+            )
+
+        # Job status is not available, wait for update of result on S3
         keep_going = True
         num_retries = 0
 
@@ -112,6 +140,39 @@ def get_results_for_moonstream_query(
     return result
 
 
+def wait_for_query_job(
+    api_url: str,
+    headers: Dict[str, str],
+    job_id: str,
+    max_retries: int,
+    wait: float,
+) -> Optional[str]:
+    """
+    Long polls status of query job until it is finished.
+
+    Returns final status of the job or the last one if it was not finished in
+    time. Returns None if status is not available, e.g. job is unknown to API.
+    """
+    request_url = f"{api_url}/queries/jobs/{job_id}"
+    status: Optional[str] = None
+    for _ in range(max(max_retries, 1)):
+        try:
+            response = requests.get(
+                request_url,
+                headers=headers,
+                params={"wait": min(wait, QUERY_JOB_MAX_WAIT_SECONDS)},
+                timeout=min(wait, QUERY_JOB_MAX_WAIT_SECONDS) + 10,
+            )
+            response.raise_for_status()
+        except Exception as e:
+            logger.error(f"Could not get status of query job {job_id}: {e}")
+            return None
+        status = response.json()["status"]
+        if status in QUERY_JOB_FINISHED_STATUSES:
+            return status
+    return status
+
+
 def get_data_from_url(url):
     response = requests.get(url)
     if response.status_code == 200:
@@ -0,0 +1,162 @@
+"""
+On-disk cache of tokens metadata documents.
+
+Entries are keyed by hash of normalized URI and survive between crawler runs.
+IPFS documents are immutable and never expire, other documents are fresh for
+TTL seconds and then revalidated with ETag/Last-Modified conditional requests.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def ipfs_path(uri: str, gateways: Optional[List[str]] = None) -> Optional[str]:
+    """
+    Returns <cid>/<path> part of IPFS URI or of URL of the known gateway,
+    None if the URI is not IPFS one.
+    """
+    if uri.startswith("ipfs://"):
+        path = uri[len("ipfs://") :]
+        if path.startswith("ipfs/"):
+            path = path[len("ipfs/") :]
+        return path
+    for gateway in gateways if gateways is not None else []:
+        if uri.startswith(gateway):
+            return uri[len(gateway) :]
+    return None
+
+
+def normalize_uri(uri: str, ipfs_gateways: Optional[List[str]] = None) -> str:
+    """
+    Normalizes metadata URI, so the same document has one cache key.
+
+    IPFS URIs and URLs of known gateways become ipfs://<cid>/<path>, scheme and
+    host of other URLs are lowercased, default port and fragment are dropped.
+    """
+    uri = uri.strip()
+    path = ipfs_path(uri, ipfs_gateways)
+    if path is not None:
+        return f"ipfs://{path}"
+
+    parts = urlsplit(uri)
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or "").lower()
+    if parts.port is not None and DEFAULT_PORTS.get(scheme) != parts.port:
+        netloc = f"{netloc}:{parts.port}"
+    if parts.username is not None:
+        credentials = parts.username
+        if parts.password is not None:
+            credentials = f"{credentials}:{parts.password}"
+        netloc = f"{credentials}@{netloc}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+class MetadataCache:
+    """
+    Content cache of metadata documents stored as JSON files in cache_dir.
+
+    Safe to use from many threads and processes, entries are replaced atomically.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        ttl: int,
+        ipfs_gateways: Optional[List[str]] = None,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.ipfs_gateways = ipfs_gateways
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, uri: str) -> str:
+        key = hashlib.sha256(
+            normalize_uri(uri, self.ipfs_gateways).encode("utf-8")
+        ).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, uri: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns cache entry of the URI, None if there is no entry.
+        """
+        path = self._path(uri)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as ifp:
+                entry = json.load(ifp)
+            # Revalidated entries are touched instead of rewritten
+            entry["fetched_at"] = max(
+                entry.get("fetched_at", 0), os.path.getmtime(path)
+            )
+            return entry
+        except Exception as err:
+            logger.warning(f"Could not read metadata cache entry {path}: {err}")
+            return None
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return entry.get("immutable", False) or (
+            time.time() - entry.get("fetched_at", 0) < self.ttl
+        )
+
+    def put(
+        self,
+        uri: str,
+        document: Any,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        immutable: bool = False,
+    ) -> None:
+        path = self._path(uri)
+        entry = {
+            "uri": normalize_uri(uri, self.ipfs_gateways),
+            "fetched_at": time.time(),
+            "etag": etag,
+            "last_modified": last_modified,
+            "immutable": immutable,
+            "document": document,
+        }
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Unique name, concurrent writers of the same entry do not clash
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as ofp:
+                json.dump(entry, ofp)
+            os.replace(tmp_path, path)
+        except Exception as err:
+            logger.warning(f"Could not write metadata cache entry {path}: {err}")
+
+    def revalidated(
+        self,
+        uri: str,
+        entry: Dict[str, Any],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        """
+        Marks entry fresh after 304 response. Validators of the entry are kept
+        when response omits them, document is rewritten only if they changed.
+        """
+        etag = etag or entry.get("etag")
+        last_modified = last_modified or entry.get("last_modified")
+        if etag != entry.get("etag") or last_modified != entry.get("last_modified"):
+            self.put(uri, entry["document"], etag=etag, last_modified=last_modified)
+            return
+
+        path = self._path(uri)
+        try:
+            os.utime(path)
+        except Exception as err:
+            logger.warning(f"Could not touch metadata cache entry {path}: {err}")
@@ -1,9 +1,8 @@
 import json
 import logging
 from hexbytes import HexBytes
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 ###from sqlalchemy import 
-from sqlalchemy.dialects.postgresql import insert
 
 from datetime import datetime
 
@@ -13,6 +12,7 @@ from sqlalchemy.sql import text
 
 from ..actions import recive_S3_data_from_query
 from ..data import TokenURIs
+from ..labels_copy import copy_labels
 from ..settings import (
     CRAWLER_LABEL,
     METADATA_CRAWLER_LABEL,
@@ -270,6 +270,181 @@ def get_tokens_id_wich_may_updated(
     return result
 
 
+def get_addresses_with_token_uris(
+    db_session: Session, blockchain_type: AvailableBlockchainType, version: int = 2
+) -> List[str]:
+    """
+    Returns addresses of contracts with crawled tokenURI/uri view calls.
+    """
+
+    label_model = get_label_model(blockchain_type, version=version)
+
+    table = label_model.__tablename__
+
+    addresses = db_session.execute(
+        text(
+            """ SELECT
+            DISTINCT address
+        FROM
+            {}
+        WHERE
+            label = :label
+            AND label_data ->> 'name' in :names
+            AND address IS NOT NULL
+            AND address != '';
+    """.format(
+                table
+            )
+        ),
+        {"label": VIEW_STATE_CRAWLER_LABEL, "names": ("tokenURI", "uri")},
+    )
+
+    return [data[0] for data in addresses]
+
+
+def yield_tokens_to_crawl_for_address(
+    db_session: Session,
+    blockchain_type: AvailableBlockchainType,
+    address: str,
+    max_recrawl: int,
+    version: int = 2,
+    yield_per: int = 1000,
+) -> Iterator[TokenURIs]:
+    """
+    Streams latest token URIs of the address which need (re)crawl of metadata.
+
+    Returns tokens without metadata, tokens which may be updated (see
+    get_tokens_id_wich_may_updated) and leaks up to max_recrawl minus number of
+    may be updated tokens of already parsed ones, starting from the longest
+    ago crawled.
+    """
+
+    label_model = get_label_model(blockchain_type, version=version)
+
+    table = label_model.__tablename__
+
+    tokens = db_session.execute(
+        text(
+            """
+        WITH token_uris AS (
+            SELECT
+                DISTINCT ON (label_data -> 'inputs' ->> 0) label_data -> 'inputs' ->> 0 as token_id,
+                label_data -> 'result' as token_uri,
+                block_number as block_number,
+                block_timestamp as block_timestamp
+            FROM
+                {table}
+            WHERE
+                label = :view_label
+                AND address = :address
+                AND label_data ->> 'name' in :names
+            ORDER BY
+                label_data -> 'inputs' ->> 0 ASC,
+                block_number :: INT DESC
+        ),
+        metadata_state AS (
+            SELECT
+                DISTINCT ON (label_data ->> 'token_id') label_data ->> 'token_id' as token_id,
+                label_data ->> 'metadata' IS NOT NULL as has_metadata,
+                block_timestamp as block_timestamp,
+                created_at as created_at
+            FROM
+                {table}
+            WHERE
+                label = :metadata_label
+                AND address = :address
+            ORDER BY
+                label_data ->> 'token_id' ASC,
+                block_number :: INT DESC,
+                created_at DESC
+        ),
+        token_id_latest_events AS (
+            SELECT
+                label_data -> 'args' ->> 'tokenId' as token_id,
+                max(block_timestamp) as block_timestamp
+            FROM
+                {table}
+            WHERE
+                label = :moonworm_label
+                AND address = :address
+                AND label_data ->> 'type' = 'tx_call'
+                AND label_data ->> 'status' = '1'
+                AND label_data ->> 'name' not in (
+                    'safeTransferFrom',
+                    'approve',
+                    'transferFrom'
+                )
+            GROUP BY
+                label_data -> 'args' ->> 'tokenId'
+        ),
+        tokens_state AS (
+            SELECT
+                token_uris.*,
+                metadata_state.has_metadata IS TRUE as has_metadata,
+                metadata_state.created_at as metadata_created_at,
+                (
+                    token_id_latest_events.block_timestamp > metadata_state.block_timestamp
+                ) IS TRUE as maybe_updated
+            FROM
+                token_uris
+                LEFT JOIN metadata_state ON token_uris.token_id = metadata_state.token_id
+                LEFT JOIN token_id_latest_events ON token_uris.token_id = token_id_latest_events.token_id
+        ),
+        leaked AS (
+            SELECT
+                token_id
+            FROM
+                tokens_state
+            WHERE
+                has_metadata
+                AND NOT maybe_updated
+            ORDER BY
+                metadata_created_at ASC
+            LIMIT (
+                SELECT
+                    GREATEST(:max_recrawl - count(*), 0)
+                FROM
+                    tokens_state
+                WHERE
+                    maybe_updated
+            )
+        )
+        SELECT
+            token_id,
+            token_uri,
+            block_number,
+            block_timestamp
+        FROM
+            tokens_state
+        WHERE
+            NOT has_metadata
+            OR maybe_updated
+            OR token_id IN (SELECT token_id FROM leaked)
+        """.format(
+                table=table
+            )
+        ),
+        {
+            "address": address,
+            "view_label": VIEW_STATE_CRAWLER_LABEL,
+            "names": ("tokenURI", "uri"),
+            "metadata_label": METADATA_CRAWLER_LABEL,
+            "moonworm_label": CRAWLER_LABEL,
+            "max_recrawl": max_recrawl,
+        },
+        execution_options={"yield_per": yield_per},
+    )
+
+    for data in tokens:
+        yield TokenURIs(
+            token_id=data[0],
+            address=address,
+            token_uri=data[1][0],
+            block_number=data[2],
+            block_timestamp=data[3],
+        )
+
+
 def clean_labels_from_db(
     db_session: Session, blockchain_type: AvailableBlockchainType, address: str, version: int = 2
 ):
@@ -461,13 +636,8 @@ def upsert_metadata_labels(
         if not labels_data:
             return
 
-        # Create insert statement
-        insert_stmt = insert(label_model).values(labels_data)
-        result_stmt = insert_stmt.on_conflict_do_nothing(
-        )
+        copy_labels(db_session, label_model, labels_data)
 
-        db_session.execute(result_stmt)
-        
         db_session.commit()
 
     except Exception as err:
@@ -0,0 +1,225 @@
+"""
+Tokens metadata fetcher.
+
+One requests session with keep-alive connection pools is shared by all fetches
+and number of concurrent requests to one host is limited. ipfs:// URIs are
+requested from all configured gateways at once and the first valid document
+wins. data: URIs are decoded locally. Documents are kept in optional on-disk
+MetadataCache shared between runs.
+"""
+
+import base64
+import json
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+from urllib.parse import unquote, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .cache import MetadataCache, ipfs_path
+from ..settings import (
+    MOONSTREAM_METADATA_IPFS_GATEWAYS,
+    MOONSTREAM_METADATA_MAX_CONNECTIONS_PER_HOST,
+    MOONSTREAM_METADATA_REQUEST_TIMEOUT_SECONDS,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+USER_AGENT = "Mozilla/5.0"
+# Used for ipfs:// URIs when no gateways are configured
+DEFAULT_IPFS_GATEWAY = "https://ipfs.io/ipfs/"
+
+
+class MetadataNotFound(Exception):
+    """
+    Raised when metadata host responds with 404.
+    """
+
+
+def decode_data_uri(uri: str) -> Any:
+    """
+    Decodes JSON document from data: URI, e.g. data:application/json;base64,...
+    """
+    header, _, data = uri.partition(",")
+    if header.endswith(";base64"):
+        return json.loads(base64.b64decode(data))
+    return json.loads(unquote(data))
+
+
+class MetadataFetcher:
+    """
+    Fetches tokens metadata documents.
+
+    Thread safe, one instance should be shared by all crawling threads.
+    """
+
+    def __init__(
+        self,
+        ipfs_gateways: Optional[List[str]] = None,
+        max_connections_per_host: int = MOONSTREAM_METADATA_MAX_CONNECTIONS_PER_HOST,
+        timeout: float = MOONSTREAM_METADATA_REQUEST_TIMEOUT_SECONDS,
+        retries: int = 3,
+        max_workers: int = 4,
+        cache: Optional[MetadataCache] = None,
+    ) -> None:
+        assert max_connections_per_host > 0, "max_connections_per_host must be > 0"
+        self.ipfs_gateways = (
+            ipfs_gateways
+            if ipfs_gateways is not None
+            else MOONSTREAM_METADATA_IPFS_GATEWAYS
+        )
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.max_workers = max_workers
+        self.cache = cache
+
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": USER_AGENT})
+        adapter = HTTPAdapter(pool_maxsize=max_connections_per_host)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._host_limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_limits_lock = threading.Lock()
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        # Separate pool for gateway requests, so racing never waits for fetch workers
+        self._gateways_executor = ThreadPoolExecutor(
+            max_workers=max(max_workers, 1) * max(len(self.ipfs_gateways), 1)
+        )
+
+    def __enter__(self) -> "MetadataFetcher":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+        self._gateways_executor.shutdown(wait=False)
+        self.session.close()
+
+    def _host_limit(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with self._host_limits_lock:
+            limit = self._host_limits.get(host)
+            if limit is None:
+                limit = threading.BoundedSemaphore(self.max_connections_per_host)
+                self._host_limits[host] = limit
+        return limit
+
+    def _get(
+        self, url: str, headers: Optional[Dict[str, str]] = None
+    ) -> requests.Response:
+        with self._host_limit(url):
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 404:
+            raise MetadataNotFound(url)
+        response.raise_for_status()
+        return response
+
+    def _get_json(self, url: str) -> Any:
+        return json.loads(self._get(url).content)
+
+    def _fetch_http(self, uri: str, cached: Optional[Dict[str, Any]]) -> Any:
+        """
+        Fetches document, revalidates cached one with conditional request.
+        """
+        headers = {}
+        if cached is not None:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        response = self._get(uri, headers=headers)
+        if response.status_code == 304 and cached is not None:
+            if self.cache is not None:
+                self.cache.revalidated(
+                    uri,
+                    cached,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                )
+            return cached["document"]
+
+        document = json.loads(response.content)
+        if self.cache is not None:
+            self.cache.put(
+                uri,
+                document,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+        return document
+
+    def _race_gateways(self, path: str) -> Any:
+        futures = {
+            self._gateways_executor.submit(self._get_json, gateway + path): gateway
+            for gateway in self.ipfs_gateways
+        }
+        errors = []
+        while futures:
+            done, _ = wait(list(futures.keys()), return_when=FIRST_COMPLETED)
+            for future in done:
+                gateway = futures.pop(future)
+                try:
+                    result = future.result()
+                except Exception as err:
+                    errors.append(f"{gateway}: {err}")
+                    continue
+                for pending in futures:
+                    pending.cancel()
+                return result
+        raise Exception(f"All IPFS gateways failed for {path}: {'; '.join(errors)}")
+
+    def fetch(self, uri: str) -> Any:
+        """
+        Returns metadata document of the URI, None if it could not be fetched.
+        """
+        if uri.startswith("data:"):
+            try:
+                return decode_data_uri(uri)
+            except Exception as err:
+                logger.error(f"Could not decode data uri: {uri[:64]}, error: {err}")
+                return None
+
+        cached = None
+        if self.cache is not None:
+            cached = self.cache.get(uri)
+            if cached is not None and self.cache.is_fresh(cached):
+                return cached["document"]
+
+        path = ipfs_path(uri, self.ipfs_gateways)
+        for _ in range(self.retries):
+            try:
+                if path is not None:
+                    if len(self.ipfs_gateways) > 0:
+                        document = self._race_gateways(path)
+                    else:
+                        document = self._get_json(DEFAULT_IPFS_GATEWAY + path)
+                    if self.cache is not None:
+                        self.cache.put(uri, document, immutable=True)
+                    return document
+                return self._fetch_http(uri, cached)
+            except MetadataNotFound:
+                logger.error(f"Metadata not found: {uri}")
+                return None
+            except Exception as err:
+                logger.error(f"Request end with error for url: {uri}, error: {err}")
+        return None
+
+    def fetch_many(self, uris: List[str]) -> List[Any]:
+        """
+        Fetches metadata documents of URIs concurrently, results are in order of URIs.
+        Repeated URIs are fetched once.
+        """
+        unique_uris = list(dict.fromkeys(uris))
+        documents = dict(zip(unique_uris, self.executor.map(self.fetch, unique_uris)))
+        return [documents[uri] for uri in uris]
@@ -0,0 +1,187 @@
+"""
+Metadata crawl scheduler.
+
+Tokens of many addresses are interleaved into one shared fetch pool, number of
+fetches in flight for one address is limited, so slow or dead metadata host of
+one collection does not stall others. Fetched metadata is written to database
+by a separate writer thread.
+"""
+
+import logging
+import queue
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..data import TokenURIs
+from .fetcher import MetadataFetcher
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+MetadataBatch = List[Tuple[TokenURIs, Any]]
+
+
+@dataclass
+class AddressCrawlJob:
+    """
+    Tokens of one address to crawl.
+
+    write is called from the writer thread with batches of fetched metadata.
+    """
+
+    address: str
+    tokens: Iterator[TokenURIs]
+    write: Callable[[MetadataBatch], None]
+    # Write tokens without fetched metadata as well
+    keep_empty: bool = False
+
+
+@dataclass
+class _AddressState:
+    job: AddressCrawlJob
+    in_flight: int = 0
+    exhausted: bool = False
+    crawled: int = 0
+    buffer: MetadataBatch = field(default_factory=list)
+
+
+class LabelsWriter:
+    """
+    Writer stage, runs write callbacks of jobs one by one in a separate thread.
+
+    Queue is bounded, so fetching waits when database writes fall behind.
+    """
+
+    def __init__(self, max_queue_size: int = 16) -> None:
+        self._queue: "queue.Queue[Optional[Tuple[AddressCrawlJob, MetadataBatch]]]" = (
+            queue.Queue(maxsize=max_queue_size)
+        )
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            job, batch = item
+            try:
+                job.write(batch)
+                logger.info(f"Write {len(batch)} labels for {job.address}")
+            except Exception as err:
+                logger.warning(
+                    f"Error while writing labels for address {job.address}: {err}"
+                )
+
+    def submit(self, job: AddressCrawlJob, batch: MetadataBatch) -> None:
+        self._queue.put((job, batch))
+
+    def close(self) -> None:
+        """
+        Waits until all submitted batches are written.
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+
+def crawl_metadata(
+    jobs: Iterable[AddressCrawlJob],
+    fetcher: MetadataFetcher,
+    batch_size: int,
+    max_active_addresses: int = 8,
+    max_in_flight_per_address: Optional[int] = None,
+) -> None:
+    """
+    Crawls metadata of tokens of all jobs.
+
+    Up to max_active_addresses jobs are crawled at once, their tokens are submitted
+    to the fetcher pool round robin. Jobs are consumed lazily.
+    """
+    assert max_active_addresses > 0, "max_active_addresses must be greater than 0"
+    max_in_flight = fetcher.max_workers
+    if max_in_flight_per_address is None:
+        max_in_flight_per_address = max(max_in_flight // 2, 1)
+
+    jobs_iterator = iter(jobs)
+    jobs_exhausted = False
+    active: Deque[_AddressState] = deque()
+    futures: Dict[Future, Tuple[_AddressState, TokenURIs]] = {}
+
+    writer = LabelsWriter()
+
+    def flush(state: _AddressState) -> None:
+        if len(state.buffer) > 0:
+            writer.submit(state.job, state.buffer)
+            state.buffer = []
+
+    try:
+        while True:
+            while not jobs_exhausted and len(active) < max_active_addresses:
+                job = next(jobs_iterator, None)
+                if job is None:
+                    jobs_exhausted = True
+                    break
+                logger.info(f"Starting to crawl metadata for address: {job.address}")
+                active.append(_AddressState(job=job))
+
+            # Round robin over active addresses
+            submitted = True
+            while submitted and len(futures) < max_in_flight:
+                submitted = False
+                for state in list(active):
+                    if len(futures) >= max_in_flight:
+                        break
+                    if state.exhausted or state.in_flight >= max_in_flight_per_address:
+                        continue
+                    try:
+                        token = next(state.job.tokens, None)
+                    except Exception as err:
+                        logger.warning(
+                            f"Error while getting tokens for address {state.job.address}: {err}"
+                        )
+                        token = None
+                    if token is None:
+                        state.exhausted = True
+                        continue
+                    future = fetcher.executor.submit(fetcher.fetch, token.token_uri)
+                    futures[future] = (state, token)
+                    state.in_flight += 1
+                    submitted = True
+
+            for state in list(active):
+                if state.exhausted and state.in_flight == 0:
+                    flush(state)
+                    active.remove(state)
+                    logger.info(
+                        f"Crawled {state.crawled} tokens for {state.job.address}"
+                    )
+
+            if len(futures) == 0:
+                if jobs_exhausted and len(active) == 0:
+                    break
+                continue
+
+            done, _ = wait(list(futures.keys()), return_when=FIRST_COMPLETED)
+            for future in done:
+                state, token = futures.pop(future)
+                state.in_flight -= 1
+                state.crawled += 1
+                try:
+                    metadata = future.result()
+                except Exception as err:
+                    logger.error(
+                        f"Error fetching metadata for token {token.token_id}: {err}"
+                    )
+                    metadata = None
+                if metadata or state.job.keep_empty:
+                    state.buffer.append((token, metadata))
+                if len(state.buffer) >= batch_size:
+                    flush(state)
+    finally:
+        for future in futures:
+            future.cancel()
+        writer.close()
@@ -0,0 +1,209 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from moonstreamtypes.blockchain import AvailableBlockchainType, get_block_model
+from sqlalchemy.orm.session import Session
+from web3 import HTTPProvider, Web3
+from web3._utils.request import make_post_request
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_BLOCK_TIMESTAMPS_CACHE_SIZE = 100000
+DEFAULT_RPC_BATCH_SIZE = 100
+
+
+def _get_block_timestamp_from_web3(
+    web3: Web3,
+    block_number: int,
+) -> int:
+    """
+    Gets the timestamp of a block from the blockchain.
+    will raise an exception if the block is not found.
+    """
+    return web3.eth.getBlock(block_number).timestamp
+
+
+def _get_block_timestamps_from_web3_batch(
+    web3: Web3,
+    block_numbers: List[int],
+    batch_size: int = DEFAULT_RPC_BATCH_SIZE,
+) -> Dict[int, int]:
+    """
+    Gets timestamps of blocks with JSON-RPC batch requests of eth_getBlockByNumber.
+
+    Falls back to one request per block for non HTTP providers and for blocks
+    the batch response has no result for.
+    """
+    timestamps: Dict[int, int] = {}
+    provider = web3.provider
+    if not isinstance(provider, HTTPProvider):
+        for block_number in block_numbers:
+            timestamps[block_number] = _get_block_timestamp_from_web3(
+                web3, block_number
+            )
+        return timestamps
+
+    for i in range(0, len(block_numbers), batch_size):
+        chunk = block_numbers[i : i + batch_size]
+        payload = [
+            {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "method": "eth_getBlockByNumber",
+                "params": [hex(block_number), False],
+            }
+            for request_id, block_number in enumerate(chunk)
+        ]
+        try:
+            raw_response = make_post_request(
+                provider.endpoint_uri,  # type: ignore
+                json.dumps(payload).encode("utf-8"),
+                **dict(provider.get_request_kwargs()),  # type: ignore
+            )
+            response = json.loads(raw_response)
+            if not isinstance(response, list):
+                raise ValueError(f"Unexpected batch response: {response}")
+        except Exception as e:
+            logger.warning(
+                f"Batch request of {len(chunk)} blocks failed, fetching one by one: {e}"
+            )
+            response = []
+
+        for item in response:
+            result = item.get("result")
+            if result is None:
+                continue
+            timestamps[chunk[item["id"]]] = int(result["timestamp"], 16)
+
+        for block_number in chunk:
+            if block_number not in timestamps:
+                timestamps[block_number] = _get_block_timestamp_from_web3(
+                    web3, block_number
+                )
+
+    return timestamps
+
+
+class BlockTimestampsResolver:
+    """
+    Resolves block timestamps in bulk and keeps them in a bounded LRU cache.
+
+    Missing blocks are looked up with one range query to blocks table (only for
+    database version 2, v3 databases have no blocks table) and remaining ones
+    with JSON-RPC batch request to the node.
+
+    One instance could be shared between crawlers working with the same blockchain.
+    """
+
+    def __init__(
+        self,
+        blockchain_type: AvailableBlockchainType,
+        version: int = 2,
+        max_size: int = DEFAULT_BLOCK_TIMESTAMPS_CACHE_SIZE,
+        rpc_batch_size: int = DEFAULT_RPC_BATCH_SIZE,
+    ) -> None:
+        assert max_size > 0, "max_size must be greater than 0"
+        self.blockchain_type = blockchain_type
+        self.version = version
+        self.max_size = max_size
+        self.rpc_batch_size = rpc_batch_size
+
+        self._cache: "OrderedDict[int, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def __contains__(self, block_number: int) -> bool:
+        return block_number in self._cache
+
+    def get(self, block_number: int) -> Optional[int]:
+        with self._lock:
+            timestamp = self._cache.get(block_number)
+            if timestamp is not None:
+                self._cache.move_to_end(block_number)
+            return timestamp
+
+    def update(self, timestamps: Dict[int, int]) -> None:
+        with self._lock:
+            for block_number, timestamp in timestamps.items():
+                self._cache[block_number] = timestamp
+                self._cache.move_to_end(block_number)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def _get_from_db(
+        self, db_session: Session, block_numbers: List[int]
+    ) -> Dict[int, int]:
+        block_model = get_block_model(self.blockchain_type)
+        from_block = min(block_numbers)
+        to_block = max(block_numbers)
+
+        query = db_session.query(block_model.block_number, block_model.timestamp)
+        if to_block - from_block < self.max_size:
+            query = query.filter(
+                block_model.block_number >= from_block,
+                block_model.block_number <= to_block,
+            )
+        else:
+            query = query.filter(block_model.block_number.in_(block_numbers))
+
+        return {block.block_number: block.timestamp for block in query}
+
+    def resolve(
+        self,
+        db_session: Optional[Session],
+        web3: Web3,
+        block_numbers: Iterable[int],
+    ) -> Dict[int, int]:
+        """
+        Returns timestamps for all requested blocks.
+        Will raise an exception if some block is not found.
+        """
+        timestamps: Dict[int, int] = {}
+        missing: List[int] = []
+        for block_number in set(block_numbers):
+            timestamp = self.get(block_number)
+            if timestamp is None:
+                missing.append(block_number)
+            else:
+                timestamps[block_number] = timestamp
+
+        if len(missing) == 0:
+            return timestamps
+
+        if self.version == 2 and db_session is not None:
+            db_timestamps = self._get_from_db(db_session, missing)
+            # Neighbour blocks from the range are cached for the next batches
+            self.update(db_timestamps)
+            missing_set = set(missing)
+            for block_number, timestamp in db_timestamps.items():
+                if block_number in missing_set:
+                    timestamps[block_number] = timestamp
+            missing = [
+                block_number
+                for block_number in missing
+                if block_number not in db_timestamps
+            ]
+
+        if len(missing) > 0:
+            web3_timestamps = _get_block_timestamps_from_web3_batch(
+                web3, sorted(missing), self.rpc_batch_size
+            )
+            self.update(web3_timestamps)
+            timestamps.update(web3_timestamps)
+
+        return timestamps
+
+    def get_block_timestamp(
+        self,
+        db_session: Optional[Session],
+        web3: Web3,
+        block_number: int,
+    ) -> int:
+        return self.resolve(db_session, web3, [block_number])[block_number]
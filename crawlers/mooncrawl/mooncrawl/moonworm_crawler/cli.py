@@ -1,6 +1,7 @@
 import argparse
 import logging
-from typing import Optional
+import os
+from typing import Iterable, Optional, Tuple
 from uuid import UUID
 from urllib.parse import urlparse, urlunparse
 
@@ -13,6 +14,7 @@ from moonstreamdbv3.db import (
 )
 from moonstreamtypes.blockchain import AvailableBlockchainType
 from moonstreamtypes.subscriptions import blockchain_type_to_subscription_type
+from sqlalchemy.orm.session import Session
 from web3 import Web3
 from web3.middleware import geth_poa_middleware  # type: ignore
 
@@ -20,12 +22,20 @@ from ..db import yield_db_session_ctx
 from ..settings import (
     HISTORICAL_CRAWLER_STATUS_TAG_PREFIXES,
     HISTORICAL_CRAWLER_STATUSES,
+    MOONSTREAM_HISTORICAL_CRAWL_CHECKPOINT_DIR,
     MOONSTREAM_MOONWORM_TASKS_JOURNAL,
     MOONSTREAM_DB_V3_CONTROLLER_API,
     MOONSTREAM_DB_V3_CONTROLLER_SEER_ACCESS_TOKEN,
 )
-from .continuous_crawler import _retry_connect_web3, continuous_crawler
+from .continuous_crawler import (
+    _retry_connect_web3,
+    continuous_crawler,
+    pipelined_continuous_crawler,
+)
 from .crawler import (
+    EventCrawlJob,
+    FunctionCallCrawlJob,
+    crawl_jobs_hash,
     find_all_deployed_blocks,
     get_crawl_job_entries,
     make_event_crawl_jobs,
@@ -35,13 +45,118 @@ from .crawler import (
     get_event_crawl_job_records,
     get_function_call_crawl_job_records,
 )
-from .db import get_first_labeled_block_number, get_last_labeled_block_number
-from .historical_crawler import historical_crawler
+from .db import (
+    get_crawler_checkpoint,
+    get_first_labeled_block_number,
+    get_last_labeled_block_number,
+)
+from .historical_crawler import (
+    historical_crawler,
+    read_sharded_crawl_plan,
+    sharded_historical_crawler,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _get_checkpoint_block(
+    db_session: Session,
+    blockchain_type: AvailableBlockchainType,
+    crawler_type: str,
+    event_crawl_jobs: Iterable[EventCrawlJob],
+    function_call_crawl_jobs: Iterable[FunctionCallCrawlJob],
+    instance: Optional[str] = None,
+    db_version: int = 2,
+) -> Optional[int]:
+    """
+    Returns last committed block from crawler checkpoint of the given jobs set.
+    """
+    jobs_hash = crawl_jobs_hash(list(event_crawl_jobs), list(function_call_crawl_jobs))
+    checkpoint_block = get_crawler_checkpoint(
+        db_session,
+        blockchain_type,
+        crawler_type,
+        jobs_hash,
+        instance=instance,
+        db_version=db_version,
+    )
+    if checkpoint_block is not None:
+        logger.info(
+            f"Found {crawler_type} crawler checkpoint for jobs set {jobs_hash}: {checkpoint_block}"
+        )
+    return checkpoint_block
+
+
+def _historical_crawl_block_range(
+    args: argparse.Namespace,
+    blockchain_type: AvailableBlockchainType,
+    event_crawl_jobs: Iterable[EventCrawlJob],
+    function_call_crawl_jobs: Iterable[FunctionCallCrawlJob],
+    start_block: Optional[int],
+    end_block: Optional[int],
+    last_labeled_block: Optional[int],
+) -> Tuple[int, int]:
+    """
+    Returns (start_block, end_block) of historical crawl.
+
+    Sharded crawl is resumed from its plan and shards checkpoints, so the range
+    comes from arguments or from the existing plan and labeled blocks are not
+    used to move the start of it.
+    """
+    if args.shards > 1:
+        plan = None
+        if not args.force:
+            plan = read_sharded_crawl_plan(
+                args.checkpoint_dir,
+                blockchain_type,
+                list(event_crawl_jobs),
+                list(function_call_crawl_jobs),
+            )
+        if plan is not None:
+            if args.start is None:
+                start_block = plan["start_block"]
+                logger.info(f"Using start block of sharded crawl plan: {start_block}")
+            if end_block is None:
+                end_block = plan["end_block"]
+                logger.info(f"Using end block of sharded crawl plan: {end_block}")
+
+    if start_block is None:
+        logger.info("No start block provided")
+        if last_labeled_block is not None:
+            start_block = last_labeled_block
+            logger.info(f"Using last labeled block as start: {start_block}")
+        else:
+            logger.info(
+                "No last labeled block found, using  start block (web3.eth.blockNumber - 300)"
+            )
+            raise ValueError("No start block provided and no last labeled block found")
+    elif last_labeled_block is not None and args.shards <= 1:
+        if start_block > last_labeled_block and not args.force:
+            logger.info(
+                f"Start block is less than last labeled block, using last labeled block: {last_labeled_block}"
+            )
+            logger.info(
+                f"Use --force to override this and start from the start block: {start_block}"
+            )
+
+            start_block = last_labeled_block
+        else:
+            logger.info(f"Using start block: {start_block}")
+    else:
+        logger.info(f"Using start block: {start_block}")
+
+    if end_block is None:
+        raise ValueError("No end block provided")
+
+    if start_block < end_block:
+        raise ValueError(
+            f"Start block {start_block} is less than end block {end_block}. This crawler crawls in the reverse direction."
+        )
+
+    return start_block, end_block
+
+
 def handle_crawl(args: argparse.Namespace) -> None:
     blockchain_type = AvailableBlockchainType(args.blockchain_type)
     subscription_type = blockchain_type_to_subscription_type(blockchain_type)
@@ -93,7 +208,17 @@ def handle_crawl(args: argparse.Namespace) -> None:
                 logger.info("Using PoA middleware")
                 web3.middleware_onion.inject(geth_poa_middleware, layer=0)
 
-        last_labeled_block = get_last_labeled_block_number(db_session, blockchain_type)
+        last_labeled_block = _get_checkpoint_block(
+            db_session,
+            blockchain_type,
+            "continuous",
+            initial_event_jobs,
+            initial_function_call_jobs,
+        )
+        if last_labeled_block is None:
+            last_labeled_block = get_last_labeled_block_number(
+                db_session, blockchain_type
+            )
         logger.info(f"Last labeled block: {last_labeled_block}")
 
         start_block = args.start
@@ -130,6 +255,27 @@ def handle_crawl(args: argparse.Namespace) -> None:
         else:
             confirmations = 0
 
+        if args.pipelined:
+            with yield_db_session_ctx() as decode_db_session:
+                pipelined_continuous_crawler(
+                    db_session,
+                    blockchain_type,
+                    web3,
+                    initial_event_jobs,
+                    initial_function_call_jobs,
+                    start_block,
+                    args.max_blocks_batch,
+                    args.min_blocks_batch,
+                    confirmations,
+                    args.min_sleep_time,
+                    args.heartbeat_interval,
+                    args.new_jobs_refetch_interval,
+                    web3_uri=args.web3_uri,
+                    decode_db_session=decode_db_session,
+                    pipeline_queue_size=args.pipeline_queue_size,
+                )
+            return
+
         continuous_crawler(
             db_session,
             blockchain_type,
@@ -248,9 +394,19 @@ def handle_crawl_v3(args: argparse.Namespace) -> None:
                 logger.info("Using PoA middleware")
                 web3.middleware_onion.inject(geth_poa_middleware, layer=0)
 
-        last_labeled_block = get_last_labeled_block_number(
-            db_session, blockchain_type, db_version=3
+        last_labeled_block = _get_checkpoint_block(
+            db_session,
+            blockchain_type,
+            "continuous_v3",
+            initial_event_jobs.values(),
+            initial_function_call_jobs.values(),
+            instance=args.customer_uuid,
+            db_version=3,
         )
+        if last_labeled_block is None:
+            last_labeled_block = get_last_labeled_block_number(
+                db_session, blockchain_type, db_version=3
+            )
         logger.info(f"Last labeled block: {last_labeled_block}")
 
         start_block = args.start
@@ -290,7 +446,13 @@ def handle_crawl_v3(args: argparse.Namespace) -> None:
         craw_event_jobs = list(initial_event_jobs.values())
         initial_function_call_jobs = list(initial_function_call_jobs.values())
 
-        continuous_crawler(
+        crawler = continuous_crawler
+        crawler_kwargs = {}
+        if args.pipelined:
+            crawler = pipelined_continuous_crawler  # type: ignore
+            crawler_kwargs["pipeline_queue_size"] = args.pipeline_queue_size
+
+        crawler(
             db_session,
             blockchain_type,
             web3,
@@ -306,6 +468,8 @@ def handle_crawl_v3(args: argparse.Namespace) -> None:
             web3_uri=args.web3_uri,
             version=3,
             index_db_session=index_db_session,
+            customer_id=args.customer_uuid,
+            **crawler_kwargs,
         )
 
 
@@ -434,9 +598,17 @@ def handle_historical_crawl(args: argparse.Namespace) -> None:
                 logger.info("Using PoA middleware")
                 web3.middleware_onion.inject(geth_poa_middleware, layer=0)
 
-        last_labeled_block = get_first_labeled_block_number(
-            db_session, blockchain_type, args.address, only_events=args.only_events
+        last_labeled_block = _get_checkpoint_block(
+            db_session,
+            blockchain_type,
+            "historical",
+            filtered_event_jobs,
+            filtered_function_call_jobs,
         )
+        if last_labeled_block is None:
+            last_labeled_block = get_first_labeled_block_number(
+                db_session, blockchain_type, args.address, only_events=args.only_events
+            )
         logger.info(f"Last labeled block: {last_labeled_block}")
 
         addresses_deployment_blocks = None
@@ -466,37 +638,32 @@ def handle_historical_crawl(args: argparse.Namespace) -> None:
                 return
             end_block = min(addresses_deployment_blocks.values())
 
-        if start_block is None:
-            logger.info("No start block provided")
-            if last_labeled_block is not None:
-                start_block = last_labeled_block
-                logger.info(f"Using last labeled block as start: {start_block}")
-            else:
-                logger.info(
-                    "No last labeled block found, using  start block (web3.eth.blockNumber - 300)"
-                )
-                raise ValueError(
-                    "No start block provided and no last labeled block found"
-                )
-        elif last_labeled_block is not None:
-            if start_block > last_labeled_block and not args.force:
-                logger.info(
-                    f"Start block is less than last labeled block, using last labeled block: {last_labeled_block}"
-                )
-                logger.info(
-                    f"Use --force to override this and start from the start block: {start_block}"
-                )
-
-                start_block = last_labeled_block
-            else:
-                logger.info(f"Using start block: {start_block}")
-        else:
-            logger.info(f"Using start block: {start_block}")
+        start_block, end_block = _historical_crawl_block_range(
+            args,
+            blockchain_type,
+            filtered_event_jobs,
+            filtered_function_call_jobs,
+            start_block,
+            end_block,
+            last_labeled_block,
+        )
 
-        if start_block < end_block:
-            raise ValueError(
-                f"Start block {start_block} is less than end block {end_block}. This crawler crawls in the reverse direction."
+        if args.shards > 1:
+            sharded_historical_crawler(
+                blockchain_type,
+                filtered_event_jobs,  # type: ignore
+                filtered_function_call_jobs,  # type: ignore
+                start_block,
+                end_block,
+                args.shards,
+                args.checkpoint_dir,
+                args.max_blocks_batch,
+                args.min_sleep_time,
+                web3_uri=args.web3 if args.web3 is not None else args.web3_uri,
+                restart=args.force,
+                addresses_deployment_blocks=addresses_deployment_blocks,
             )
+            return
 
         historical_crawler(
             db_session,
@@ -604,13 +771,23 @@ def handle_historical_crawl_v3(args: argparse.Namespace) -> None:
                 logger.info("Using PoA middleware")
                 web3.middleware_onion.inject(geth_poa_middleware, layer=0)
 
-        last_labeled_block = get_first_labeled_block_number(
+        last_labeled_block = _get_checkpoint_block(
             db_session,
             blockchain_type,
-            args.address,
-            only_events=args.only_events,
+            "historical_v3",
+            filtered_event_jobs,
+            filtered_function_call_jobs,
+            instance=args.customer_uuid,
             db_version=3,
         )
+        if last_labeled_block is None:
+            last_labeled_block = get_first_labeled_block_number(
+                db_session,
+                blockchain_type,
+                args.address,
+                only_events=args.only_events,
+                db_version=3,
+            )
         logger.info(f"Last labeled block: {last_labeled_block}")
 
         addresses_deployment_blocks = None
@@ -640,37 +817,34 @@ def handle_historical_crawl_v3(args: argparse.Namespace) -> None:
                 return
             end_block = min(addresses_deployment_blocks.values())
 
-        if start_block is None:
-            logger.info("No start block provided")
-            if last_labeled_block is not None:
-                start_block = last_labeled_block
-                logger.info(f"Using last labeled block as start: {start_block}")
-            else:
-                logger.info(
-                    "No last labeled block found, using  start block (web3.eth.blockNumber - 300)"
-                )
-                raise ValueError(
-                    "No start block provided and no last labeled block found"
-                )
-        elif last_labeled_block is not None:
-            if start_block > last_labeled_block and not args.force:
-                logger.info(
-                    f"Start block is less than last labeled block, using last labeled block: {last_labeled_block}"
-                )
-                logger.info(
-                    f"Use --force to override this and start from the start block: {start_block}"
-                )
-
-                start_block = last_labeled_block
-            else:
-                logger.info(f"Using start block: {start_block}")
-        else:
-            logger.info(f"Using start block: {start_block}")
+        start_block, end_block = _historical_crawl_block_range(
+            args,
+            blockchain_type,
+            filtered_event_jobs,
+            filtered_function_call_jobs,
+            start_block,
+            end_block,
+            last_labeled_block,
+        )
 
-        if start_block < end_block:
-            raise ValueError(
-                f"Start block {start_block} is less than end block {end_block}. This crawler crawls in the reverse direction."
+        if args.shards > 1:
+            sharded_historical_crawler(
+                blockchain_type,
+                filtered_event_jobs,  # type: ignore
+                filtered_function_call_jobs,  # type: ignore
+                start_block,
+                end_block,
+                args.shards,
+                args.checkpoint_dir,
+                args.max_blocks_batch,
+                args.min_sleep_time,
+                web3_uri=args.web3 if args.web3 is not None else args.web3_uri,
+                version=3,
+                customer_db_uri=customer_connection,
+                restart=args.force,
+                addresses_deployment_blocks=addresses_deployment_blocks,
             )
+            return
 
         historical_crawler(
             db_session,
@@ -685,6 +859,7 @@ def handle_historical_crawl_v3(args: argparse.Namespace) -> None:
             web3_uri=args.web3_uri,
             addresses_deployment_blocks=addresses_deployment_blocks,
             version=3,
+            customer_id=args.customer_uuid,
         )
 
 
@@ -791,6 +966,20 @@ def main() -> None:
         help="Force start from the start block",
     )
 
+    crawl_parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        default=False,
+        help="Overlap node requests, decoding and database writes of consecutive batches",
+    )
+
+    crawl_parser.add_argument(
+        "--pipeline-queue-size",
+        type=int,
+        default=2,
+        help="Maximum number of batches waiting between pipeline stages",
+    )
+
     crawl_parser.set_defaults(func=handle_crawl)
 
     crawl_parser_v3 = subparsers.add_parser(
@@ -888,6 +1077,20 @@ def main() -> None:
         help="Force start from the start block",
     )
 
+    crawl_parser_v3.add_argument(
+        "--pipelined",
+        action="store_true",
+        default=False,
+        help="Overlap node requests, decoding and database writes of consecutive batches",
+    )
+
+    crawl_parser_v3.add_argument(
+        "--pipeline-queue-size",
+        type=int,
+        default=2,
+        help="Maximum number of batches waiting between pipeline stages",
+    )
+
     crawl_parser_v3.add_argument(
         "--customer-uuid",
         type=UUID,
@@ -964,7 +1167,7 @@ def main() -> None:
         "--force",
         action="store_true",
         default=False,
-        help="Force start from the start block",
+        help="Force start from the start block, drops checkpoints of sharded crawl",
     )
     historical_crawl_parser.add_argument(
         "--only-events",
@@ -978,6 +1181,18 @@ def main() -> None:
         default=False,
         help="Only crawl function calls",
     )
+    historical_crawl_parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Split block range into shards and crawl them in parallel processes. Killed crawl is resumed from its checkpoints when rerun with the same arguments",
+    )
+    historical_crawl_parser.add_argument(
+        "--checkpoint-dir",
+        type=str,
+        default=MOONSTREAM_HISTORICAL_CRAWL_CHECKPOINT_DIR,
+        help="Persistent directory for sharded crawl checkpoints, used to resume killed crawl",
+    )
     historical_crawl_parser.add_argument(
         "--find-deployed-blocks",
         action="store_true",
@@ -1058,7 +1273,7 @@ def main() -> None:
         "--force",
         action="store_true",
         default=False,
-        help="Force start from the start block",
+        help="Force start from the start block, drops checkpoints of sharded crawl",
     )
 
     historical_crawl_parser_v3.add_argument(
@@ -1075,6 +1290,18 @@ def main() -> None:
         help="Only crawl function calls",
     )
 
+    historical_crawl_parser_v3.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Split block range into shards and crawl them in parallel processes. Killed crawl is resumed from its checkpoints when rerun with the same arguments",
+    )
+    historical_crawl_parser_v3.add_argument(
+        "--checkpoint-dir",
+        type=str,
+        default=MOONSTREAM_HISTORICAL_CRAWL_CHECKPOINT_DIR,
+        help="Persistent directory for sharded crawl checkpoints, used to resume killed crawl",
+    )
     historical_crawl_parser_v3.add_argument(
         "--find-deployed-blocks",
         action="store_true",
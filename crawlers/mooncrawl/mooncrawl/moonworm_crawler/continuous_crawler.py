@@ -1,37 +1,44 @@
 import logging
+import queue
+import threading
 import time
 import traceback
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional
 
 
 from moonstreamtypes.blockchain import AvailableBlockchainType
-from moonstreamtypes.subscriptions import blockchain_type_to_subscription_type
 from moonstreamtypes.networks import blockchain_type_to_network_type
 from moonworm.crawler.moonstream_ethereum_state_provider import (  # type: ignore
     MoonstreamEthereumStateProvider,
 )
 from moonworm.crawler.ethereum_state_provider import Web3StateProvider
+from moonworm.crawler.function_call_crawler import ContractFunctionCall  # type: ignore
 from sqlalchemy.orm.session import Session
 from web3 import Web3
 
+from .block_timestamps import BlockTimestampsResolver
 from .crawler import (
     EventCrawlJob,
     FunctionCallCrawlJob,
     _retry_connect_web3,
-    get_crawl_job_entries,
     heartbeat,
-    make_event_crawl_jobs,
-    make_function_call_crawl_jobs,
-    merge_event_crawl_jobs,
-    merge_function_call_crawl_jobs,
-    moonworm_crawler_update_job_as_pickedup,
-    get_event_crawl_job_records,
-    get_function_call_crawl_job_records,
 )
-from .db import add_events_to_session, add_function_calls_to_session, commit_session
-from .event_crawler import _crawl_events
+from .db import (
+    add_crawler_checkpoint_to_session,
+    add_events_to_session,
+    add_function_calls_to_session,
+    commit_session,
+)
+from .event_crawler import (
+    Event,
+    _crawl_events,
+    _fetch_raw_events,
+    _raw_events_to_events,
+)
 from .function_call_crawler import _crawl_functions
+from .jobs_registry import CrawlJobsRegistry
 from ..settings import CRAWLER_LABEL, SEER_CRAWLER_LABEL
 
 logging.basicConfig(level=logging.INFO)
@@ -42,53 +49,65 @@ def _date_to_str(date: datetime) -> str:
     return date.strftime("%Y-%m-%d %H:%M:%S")
 
 
-def _refetch_new_jobs(
-    old_event_jobs: List[EventCrawlJob],
-    old_function_call_jobs: List[FunctionCallCrawlJob],
+def _add_batch_to_session(
+    db_session: Session,
+    all_events: List[Event],
+    all_function_calls: List[ContractFunctionCall],
     blockchain_type: AvailableBlockchainType,
-) -> Tuple[List[EventCrawlJob], List[FunctionCallCrawlJob]]:
+    max_insert_batch: int,
+    version: int,
+    label_name: str,
+) -> None:
     """
-    Refetches new jobs from bugout journal, merges, and returns new jobs.
+    Adds crawled events and function calls to session in chunks of max_insert_batch.
     """
-    max_created_at_event_job: Optional[int] = None
-    max_created_at_function_call_job: Optional[int] = None
-    if len(old_event_jobs) != 0:
-        max_created_at_event_job = max(job.created_at for job in old_event_jobs)
-    if len(old_function_call_jobs) != 0:
-        max_created_at_function_call_job = max(
-            job.created_at for job in old_function_call_jobs
+    for i in range(0, len(all_events), max_insert_batch):
+        add_events_to_session(
+            db_session,
+            all_events[i : i + max_insert_batch],
+            blockchain_type,
+            version,
+            label_name,
         )
 
-    logger.info("Looking for new event crawl jobs.")
-    old_event_jobs_length = len(old_event_jobs)
-    new_event_entries = get_crawl_job_entries(
-        subscription_type=blockchain_type_to_subscription_type(blockchain_type),
-        crawler_type="event",
-        created_at_filter=max_created_at_event_job,
-    )
-    new_event_jobs = make_event_crawl_jobs(new_event_entries)
-    event_crawl_jobs = merge_event_crawl_jobs(old_event_jobs, new_event_jobs)
-    logger.info(
-        f"Found {len(event_crawl_jobs) - old_event_jobs_length} new event crawl jobs. "
-    )
+    for i in range(0, len(all_function_calls), max_insert_batch):
+        add_function_calls_to_session(
+            db_session,
+            all_function_calls[i : i + max_insert_batch],
+            blockchain_type,
+            db_version=version,
+            label_name=label_name,
+        )
 
-    logger.info("Looking for new function call crawl jobs.")
-    old_function_call_jobs_length = len(old_function_call_jobs)
-    new_function_entries = get_crawl_job_entries(
-        subscription_type=blockchain_type_to_subscription_type(blockchain_type),
-        crawler_type="function",
-        created_at_filter=max_created_at_function_call_job,
+
+def _send_dead_heartbeat(
+    e: BaseException,
+    crawler_type: str,
+    blockchain_type: AvailableBlockchainType,
+    heartbeat_template: Dict[str, Any],
+) -> None:
+    heartbeat_template["status"] = "dead"
+    heartbeat_template["current_time"] = _date_to_str(datetime.utcnow())
+    error_summary = (repr(e),)
+    error_traceback = (
+        "".join(
+            traceback.format_exception(
+                etype=type(e),
+                value=e,
+                tb=e.__traceback__,
+            )
+        ),
     )
-    new_function_call_jobs = make_function_call_crawl_jobs(new_function_entries)
-    function_call_crawl_jobs = merge_function_call_crawl_jobs(
-        old_function_call_jobs, new_function_call_jobs
+    heartbeat_template["die_reason"] = (
+        f"{e.__class__.__name__}: {e}\n error_summary: {error_summary}\n error_traceback: {error_traceback}"
     )
-    logger.info(
-        f"Found {len(function_call_crawl_jobs) - old_function_call_jobs_length} new function call crawl jobs. "
+    heartbeat(
+        crawler_type=crawler_type,
+        blockchain_type=blockchain_type,
+        crawler_status=heartbeat_template,
+        is_dead=True,
     )
 
-    return event_crawl_jobs, function_call_crawl_jobs
-
 
 def continuous_crawler(
     db_session: Session,
@@ -108,6 +127,7 @@ def continuous_crawler(
     version: int = 2,
     index_db_session: Optional[Session] = None,
     customer_id: Optional[str] = None,
+    blocks_cache: Optional[BlockTimestampsResolver] = None,
 ):
     crawler_type = "continuous"
     if version == 3:
@@ -166,7 +186,16 @@ def continuous_crawler(
         crawler_status=heartbeat_template,
     )
     last_heartbeat_time = datetime.utcnow()
-    blocks_cache: Dict[int, int] = {}
+    if blocks_cache is None:
+        blocks_cache = BlockTimestampsResolver(blockchain_type, version=version)
+    jobs_registry = CrawlJobsRegistry(
+        blockchain_type,
+        event_crawl_jobs,
+        function_call_crawl_jobs,
+        version=version,
+        index_db_session=index_db_session,
+        customer_id=customer_id,
+    )
     current_sleep_time = min_sleep_time
     failed_count = 0
     try:
@@ -190,14 +219,12 @@ def continuous_crawler(
                 logger.info(f"Crawling events from {start_block} to {end_block}")
                 all_events = _crawl_events(
                     db_session=db_session,
-                    blockchain_type=blockchain_type,
                     web3=web3,
-                    jobs=event_crawl_jobs,
+                    jobs=jobs_registry.event_crawl_jobs,
                     from_block=start_block,
                     to_block=end_block,
                     blocks_cache=blocks_cache,
-                    db_block_query_batch=min_blocks_batch * 2,
-                    version=version,
+                    routes=jobs_registry.event_routes,
                 )
                 logger.info(
                     f"Crawled {len(all_events)} events from {start_block} to {end_block}."
@@ -224,7 +251,7 @@ def continuous_crawler(
                 all_function_calls = _crawl_functions(
                     blockchain_type,
                     evm_state_provider,
-                    function_call_crawl_jobs,
+                    jobs_registry.function_call_crawl_jobs,
                     start_block,
                     end_block,
                 )
@@ -251,61 +278,23 @@ def continuous_crawler(
                         label_name=label_name,
                     )
 
+                add_crawler_checkpoint_to_session(
+                    db_session,
+                    blockchain_type,
+                    crawler_type,
+                    jobs_registry.jobs_hash,
+                    end_block,
+                    instance=customer_id,
+                    db_version=version,
+                )
+
                 current_time = datetime.utcnow()
 
                 if current_time - jobs_refetchet_time > timedelta(
                     seconds=new_jobs_refetch_interval
                 ):
-                    if version == 2:
-                        ## Refetch new jobs from bugout journal
-                        logger.info(
-                            f"Refetching new jobs from bugout journal since {jobs_refetchet_time}"
-                        )
-                        event_crawl_jobs, function_call_crawl_jobs = _refetch_new_jobs(
-                            event_crawl_jobs, function_call_crawl_jobs, blockchain_type
-                        )
-
-                        (
-                            event_crawl_jobs,
-                            function_call_crawl_jobs,
-                        ) = moonworm_crawler_update_job_as_pickedup(
-                            event_crawl_jobs=event_crawl_jobs,
-                            function_call_crawl_jobs=function_call_crawl_jobs,
-                        )
-                    elif version == 3 and index_db_session is not None:
-                        ## Refetch new jobs from index db
-
-                        updated_event_crawl_jobs = get_event_crawl_job_records(
-                            index_db_session,
-                            blockchain_type,
-                            [],
-                            {event.event_abi_hash: event for event in event_crawl_jobs},
-                            customer_id=customer_id,
-                        )
-
-                        event_crawl_jobs = [
-                            event for event in updated_event_crawl_jobs.values()
-                        ]
-
-                        updated_function_call_crawl_jobs = (
-                            get_function_call_crawl_job_records(
-                                index_db_session,
-                                blockchain_type,
-                                [],
-                                {
-                                    function_call.contract_address: function_call
-                                    for function_call in function_call_crawl_jobs
-                                },
-                                customer_id=customer_id,
-                            )
-                        )
-
-                        function_call_crawl_jobs = [
-                            function_call
-                            for function_call in updated_function_call_crawl_jobs.values()
-                        ]
-                    else:
-                        raise ValueError("Invalid version")
+                    logger.info(f"Refetching new jobs since {jobs_refetchet_time}")
+                    jobs_registry.refresh()
 
                     jobs_refetchet_time = current_time
 
@@ -318,13 +307,13 @@ def continuous_crawler(
                     heartbeat_template["last_block"] = end_block
                     heartbeat_template["current_time"] = _date_to_str(current_time)
                     heartbeat_template["current_event_jobs_length"] = len(
-                        event_crawl_jobs
+                        jobs_registry.event_crawl_jobs
                     )
                     heartbeat_template["jobs_last_refetched_at"] = _date_to_str(
                         jobs_refetchet_time
                     )
                     heartbeat_template["current_function_call_jobs_length"] = len(
-                        function_call_crawl_jobs
+                        jobs_registry.function_call_crawl_jobs
                     )
                     heartbeat_template["function_call metrics"] = (
                         evm_state_provider.metrics
@@ -356,30 +345,451 @@ def continuous_crawler(
 
     except BaseException as e:
         logger.error(f"!!!!Crawler Died!!!!")
-        heartbeat_template["status"] = "dead"
-        heartbeat_template["current_time"] = _date_to_str(datetime.utcnow())
-        heartbeat_template["current_event_jobs_length"] = len(event_crawl_jobs)
+        heartbeat_template["current_event_jobs_length"] = len(
+            jobs_registry.event_crawl_jobs
+        )
         heartbeat_template["jobs_last_refetched_at"] = _date_to_str(jobs_refetchet_time)
-        error_summary = (repr(e),)
-        error_traceback = (
-            "".join(
-                traceback.format_exception(
-                    etype=type(e),
-                    value=e,
-                    tb=e.__traceback__,
+        heartbeat_template["last_block"] = start_block
+        _send_dead_heartbeat(e, crawler_type, blockchain_type, heartbeat_template)
+
+        logger.exception(e)
+        raise e
+
+
+@dataclass
+class _PipelineBatch:
+    from_block: int
+    to_block: int
+    raw_events: List[Dict[str, Any]]
+    function_calls: List[ContractFunctionCall]
+    jobs_hash: str
+    events: List[Event] = field(default_factory=list)
+
+
+@dataclass
+class _PipelineState:
+    """
+    State shared between pipeline stages.
+
+    Jobs registry is refreshed and read by the fetch stage only, other stages
+    read jobs counts for heartbeat.
+    """
+
+    jobs_registry: CrawlJobsRegistry
+    new_jobs_refetch_interval: float
+    jobs_refetched_at: datetime = field(default_factory=datetime.utcnow)
+    stop_event: threading.Event = field(default_factory=threading.Event)
+    errors: "queue.Queue[BaseException]" = field(default_factory=queue.Queue)
+
+
+def _put_with_backpressure(
+    target_queue: "queue.Queue[_PipelineBatch]",
+    batch: _PipelineBatch,
+    stop_event: threading.Event,
+) -> bool:
+    """
+    Blocks until the next stage has room for the batch or the pipeline is stopped.
+    """
+    while not stop_event.is_set():
+        try:
+            target_queue.put(batch, timeout=1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get_or_stop(
+    source_queue: "queue.Queue[_PipelineBatch]",
+    stop_event: threading.Event,
+) -> Optional[_PipelineBatch]:
+    while not stop_event.is_set():
+        try:
+            return source_queue.get(timeout=1)
+        except queue.Empty:
+            continue
+    return None
+
+
+def _pipeline_fetch_stage(
+    state: _PipelineState,
+    output_queue: "queue.Queue[_PipelineBatch]",
+    blockchain_type: AvailableBlockchainType,
+    web3: Web3,
+    start_block: int,
+    max_blocks_batch: int,
+    min_blocks_batch: int,
+    confirmations: int,
+    min_sleep_time: float,
+    web3_uri: Optional[str] = None,
+) -> None:
+    """
+    Fetches logs and function calls from the node for consecutive block ranges
+    and refreshes crawl jobs between them.
+    """
+    jobs_registry = state.jobs_registry
+    current_sleep_time = min_sleep_time
+    failed_count = 0
+    while not state.stop_event.is_set():
+        try:
+            time.sleep(current_sleep_time)
+
+            end_block = min(
+                web3.eth.blockNumber - confirmations,
+                start_block + max_blocks_batch,
+            )
+
+            if start_block + min_blocks_batch > end_block:
+                current_sleep_time += 0.1
+                logger.info(
+                    f"Sleeping for {current_sleep_time} seconds because of low block count"
                 )
-            ),
-        )
-        heartbeat_template["die_reason"] = (
-            f"{e.__class__.__name__}: {e}\n error_summary: {error_summary}\n error_traceback: {error_traceback}"
+                continue
+            current_sleep_time = max(min_sleep_time, current_sleep_time - 0.1)
+
+            current_time = datetime.utcnow()
+            if current_time - state.jobs_refetched_at > timedelta(
+                seconds=state.new_jobs_refetch_interval
+            ):
+                logger.info(f"Refetching new jobs since {state.jobs_refetched_at}")
+                try:
+                    jobs_registry.refresh()
+                except Exception as e:
+                    logger.error(f"Failed to refetch jobs: {e}")
+                state.jobs_refetched_at = current_time
+
+            event_crawl_jobs = jobs_registry.event_crawl_jobs
+            function_call_crawl_jobs = jobs_registry.function_call_crawl_jobs
+
+            logger.info(f"Fetching events from {start_block} to {end_block}")
+            raw_events = _fetch_raw_events(
+                web3,
+                event_crawl_jobs,
+                start_block,
+                end_block,
+                routes=jobs_registry.event_routes,
+            )
+
+            logger.info(f"Fetching function calls from {start_block} to {end_block}")
+            function_calls = _crawl_functions(
+                blockchain_type,
+                Web3StateProvider(web3),
+                function_call_crawl_jobs,
+                start_block,
+                end_block,
+            )
+
+            batch = _PipelineBatch(
+                from_block=start_block,
+                to_block=end_block,
+                raw_events=raw_events,
+                function_calls=function_calls,
+                jobs_hash=jobs_registry.jobs_hash,
+            )
+            if not _put_with_backpressure(output_queue, batch, state.stop_event):
+                return
+
+            start_block = end_block + 1
+            failed_count = 0
+        except Exception as e:
+            logger.error(f"Fetch stage error: {e}")
+            logger.exception(e)
+            failed_count += 1
+            try:
+                if failed_count > 10:
+                    raise e
+                web3 = _retry_connect_web3(blockchain_type, web3_uri=web3_uri)
+            except Exception as err:
+                state.errors.put(err)
+                state.stop_event.set()
+                return
+
+
+def _pipeline_decode_stage(
+    state: _PipelineState,
+    input_queue: "queue.Queue[_PipelineBatch]",
+    output_queue: "queue.Queue[_PipelineBatch]",
+    db_session: Optional[Session],
+    blockchain_type: AvailableBlockchainType,
+    web3: Web3,
+    blocks_cache: BlockTimestampsResolver,
+    web3_uri: Optional[str] = None,
+) -> None:
+    """
+    Resolves block timestamps and builds Event objects for fetched batches.
+    """
+    failed_count = 0
+    while not state.stop_event.is_set():
+        batch = _get_or_stop(input_queue, state.stop_event)
+        if batch is None:
+            return
+        while not state.stop_event.is_set():
+            try:
+                batch.events = _raw_events_to_events(
+                    db_session,
+                    web3,
+                    batch.raw_events,
+                    blocks_cache,
+                )
+                failed_count = 0
+                break
+            except Exception as e:
+                if db_session is not None:
+                    db_session.rollback()
+                logger.error(f"Decode stage error: {e}")
+                logger.exception(e)
+                failed_count += 1
+                try:
+                    if failed_count > 10:
+                        raise e
+                    web3 = _retry_connect_web3(blockchain_type, web3_uri=web3_uri)
+                except Exception as err:
+                    state.errors.put(err)
+                    state.stop_event.set()
+                    return
+
+        if not _put_with_backpressure(output_queue, batch, state.stop_event):
+            return
+
+
+def pipelined_continuous_crawler(
+    db_session: Session,
+    blockchain_type: AvailableBlockchainType,
+    web3: Optional[Web3],
+    event_crawl_jobs: List[EventCrawlJob],
+    function_call_crawl_jobs: List[FunctionCallCrawlJob],
+    start_block: int,
+    max_blocks_batch: int = 100,
+    min_blocks_batch: int = 40,
+    confirmations: int = 60,
+    min_sleep_time: float = 0.1,
+    heartbeat_interval: float = 60,
+    new_jobs_refetch_interval: float = 120,
+    web3_uri: Optional[str] = None,
+    max_insert_batch: int = 10000,
+    version: int = 2,
+    index_db_session: Optional[Session] = None,
+    customer_id: Optional[str] = None,
+    decode_db_session: Optional[Session] = None,
+    pipeline_queue_size: int = 2,
+    blocks_cache: Optional[BlockTimestampsResolver] = None,
+):
+    """
+    Continuous crawler which overlaps node requests, decoding and database writes.
+
+    Block range N+1 is fetched from the node while range N is decoded and range N-1
+    is written to the database. Stages are connected with bounded queues of
+    pipeline_queue_size batches, so a slow writer throttles the fetcher.
+
+    Stages:
+    - fetch (thread): jobs refetch, eth_getLogs for event jobs and function calls crawl
+    - decode (thread): block timestamps resolution with decode_db_session
+        (if it is not provided, timestamps are taken from the node)
+    - write (current thread): labels insert, commit and heartbeat
+
+    Function calls are crawled with Web3StateProvider, because db_session belongs
+    to the write stage and can not be shared between threads.
+
+    Crawler checkpoint is saved in the same transaction as labels of every batch.
+    """
+    crawler_type = "continuous"
+    if version == 3:
+        crawler_type = "continuous_v3"
+
+    label_name = CRAWLER_LABEL
+    if version == 3:
+        label_name = SEER_CRAWLER_LABEL
+    assert (
+        min_blocks_batch < max_blocks_batch
+    ), "min_blocks_batch must be less than max_blocks_batch"
+    assert min_blocks_batch > 0, "min_blocks_batch must be greater than 0"
+    assert max_blocks_batch > 0, "max_blocks_batch must be greater than 0"
+    assert min_sleep_time > 0, "min_sleep_time must be greater than 0"
+    assert heartbeat_interval > 0, "heartbeat_interval must be greater than 0"
+    assert (
+        new_jobs_refetch_interval > 0
+    ), "new_jobs_refetch_interval must be greater than 0"
+    assert pipeline_queue_size > 0, "pipeline_queue_size must be greater than 0"
+
+    crawl_start_time = datetime.utcnow()
+
+    jobs_refetchet_time = crawl_start_time
+    if web3 is None:
+        web3 = _retry_connect_web3(blockchain_type, web3_uri=web3_uri)
+
+    if blocks_cache is None:
+        blocks_cache = BlockTimestampsResolver(blockchain_type, version=version)
+
+    state = _PipelineState(
+        jobs_registry=CrawlJobsRegistry(
+            blockchain_type,
+            event_crawl_jobs,
+            function_call_crawl_jobs,
+            version=version,
+            index_db_session=index_db_session,
+            customer_id=customer_id,
+        ),
+        new_jobs_refetch_interval=new_jobs_refetch_interval,
+        jobs_refetched_at=jobs_refetchet_time,
+    )
+    decode_queue: "queue.Queue[_PipelineBatch]" = queue.Queue(
+        maxsize=pipeline_queue_size
+    )
+    write_queue: "queue.Queue[_PipelineBatch]" = queue.Queue(
+        maxsize=pipeline_queue_size
+    )
+
+    heartbeat_template = {
+        "status": "crawling",
+        "mode": "pipelined",
+        "start_block": start_block,
+        "last_block": start_block,
+        "crawl_start_time": _date_to_str(crawl_start_time),
+        "current_time": _date_to_str(crawl_start_time),
+        "current_event_jobs_length": len(event_crawl_jobs),
+        "current_function_call_jobs_length": len(function_call_crawl_jobs),
+        "jobs_last_refetched_at": _date_to_str(jobs_refetchet_time),
+    }
+
+    logger.info(
+        f"Starting pipelined continuous event crawler start_block={start_block}"
+    )
+    logger.info("Sending initial heartbeat")
+    heartbeat(
+        crawler_type=crawler_type,
+        blockchain_type=blockchain_type,
+        crawler_status=heartbeat_template,
+    )
+    last_heartbeat_time = datetime.utcnow()
+
+    stages = [
+        threading.Thread(
+            target=_pipeline_fetch_stage,
+            name="crawler-fetch",
+            kwargs={
+                "state": state,
+                "output_queue": decode_queue,
+                "blockchain_type": blockchain_type,
+                "web3": web3,
+                "start_block": start_block,
+                "max_blocks_batch": max_blocks_batch,
+                "min_blocks_batch": min_blocks_batch,
+                "confirmations": confirmations,
+                "min_sleep_time": min_sleep_time,
+                "web3_uri": web3_uri,
+            },
+            daemon=True,
+        ),
+        threading.Thread(
+            target=_pipeline_decode_stage,
+            name="crawler-decode",
+            kwargs={
+                "state": state,
+                "input_queue": decode_queue,
+                "output_queue": write_queue,
+                "db_session": decode_db_session,
+                "blockchain_type": blockchain_type,
+                "web3": web3,
+                "blocks_cache": blocks_cache,
+                "web3_uri": web3_uri,
+            },
+            daemon=True,
+        ),
+    ]
+    for stage in stages:
+        stage.start()
+
+    last_block = start_block - 1
+    failed_count = 0
+    try:
+        while True:
+            if not state.errors.empty():
+                raise state.errors.get()
+
+            batch = _get_or_stop(write_queue, state.stop_event)
+            if batch is None:
+                continue
+
+            while True:
+                try:
+                    _add_batch_to_session(
+                        db_session,
+                        batch.events,
+                        batch.function_calls,
+                        blockchain_type,
+                        max_insert_batch,
+                        version,
+                        label_name,
+                    )
+                    add_crawler_checkpoint_to_session(
+                        db_session,
+                        blockchain_type,
+                        crawler_type,
+                        batch.jobs_hash,
+                        batch.to_block,
+                        instance=customer_id,
+                        db_version=version,
+                    )
+                    commit_session(db_session)
+                    failed_count = 0
+                    break
+                except Exception as e:
+                    db_session.rollback()
+                    logger.error(f"Write stage error: {e}")
+                    logger.exception(e)
+                    failed_count += 1
+                    if failed_count > 10:
+                        logger.error("Too many failures, exiting")
+                        raise e
+                    time.sleep(min_sleep_time)
+
+            logger.info(
+                f"Saved {len(batch.events)} events and {len(batch.function_calls)} function calls "
+                f"from {batch.from_block} to {batch.to_block}. "
+                f"Queues: decode={decode_queue.qsize()}, write={write_queue.qsize()}"
+            )
+            last_block = batch.to_block
+
+            current_time = datetime.utcnow()
+
+            if current_time - last_heartbeat_time > timedelta(
+                seconds=heartbeat_interval
+            ):
+                # Update heartbeat
+                heartbeat_template["last_block"] = last_block
+                heartbeat_template["current_time"] = _date_to_str(current_time)
+                heartbeat_template["current_event_jobs_length"] = len(
+                    state.jobs_registry.event_crawl_jobs
+                )
+                heartbeat_template["jobs_last_refetched_at"] = _date_to_str(
+                    state.jobs_refetched_at
+                )
+                heartbeat_template["current_function_call_jobs_length"] = len(
+                    state.jobs_registry.function_call_crawl_jobs
+                )
+                heartbeat_template["decode_queue_size"] = decode_queue.qsize()
+                heartbeat_template["write_queue_size"] = write_queue.qsize()
+                heartbeat(
+                    crawler_type=crawler_type,
+                    blockchain_type=blockchain_type,
+                    crawler_status=heartbeat_template,
+                )
+                logger.info("Sending heartbeat.", heartbeat_template)
+                last_heartbeat_time = datetime.utcnow()
+
+    except BaseException as e:
+        logger.error(f"!!!!Crawler Died!!!!")
+        state.stop_event.set()
+        for stage in stages:
+            stage.join(timeout=5)
+        heartbeat_template["current_event_jobs_length"] = len(
+            state.jobs_registry.event_crawl_jobs
         )
-        heartbeat_template["last_block"] = end_block
-        heartbeat(
-            crawler_type=crawler_type,
-            blockchain_type=blockchain_type,
-            crawler_status=heartbeat_template,
-            is_dead=True,
+        heartbeat_template["jobs_last_refetched_at"] = _date_to_str(
+            state.jobs_refetched_at
         )
+        heartbeat_template["last_block"] = last_block
+        _send_dead_heartbeat(e, crawler_type, blockchain_type, heartbeat_template)
 
         logger.exception(e)
         raise e
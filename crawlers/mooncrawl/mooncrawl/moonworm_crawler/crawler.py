@@ -1,3 +1,4 @@
+import hashlib
 import json
 from hexbytes import HexBytes
 import logging
@@ -18,7 +19,7 @@ from moonstreamtypes.subscriptions import SubscriptionTypes
 from moonstreamdbv3.models_indexes import AbiJobs
 from moonworm.deployment import find_deployment_block  # type: ignore
 from sqlalchemy import func, cast as sqlcast, JSON
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Query, Session
 from web3.main import Web3
 
 from ..blockchain import connect
@@ -143,6 +144,29 @@ class FunctionCallCrawlJob:
     existing_selectors: List[str] = field(default_factory=list)
 
 
+def crawl_jobs_hash(
+    event_crawl_jobs: List[EventCrawlJob],
+    function_call_crawl_jobs: List[FunctionCallCrawlJob],
+) -> str:
+    """
+    Stable hash of the set of crawl jobs (ABI hashes and addresses),
+    used as a key for crawl checkpoints.
+    """
+    jobs_set = {
+        "events": sorted(
+            f"{job.event_abi_hash}:{address}"
+            for job in event_crawl_jobs
+            for address in job.contracts
+        ),
+        "functions": sorted(
+            f"{job.contract_address}:{encode_function_signature(function_abi)}"
+            for job in function_call_crawl_jobs
+            for function_abi in job.contract_abi
+        ),
+    }
+    return hashlib.md5(json.dumps(jobs_set).encode("utf-8")).hexdigest()
+
+
 def get_crawl_job_entries(
     subscription_type: SubscriptionTypes,
     crawler_type: str,
@@ -700,19 +724,17 @@ def add_progress_to_tags(
     return entries_tags_delete, entries_tags_add
 
 
-def get_event_crawl_job_records(
+def event_crawl_job_records_query(
     db_session: Session,
     blockchain_type: AvailableBlockchainType,
-    addresses: List[str],
-    existing_crawl_job_records: Dict[str, EventCrawlJob],
     customer_id: Optional[str] = None,
-):
+    entities: Optional[List[Any]] = None,
+) -> Query:
     """
-    Retrieve and update the event crawl job records from the database.
+    Query of event crawl job records, returns AbiJobs rows or the given entities.
     """
-
     query = (
-        db_session.query(AbiJobs)
+        db_session.query(*(entities if entities else [AbiJobs]))
         .filter(AbiJobs.chain == blockchain_type.value)
         .filter(func.cast(AbiJobs.abi, JSON).op("->>")("type") == "event")
     )
@@ -720,6 +742,48 @@ def get_event_crawl_job_records(
     if customer_id is not None:
         query = query.filter(AbiJobs.customer_id == customer_id)
 
+    return query
+
+
+def function_call_crawl_job_records_query(
+    db_session: Session,
+    blockchain_type: AvailableBlockchainType,
+    customer_id: Optional[str] = None,
+    entities: Optional[List[Any]] = None,
+) -> Query:
+    """
+    Query of function call crawl job records, returns AbiJobs rows or the given entities.
+    """
+    # Query AbiJobs where the abi_selector is exactly 8 characters long.
+    query = (
+        db_session.query(*(entities if entities else [AbiJobs]))
+        .filter(AbiJobs.chain == blockchain_type.value)
+        .filter(func.length(AbiJobs.abi_selector) == 10)
+        .filter(
+            sqlcast(AbiJobs.abi, JSON).op("->>")("type") == "function",
+            sqlcast(AbiJobs.abi, JSON).op("->>")("stateMutability") != "view",
+        )
+    )
+
+    if customer_id is not None:
+        query = query.filter(AbiJobs.customer_id == customer_id)
+
+    return query
+
+
+def get_event_crawl_job_records(
+    db_session: Session,
+    blockchain_type: AvailableBlockchainType,
+    addresses: List[str],
+    existing_crawl_job_records: Dict[str, EventCrawlJob],
+    customer_id: Optional[str] = None,
+):
+    """
+    Retrieve and update the event crawl job records from the database.
+    """
+
+    query = event_crawl_job_records_query(db_session, blockchain_type, customer_id)
+
     if len(addresses) != 0:
         query = query.filter(
             AbiJobs.address.in_([HexBytes(address) for address in addresses])
@@ -779,20 +843,10 @@ def get_function_call_crawl_job_records(
     Retrieve and update the function call crawl job records from the database.
     """
 
-    # Query AbiJobs where the abi_selector is exactly 8 characters long.
-    query = (
-        db_session.query(AbiJobs)
-        .filter(AbiJobs.chain == blockchain_type.value)
-        .filter(func.length(AbiJobs.abi_selector) == 10)
-        .filter(
-            sqlcast(AbiJobs.abi, JSON).op("->>")("type") == "function",
-            sqlcast(AbiJobs.abi, JSON).op("->>")("stateMutability") != "view",
-        )
+    query = function_call_crawl_job_records_query(
+        db_session, blockchain_type, customer_id
     )
 
-    if customer_id is not None:
-        query = query.filter(AbiJobs.customer_id == customer_id)
-
     if len(addresses) != 0:
         query = query.filter(
             AbiJobs.address.in_([binascii.unhexlify(address) for address in addresses])
@@ -3,14 +3,16 @@ import logging
 from hexbytes import HexBytes
 from typing import Dict, List, Optional, Union, Any
 
-from moonstreamdb.models import Base
+from moonstreamdb.models import CrawlerCheckpoint as CrawlerCheckpointV2
+from moonstreamdbv3.models import CrawlerCheckpoint as CrawlerCheckpointV3
 from moonstreamtypes.blockchain import AvailableBlockchainType, get_label_model
 from moonworm.crawler.function_call_crawler import ContractFunctionCall  # type: ignore
 from sqlalchemy import Integer, String, column, exists, func, select, text, values
-from sqlalchemy.orm import Session
 from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
 
 
+from ..labels_copy import copy_labels
 from ..settings import CRAWLER_LABEL
 from .event_crawler import Event
 
@@ -23,11 +25,10 @@ def _event_to_label(
     event: Event,
     label_name=CRAWLER_LABEL,
     db_version: int = 2,
-) -> Base:  # type: ignore
+) -> Dict[str, Any]:
     """
-    Creates a label model.
+    Creates a label record for copy_labels.
     """
-    label_model = get_label_model(blockchain_type, version=db_version)
     sanityzed_label_data = json.loads(
         json.dumps(
             {
@@ -39,31 +40,34 @@ def _event_to_label(
     )
 
     if db_version == 2:
-        label = label_model(
-            label=label_name,
-            label_data=sanityzed_label_data,
-            address=event.address,
-            block_number=event.block_number,
-            block_timestamp=event.block_timestamp,
-            transaction_hash=event.transaction_hash,
-            log_index=event.log_index,
-        )
+        label = {
+            "label": label_name,
+            "label_data": sanityzed_label_data,
+            "address": event.address,
+            "block_number": event.block_number,
+            "block_timestamp": event.block_timestamp,
+            "transaction_hash": event.transaction_hash,
+            "log_index": event.log_index,
+        }
     else:
 
         del sanityzed_label_data["type"]
         del sanityzed_label_data["name"]
 
-        label = label_model(
-            label=label_name,
-            label_name=event.event_name,
-            label_data=sanityzed_label_data,
-            address=event.address,
-            block_number=event.block_number,
-            block_timestamp=event.block_timestamp,
-            transaction_hash=event.transaction_hash,
-            log_index=event.log_index,
-            block_hash=event.block_hash.hex(),  # type: ignore
-        )
+        label = {
+            "label": label_name,
+            "transaction_hash": event.transaction_hash,
+            "log_index": event.log_index,
+            "block_number": event.block_number,
+            "block_hash": event.block_hash.hex(),  # type: ignore
+            "block_timestamp": event.block_timestamp,
+            "caller_address": None,
+            "origin_address": None,
+            "address": HexBytes(event.address),  # transform to \x00 format on insert
+            "label_name": event.event_name,
+            "label_type": "event",
+            "label_data": sanityzed_label_data,
+        }
 
     return label
 
@@ -73,12 +77,10 @@ def _function_call_to_label(
     function_call: ContractFunctionCall,
     db_version: int = 2,
     label_name=CRAWLER_LABEL,
-) -> Base:  # type: ignore
+) -> Dict[str, Any]:
     """
-    Creates a label model.
+    Creates a label record for copy_labels.
     """
-    label_model = get_label_model(blockchain_type, version=db_version)
-
     sanityzed_label_data = json.loads(
         json.dumps(
             {
@@ -94,32 +96,37 @@ def _function_call_to_label(
 
     if db_version == 2:
 
-        label = label_model(
-            label=label_name,
-            label_data=sanityzed_label_data,
-            address=function_call.contract_address,
-            block_number=function_call.block_number,
-            transaction_hash=function_call.transaction_hash,
-            block_timestamp=function_call.block_timestamp,
-        )
+        label = {
+            "label": label_name,
+            "label_data": sanityzed_label_data,
+            "address": function_call.contract_address,
+            "block_number": function_call.block_number,
+            "transaction_hash": function_call.transaction_hash,
+            "block_timestamp": function_call.block_timestamp,
+            "log_index": None,
+        }
 
     else:
 
         del sanityzed_label_data["type"]
         del sanityzed_label_data["name"]
 
-        label = label_model(
-            label=label_name,
-            label_name=function_call.function_name,
-            label_data=sanityzed_label_data,
-            address=function_call.contract_address,
-            block_number=function_call.block_number,
-            block_hash=function_call.block_hash.hex(),  # type: ignore
-            transaction_hash=function_call.transaction_hash,
-            block_timestamp=function_call.block_timestamp,
-            caller_address=function_call.caller_address,
-            origin_address=function_call.caller_address,
-        )
+        label = {
+            "label": label_name,
+            "transaction_hash": function_call.transaction_hash,
+            "log_index": None,
+            "block_number": function_call.block_number,
+            "block_hash": function_call.block_hash.hex(),  # type: ignore
+            "block_timestamp": function_call.block_timestamp,
+            "caller_address": HexBytes(function_call.caller_address),
+            "origin_address": HexBytes(function_call.caller_address),
+            "address": HexBytes(
+                function_call.contract_address
+            ),  # transform to \x00 format on insert
+            "label_name": function_call.function_name,
+            "label_type": "tx_call",
+            "label_data": sanityzed_label_data,
+        }
 
     return label
 
@@ -179,6 +186,77 @@ def get_first_labeled_block_number(
     return result[0] if result else None
 
 
+def _get_checkpoint_model(db_version: int = 2) -> Any:
+    if db_version == 2:
+        return CrawlerCheckpointV2
+    elif db_version == 3:
+        return CrawlerCheckpointV3
+    raise ValueError(f"Unsupported db version: {db_version}")
+
+
+def get_crawler_checkpoint(
+    db_session: Session,
+    blockchain_type: AvailableBlockchainType,
+    crawler_type: str,
+    jobs_hash: str,
+    instance: Optional[str] = None,
+    db_version: int = 2,
+) -> Optional[int]:
+    """
+    Returns last committed block of crawler for the given jobs set.
+    """
+    checkpoint_model = _get_checkpoint_model(db_version)
+    last_block = (
+        db_session.query(checkpoint_model.last_block)
+        .filter(
+            checkpoint_model.blockchain == blockchain_type.value,
+            checkpoint_model.crawler_type == crawler_type,
+            checkpoint_model.instance == (str(instance) if instance else ""),
+            checkpoint_model.jobs_hash == jobs_hash,
+        )
+        .one_or_none()
+    )
+
+    return last_block[0] if last_block else None
+
+
+def add_crawler_checkpoint_to_session(
+    db_session: Session,
+    blockchain_type: AvailableBlockchainType,
+    crawler_type: str,
+    jobs_hash: str,
+    last_block: int,
+    instance: Optional[str] = None,
+    db_version: int = 2,
+) -> None:
+    """
+    Upserts crawler checkpoint without commit, so it is saved in the same
+    transaction as labels of the batch.
+    """
+    checkpoint_model = _get_checkpoint_model(db_version)
+    insert_statement = insert(checkpoint_model).values(
+        blockchain=blockchain_type.value,
+        crawler_type=crawler_type,
+        instance=str(instance) if instance else "",
+        jobs_hash=jobs_hash,
+        last_block=last_block,
+    )
+    db_session.execute(
+        insert_statement.on_conflict_do_update(
+            index_elements=[
+                checkpoint_model.blockchain,
+                checkpoint_model.crawler_type,
+                checkpoint_model.instance,
+                checkpoint_model.jobs_hash,
+            ],
+            set_={
+                "last_block": insert_statement.excluded.last_block,
+                "updated_at": func.now(),
+            },
+        )
+    )
+
+
 def commit_session(db_session: Session) -> None:
     """
     Save labels in the database.
@@ -245,50 +323,23 @@ def add_events_to_session(
         ]
 
         logger.info(f"Saving {len(labels_to_save)} event labels to session")
-        db_session.add_all(labels_to_save)
+        copy_labels(db_session, label_model, labels_to_save)
 
     else:
 
-        # Define the table name and columns based on the blockchain type
-        table = label_model.__table__
-
-        # Create a list of dictionaries representing new records
-        records = []
-        for event in events:
-
-            label_event = _event_to_label(
-                blockchain_type, event, label_name, db_version
-            )
-
-            record = {
-                "label": label_event.label,
-                "transaction_hash": label_event.transaction_hash,
-                "log_index": label_event.log_index,
-                "block_number": label_event.block_number,
-                "block_hash": label_event.block_hash,
-                "block_timestamp": label_event.block_timestamp,
-                "caller_address": None,
-                "origin_address": None,
-                "address": HexBytes(
-                    label_event.address
-                ),  # transform to \x00 format on insert
-                "label_name": label_event.label_name,
-                "label_type": "event",
-                "label_data": label_event.label_data,
-            }
-
-            records.append(record)
-
-        # Insert records using a single batched query with an ON CONFLICT clause
-        statement = insert(table).values(records)
-        do_nothing_statement = statement.on_conflict_do_nothing(
-            index_elements=["transaction_hash", "log_index"],
-            index_where=(table.c.label == "seer") & (table.c.label_type == "event"),
+        # Unique partial index on (transaction_hash, log_index) skips existing events
+        inserted = copy_labels(
+            db_session,
+            label_model,
+            (
+                _event_to_label(blockchain_type, event, label_name, db_version)
+                for event in events
+            ),
         )
 
-        db_session.execute(do_nothing_statement)
-
-        logger.info(f"Batch inserted {len(records)} event labels into {table.name}")
+        logger.info(
+            f"Batch inserted {inserted} event labels into {label_model.__tablename__}"
+        )
 
 
 def add_function_calls_to_session(
@@ -302,9 +353,9 @@ def add_function_calls_to_session(
     if len(function_calls) == 0:
         return
 
-    if db_version == 2:
+    label_model = get_label_model(blockchain_type, version=db_version)
 
-        label_model = get_label_model(blockchain_type, version=db_version)
+    if db_version == 2:
 
         transactions_hashes_to_save = list(
             set([function_call.transaction_hash for function_call in function_calls])
@@ -328,60 +379,33 @@ def add_function_calls_to_session(
             ),
         )
 
-        existing_tx_hashes = [row.transaction_hash for row in query]
+        existing_tx_hashes = set(row.transaction_hash for row in query)
 
         labels_to_save = [
-            _function_call_to_label(blockchain_type, function_call)
+            _function_call_to_label(
+                blockchain_type, function_call, db_version, label_name
+            )
             for function_call in function_calls
             if function_call.transaction_hash not in existing_tx_hashes
         ]
 
         logger.info(f"Saving {len(labels_to_save)} labels to session")
-        db_session.add_all(labels_to_save)
+        copy_labels(db_session, label_model, labels_to_save)
 
     else:
 
-        label_model = get_label_model(blockchain_type, version=db_version)
-
-        # Define the table name and columns based on the blockchain type
-        table = label_model.__table__
-
-        # Create a list of dictionaries representing new records
-        records = []
-        for function_call in function_calls:
-
-            label_function_call = _function_call_to_label(
-                blockchain_type, function_call, db_version, label_name
-            )
-
-            record = {
-                "label": label_function_call.label,
-                "transaction_hash": label_function_call.transaction_hash,
-                "log_index": None,
-                "block_number": label_function_call.block_number,
-                "block_hash": label_function_call.block_hash,
-                "block_timestamp": label_function_call.block_timestamp,
-                "caller_address": HexBytes(label_function_call.caller_address),
-                "origin_address": HexBytes(label_function_call.caller_address),
-                "address": HexBytes(
-                    label_function_call.address
-                ),  # transform to \x00 format on insert
-                "label_name": label_function_call.label_name,
-                "label_type": "tx_call",
-                "label_data": label_function_call.label_data,
-            }
-
-            records.append(record)
-
-        # Insert records using a single batched query with an ON CONFLICT clause
-        statement = insert(table).values(records)
-        do_nothing_statement = statement.on_conflict_do_nothing(
-            index_elements=["transaction_hash"],
-            index_where=(table.c.label == "seer") & (table.c.label_type == "tx_call"),
+        # Unique partial index on transaction_hash skips existing function calls
+        inserted = copy_labels(
+            db_session,
+            label_model,
+            (
+                _function_call_to_label(
+                    blockchain_type, function_call, db_version, label_name
+                )
+                for function_call in function_calls
+            ),
         )
 
-        db_session.execute(do_nothing_statement)
-
         logger.info(
-            f"Batch inserted {len(records)} function call labels into {table.name}"
+            f"Batch inserted {inserted} function call labels into {label_model.__tablename__}"
         )
@@ -1,21 +1,28 @@
+import json
 import logging
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 
-from moonstreamtypes.blockchain import (
-    AvailableBlockchainType,
-    get_label_model,
-    get_block_model,
-)
+from moonstreamtypes.blockchain import AvailableBlockchainType
 from moonworm.crawler.log_scanner import (  # type: ignore
     _crawl_events as moonworm_autoscale_crawl_events,
 )
+from eth_typing.evm import ChecksumAddress
+from eth_utils import event_abi_to_log_topic
+from moonworm.crawler.function_call_crawler import utfy_dict  # type: ignore
 from moonworm.crawler.log_scanner import _fetch_events_chunk  # type: ignore
 from sqlalchemy.orm.session import Session
-from sqlalchemy.sql.expression import and_
 from web3 import Web3
+from web3._utils.events import get_event_data
+from web3.types import LogReceipt
 
+from ..settings import (
+    MOONSTREAM_CRAWLER_GET_LOGS_MAX_ADDRESSES,
+    MOONSTREAM_CRAWLER_GET_LOGS_MAX_TOPICS,
+)
+from .block_timestamps import BlockTimestampsResolver
 from .crawler import EventCrawlJob
 
 logging.basicConfig(level=logging.INFO)
@@ -34,153 +41,282 @@ class Event:
     block_hash: Optional[str] = None
 
 
-def _get_block_timestamp_from_web3(
-    web3: Web3,
-    block_number: int,
-) -> int:
+def _event_abi_topic(event_abi: Dict[str, Any]) -> Optional[str]:
     """
-    Gets the timestamp of a block from the blockchain.
-    will raise an exception if the block is not found.
+    Returns topic0 of the event or None for anonymous events.
     """
-    return web3.eth.getBlock(block_number).timestamp
+    if event_abi.get("anonymous", False):
+        return None
+    return Web3.toHex(event_abi_to_log_topic(event_abi))
 
 
-# I am using blocks_cache as the argument, to reuse this function in tx_call crawler
-# and support one cashe for both tx_call and event_crawler
-def get_block_timestamp(
-    db_session: Session,
-    web3: Web3,
-    blockchain_type: AvailableBlockchainType,
-    block_number: int,
-    blocks_cache: Dict[int, int],
-    max_blocks_batch: int = 30,
-    version: int = 2,
-) -> int:
+@dataclass
+class EventRoutes:
     """
-    Get the timestamp of a block.
-    First tries to get the block from the cache,
-    then tries to get the block from the db,
-    then tries to get it from the blockchain.
-
-    After the call cache is updated.
-    If the cache grows too large, it is cleared.
-
-    :param block_number: The block number.
-    :param max_blocks_batch: The maximum number of blocks to fetch in a single batch from db query.
-    :param blocks_cache: The cache of blocks.
-    :return: The timestamp of the block.
+    Routing index of event crawl jobs for multiplexed eth_getLogs requests:
+    topic0 to jobs with their address sets, union of watched addresses, topics
+    with jobs watching any address and anonymous event jobs (they have no topic0
+    and are fetched per job).
+
+    Could be updated in place when jobs change: remove_job before the job
+    contracts are modified and add_job after it.
     """
 
-    if version != 2:
-        if block_number in blocks_cache:
-            return blocks_cache[block_number]
-        target_block_timestamp = _get_block_timestamp_from_web3(web3, block_number)
-        blocks_cache[block_number] = target_block_timestamp
-        return target_block_timestamp
+    topics: Dict[str, List[Tuple[EventCrawlJob, Set[ChecksumAddress]]]] = field(
+        default_factory=dict
+    )
+    address_counts: "Counter[ChecksumAddress]" = field(default_factory=Counter)
+    # topic0 -> number of jobs without contracts, which watch any address
+    any_address_topics: "Counter[str]" = field(default_factory=Counter)
+    anonymous_jobs: List[EventCrawlJob] = field(default_factory=list)
+
+    @classmethod
+    def from_jobs(cls, jobs: List[EventCrawlJob]) -> "EventRoutes":
+        routes = cls()
+        for job in jobs:
+            routes.add_job(job)
+        return routes
 
-    assert max_blocks_batch > 0
+    def add_job(self, job: EventCrawlJob) -> None:
+        topic = _event_abi_topic(job.event_abi)
+        if topic is None:
+            self.anonymous_jobs.append(job)
+            return
 
-    if block_number in blocks_cache:
-        return blocks_cache[block_number]
+        self.topics.setdefault(topic, []).append((job, set(job.contracts)))
+        if job.contracts:
+            self.address_counts.update(job.contracts)
+        else:
+            self.any_address_topics[topic] += 1
 
-    block_model = get_block_model(blockchain_type)
+    def remove_job(self, job: EventCrawlJob) -> None:
+        topic = _event_abi_topic(job.event_abi)
+        if topic is None:
+            self.anonymous_jobs = [
+                anonymous_job
+                for anonymous_job in self.anonymous_jobs
+                if anonymous_job is not job
+            ]
+            return
 
-    blocks = (
-        db_session.query(
-            block_model.block_number, block_model.timestamp, block_model.hash
-        )
-        .filter(
-            and_(
-                block_model.block_number >= block_number - max_blocks_batch - 1,
-                block_model.block_number <= block_number + max_blocks_batch + 1,
+        topic_routes = self.topics.get(topic, [])
+        for i, (routed_job, contracts) in enumerate(topic_routes):
+            if routed_job is not job:
+                continue
+            del topic_routes[i]
+            if contracts:
+                self.address_counts.subtract(contracts)
+                for address in contracts:
+                    if self.address_counts[address] <= 0:
+                        del self.address_counts[address]
+            else:
+                self.any_address_topics[topic] -= 1
+                if self.any_address_topics[topic] <= 0:
+                    del self.any_address_topics[topic]
+            break
+
+        if len(topic_routes) == 0:
+            self.topics.pop(topic, None)
+
+    def request_groups(
+        self, max_topics: int, max_addresses: int
+    ) -> List[Tuple[List[str], Optional[List[ChecksumAddress]]]]:
+        """
+        Returns (topics, addresses) filters of eth_getLogs requests covering all
+        routed jobs. Topics watched at any address are requested without address
+        filter in their own requests, so other topics keep the address filter.
+        """
+        any_address_topics = [
+            topic for topic in self.topics if topic in self.any_address_topics
+        ]
+        filtered_topics = [
+            topic for topic in self.topics if topic not in self.any_address_topics
+        ]
+        sorted_addresses = sorted(self.address_counts.keys())
+
+        groups: List[Tuple[List[str], Optional[List[ChecksumAddress]]]] = []
+        for i in range(0, len(any_address_topics), max_topics):
+            groups.append((any_address_topics[i : i + max_topics], None))
+        for i in range(0, len(filtered_topics), max_topics):
+            for j in range(0, len(sorted_addresses), max_addresses):
+                groups.append(
+                    (
+                        filtered_topics[i : i + max_topics],
+                        sorted_addresses[j : j + max_addresses],
+                    )
+                )
+        return groups
+
+
+def _decode_log(
+    web3: Web3, event_abi: Dict[str, Any], log: LogReceipt
+) -> Dict[str, Any]:
+    """
+    Decodes raw log to the same structure as moonworm _fetch_events_chunk returns.
+    """
+    raw_event = get_event_data(web3.codec, event_abi, log)
+    return {
+        "event": raw_event["event"],
+        "args": json.loads(Web3.toJSON(utfy_dict(dict(raw_event["args"])))),
+        "address": raw_event["address"],
+        "blockHash": raw_event["blockHash"],
+        "blockNumber": raw_event["blockNumber"],
+        "transactionHash": raw_event["transactionHash"].hex(),
+        "logIndex": raw_event["logIndex"],
+    }
+
+
+def _fetch_multiplexed_raw_events(
+    web3: Web3,
+    jobs: List[EventCrawlJob],
+    from_block: int,
+    to_block: int,
+    max_topics: int = MOONSTREAM_CRAWLER_GET_LOGS_MAX_TOPICS,
+    max_addresses: int = MOONSTREAM_CRAWLER_GET_LOGS_MAX_ADDRESSES,
+    on_decode_error: Optional[Callable[[Exception], None]] = None,
+    routes: Optional[EventRoutes] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Fetches logs of all jobs with one eth_getLogs request per block range,
+    filtering by OR'd topic0 list and union of jobs addresses. Topics of jobs
+    without contracts are requested separately without address filter.
+    Topics and addresses are chunked to max_topics and max_addresses per request.
+
+    Each log is routed by topic0 to jobs which watch its address and decoded
+    with the job ABI. Anonymous events have no topic0, so they are fetched per job.
+
+    If routes index of the jobs is not provided, it is built from jobs.
+    """
+    if routes is None:
+        routes = EventRoutes.from_jobs(jobs)
+
+    all_raw_events: List[Dict[str, Any]] = []
+    for job in routes.anonymous_jobs:
+        all_raw_events.extend(
+            _fetch_events_chunk(
+                web3,
+                job.event_abi,
+                from_block,
+                to_block,
+                job.contracts,
+                on_decode_error=on_decode_error,
             )
         )
-        .order_by(block_model.block_number.asc())
-        .all()
-    )
 
-    target_block_timestamp: Optional[int] = None
-    if blocks and blocks[0].block_number == block_number:
-        target_block_timestamp = blocks[0].timestamp
+    if len(routes.topics) == 0:
+        return all_raw_events
 
-    if target_block_timestamp is None:
-        target_block_timestamp = _get_block_timestamp_from_web3(web3, block_number)
+    for topics_chunk, addresses_chunk in routes.request_groups(
+        max_topics, max_addresses
+    ):
+        filter_params: Dict[str, Any] = {
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "topics": [topics_chunk],
+        }
+        if addresses_chunk is not None:
+            filter_params["address"] = addresses_chunk
 
-    if len(blocks_cache) > (max_blocks_batch * 3 + 2):
-        blocks_cache.clear()
+        logs = web3.eth.get_logs(filter_params)  # type: ignore
 
-    blocks_cache[block_number] = target_block_timestamp
-    for block in blocks:
-        blocks_cache[block.block_number] = block.timestamp
+        for log in logs:
+            if len(log["topics"]) == 0:
+                continue
+            for job, contracts in routes.topics.get(Web3.toHex(log["topics"][0]), []):
+                if contracts and log["address"] not in contracts:
+                    continue
+                try:
+                    all_raw_events.append(_decode_log(web3, job.event_abi, log))
+                except Exception as e:
+                    if on_decode_error:
+                        on_decode_error(e)
 
-    return target_block_timestamp
+    return all_raw_events
 
 
-def _crawl_events(
-    db_session: Session,
-    blockchain_type: AvailableBlockchainType,
+def _fetch_raw_events(
     web3: Web3,
     jobs: List[EventCrawlJob],
     from_block: int,
     to_block: int,
-    blocks_cache: Dict[int, int] = {},
-    db_block_query_batch=10,
-    version: int = 2,
+    routes: Optional[EventRoutes] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Fetches and ABI-decodes logs of all jobs for the given block range.
+    Only touches the node, so it is safe to run outside of the database thread.
+    """
+    return _fetch_multiplexed_raw_events(
+        web3,
+        jobs,
+        from_block,
+        to_block,
+        on_decode_error=lambda e: print(
+            f"Error decoding event: {e}"
+        ),  # TODO report via humbug
+        routes=routes,
+    )
+
+
+def _raw_events_to_events(
+    db_session: Optional[Session],
+    web3: Web3,
+    raw_events: List[Dict[str, Any]],
+    blocks_cache: BlockTimestampsResolver,
 ) -> List[Event]:
-    all_events = []
-    for job in jobs:
+    """
+    Resolves block timestamps for raw events in bulk and converts them to Event objects.
+    """
+    block_timestamps = blocks_cache.resolve(
+        db_session,
+        web3,
+        [raw_event["blockNumber"] for raw_event in raw_events],
+    )
 
-        raw_events = _fetch_events_chunk(
-            web3,
-            job.event_abi,
-            from_block,
-            to_block,
-            job.contracts,
-            on_decode_error=lambda e: print(
-                f"Error decoding event: {e}"
-            ),  # TODO report via humbug
+    all_events = []
+    for raw_event in raw_events:
+        raw_event["blockTimestamp"] = block_timestamps[raw_event["blockNumber"]]
+        event = Event(
+            event_name=raw_event["event"],
+            args=raw_event["args"],
+            address=raw_event["address"],
+            block_number=raw_event["blockNumber"],
+            block_timestamp=raw_event["blockTimestamp"],
+            transaction_hash=raw_event["transactionHash"],
+            log_index=raw_event["logIndex"],
+            block_hash=raw_event.get("blockHash"),
         )
-        for raw_event in raw_events:
-            raw_event["blockTimestamp"] = get_block_timestamp(
-                db_session,
-                web3,
-                blockchain_type,
-                raw_event["blockNumber"],
-                blocks_cache,
-                db_block_query_batch,
-                version,
-            )
-            event = Event(
-                event_name=raw_event["event"],
-                args=raw_event["args"],
-                address=raw_event["address"],
-                block_number=raw_event["blockNumber"],
-                block_timestamp=raw_event["blockTimestamp"],
-                transaction_hash=raw_event["transactionHash"],
-                log_index=raw_event["logIndex"],
-                block_hash=raw_event.get("blockHash"),
-            )
-            all_events.append(event)
+        all_events.append(event)
 
     return all_events
 
 
+def _crawl_events(
+    db_session: Session,
+    web3: Web3,
+    jobs: List[EventCrawlJob],
+    from_block: int,
+    to_block: int,
+    blocks_cache: BlockTimestampsResolver,
+    routes: Optional[EventRoutes] = None,
+) -> List[Event]:
+    raw_events = _fetch_raw_events(web3, jobs, from_block, to_block, routes=routes)
+
+    return _raw_events_to_events(db_session, web3, raw_events, blocks_cache)
+
+
 def _autoscale_crawl_events(
     db_session: Session,
-    blockchain_type: AvailableBlockchainType,
     web3: Web3,
     jobs: List[EventCrawlJob],
     from_block: int,
     to_block: int,
-    blocks_cache: Dict[int, int] = {},
+    blocks_cache: BlockTimestampsResolver,
     batch_size: int = 1000,
-    db_block_query_batch=10,
-    version: int = 2,
 ) -> Tuple[List[Event], int]:
     """
     Crawl events with auto regulated batch_size.
     """
-    all_events = []
+    all_raw_events = []
     for job in jobs:
         try:
             raw_events, batch_size = moonworm_autoscale_crawl_events(
@@ -195,26 +331,8 @@ def _autoscale_crawl_events(
         except Exception as e:
             logger.error(f"Error while fetching events: {e}")
             raise e
-        for raw_event in raw_events:
-            raw_event["blockTimestamp"] = get_block_timestamp(
-                db_session,
-                web3,
-                blockchain_type,
-                raw_event["blockNumber"],
-                blocks_cache,
-                db_block_query_batch,
-                version,
-            )
-            event = Event(
-                event_name=raw_event["event"],
-                args=raw_event["args"],
-                address=raw_event["address"],
-                block_number=raw_event["blockNumber"],
-                block_timestamp=raw_event["blockTimestamp"],
-                transaction_hash=raw_event["transactionHash"],
-                log_index=raw_event["logIndex"],
-                block_hash=raw_event.get("blockHash"),
-            )
-            all_events.append(event)
+        all_raw_events.extend(raw_events)
+
+    all_events = _raw_events_to_events(db_session, web3, all_raw_events, blocks_cache)
 
     return all_events, batch_size
@@ -1,10 +1,14 @@
+import json
 import logging
+import multiprocessing
+import os
 import time
-from typing import Dict, List, Optional, Union, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from uuid import UUID
 
 from eth_typing.evm import ChecksumAddress
 
+from moonstreamdbv3.db import MoonstreamCustomDBEngine
 from moonstreamtypes.blockchain import AvailableBlockchainType
 from moonstreamtypes.networks import blockchain_type_to_network_type
 from moonworm.crawler.moonstream_ethereum_state_provider import (  # type: ignore
@@ -15,13 +19,21 @@ from moonworm.crawler.ethereum_state_provider import Web3StateProvider  # type:
 from sqlalchemy.orm.session import Session
 from web3 import Web3
 
+from ..db import yield_db_session_ctx
+from .block_timestamps import BlockTimestampsResolver
 from .crawler import (
     EventCrawlJob,
     FunctionCallCrawlJob,
     _retry_connect_web3,
+    crawl_jobs_hash,
     update_entries_status_and_progress,
 )
-from .db import add_events_to_session, add_function_calls_to_session, commit_session
+from .db import (
+    add_crawler_checkpoint_to_session,
+    add_events_to_session,
+    add_function_calls_to_session,
+    commit_session,
+)
 from .event_crawler import _autoscale_crawl_events, _crawl_events
 from .function_call_crawler import _crawl_functions
 from ..settings import CRAWLER_LABEL, SEER_CRAWLER_LABEL
@@ -44,7 +56,18 @@ def historical_crawler(
     addresses_deployment_blocks: Optional[Dict[ChecksumAddress, int]] = None,
     max_insert_batch: int = 10000,
     version: int = 2,
+    blocks_cache: Optional[BlockTimestampsResolver] = None,
+    on_batch_committed: Optional[Callable[[int], None]] = None,
+    customer_id: Optional[str] = None,
+    save_checkpoint: bool = True,
 ):
+    """
+    Crawls jobs from start_block down to end_block.
+
+    on_batch_committed is called with the lowest block of every committed batch.
+    If save_checkpoint is set, the lowest committed block is also saved to crawler
+    checkpoints table in the same transaction as labels.
+    """
     assert max_blocks_batch > 0, "max_blocks_batch must be greater than 0"
     assert min_sleep_time > 0, "min_sleep_time must be greater than 0"
     assert start_block >= end_block, "start_block must be greater than end_block"
@@ -64,6 +87,7 @@ def historical_crawler(
 
     evm_state_provider = Web3StateProvider(web3)
     label = SEER_CRAWLER_LABEL
+    crawler_type = "historical_v3"
 
     if version == 2:
         ### Moonstream state provider use the V2 db to get the block
@@ -74,13 +98,16 @@ def historical_crawler(
         )
 
         label = CRAWLER_LABEL
+        crawler_type = "historical"
 
     logger.info(f"Starting historical event crawler start_block={start_block}")
 
-    blocks_cache: Dict[int, int] = {}
+    if blocks_cache is None:
+        blocks_cache = BlockTimestampsResolver(blockchain_type, version=version)
     failed_count = 0
 
     original_start_block = start_block
+    jobs_hash = crawl_jobs_hash(event_crawl_jobs, function_call_crawl_jobs)
 
     progess_map: Dict[ChecksumAddress, float] = {}
 
@@ -98,27 +125,21 @@ def historical_crawler(
             if function_call_crawl_jobs:
                 all_events = _crawl_events(
                     db_session=db_session,
-                    blockchain_type=blockchain_type,
                     web3=web3,
                     jobs=event_crawl_jobs,
                     from_block=batch_end_block,
                     to_block=start_block,
                     blocks_cache=blocks_cache,
-                    db_block_query_batch=max_blocks_batch,
-                    version=version,
                 )
 
             else:
                 all_events, max_blocks_batch = _autoscale_crawl_events(
                     db_session=db_session,
-                    blockchain_type=blockchain_type,
                     web3=web3,
                     jobs=event_crawl_jobs,
                     from_block=batch_end_block,
                     to_block=start_block,
                     blocks_cache=blocks_cache,
-                    db_block_query_batch=max_blocks_batch,
-                    version=version,
                 )
             logger.info(
                 f"Crawled {len(all_events)} events from {start_block} to {batch_end_block}."
@@ -197,8 +218,21 @@ def historical_crawler(
                         progess_map=progess_map,
                     )
 
+            if save_checkpoint:
+                add_crawler_checkpoint_to_session(
+                    db_session,
+                    blockchain_type,
+                    crawler_type,
+                    jobs_hash,
+                    batch_end_block,
+                    instance=customer_id,
+                    db_version=version,
+                )
+
             # Commiting to db
             commit_session(db_session)
+            if on_batch_committed is not None:
+                on_batch_committed(batch_end_block)
 
             start_block = batch_end_block - 1
             failed_count = 0
@@ -216,3 +250,302 @@ def historical_crawler(
                 logger.error(f"Failed to reconnect: {err}")
                 logger.exception(err)
                 raise err
+
+
+def split_block_range(
+    start_block: int, end_block: int, shards: int
+) -> List[Tuple[int, int]]:
+    """
+    Splits [end_block, start_block] into disjoint descending sub-ranges
+    (shard_start_block, shard_end_block) covering the whole range.
+    """
+    assert shards > 0, "shards must be greater than 0"
+    assert start_block >= end_block, "start_block must be greater than end_block"
+
+    total_blocks = start_block - end_block + 1
+    shards = min(shards, total_blocks)
+    shard_size, remainder = divmod(total_blocks, shards)
+
+    ranges: List[Tuple[int, int]] = []
+    current_start = start_block
+    for i in range(shards):
+        size = shard_size + (1 if i < remainder else 0)
+        ranges.append((current_start, current_start - size + 1))
+        current_start -= size
+    return ranges
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as ifp:
+        return json.load(ifp)
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    """
+    Atomic write, so killed process never leaves a broken checkpoint.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as ofp:
+        json.dump(data, ofp)
+    os.replace(tmp_path, path)
+
+
+def _shards_progress(
+    start_block: int,
+    ranges: List[Tuple[int, int]],
+    next_blocks: List[Optional[int]],
+    addresses_deployment_blocks: Dict[ChecksumAddress, int],
+) -> Dict[ChecksumAddress, float]:
+    """
+    Progress of every address over [deployment block, start_block], counted by
+    blocks crawled in all shards. next_blocks are shards checkpoints, None if
+    shard has not committed any batch yet.
+    """
+    progress_map: Dict[ChecksumAddress, float] = {}
+    for address, deployment_block in addresses_deployment_blocks.items():
+        total_blocks = start_block - deployment_block + 1
+        if total_blocks <= 0:
+            progress_map[address] = 1.0
+            continue
+        crawled_blocks = 0
+        for (shard_start_block, _), next_block in zip(ranges, next_blocks):
+            if next_block is None:
+                continue
+            crawled_blocks += max(
+                0, shard_start_block - max(next_block + 1, deployment_block) + 1
+            )
+        progress_map[address] = min(crawled_blocks / total_blocks, 1.0)
+    return progress_map
+
+
+def _jobs_checkpoint_dir(
+    checkpoint_dir: str,
+    blockchain_type: AvailableBlockchainType,
+    event_crawl_jobs: List[EventCrawlJob],
+    function_call_crawl_jobs: List[FunctionCallCrawlJob],
+) -> str:
+    return os.path.join(
+        checkpoint_dir,
+        f"{blockchain_type.value}-{crawl_jobs_hash(event_crawl_jobs, function_call_crawl_jobs)}",
+    )
+
+
+def read_sharded_crawl_plan(
+    checkpoint_dir: str,
+    blockchain_type: AvailableBlockchainType,
+    event_crawl_jobs: List[EventCrawlJob],
+    function_call_crawl_jobs: List[FunctionCallCrawlJob],
+) -> Optional[Dict[str, Any]]:
+    """
+    Returns plan of sharded crawl of the jobs set, None if there is no crawl to resume.
+    """
+    return _read_json(
+        os.path.join(
+            _jobs_checkpoint_dir(
+                checkpoint_dir,
+                blockchain_type,
+                event_crawl_jobs,
+                function_call_crawl_jobs,
+            ),
+            "plan.json",
+        )
+    )
+
+
+def _historical_crawler_shard(
+    shard_index: int,
+    shard_start_block: int,
+    shard_end_block: int,
+    checkpoint_path: str,
+    blockchain_type: AvailableBlockchainType,
+    event_crawl_jobs: List[EventCrawlJob],
+    function_call_crawl_jobs: List[FunctionCallCrawlJob],
+    max_blocks_batch: int,
+    min_sleep_time: float,
+    web3_uri: Optional[str],
+    max_insert_batch: int,
+    version: int,
+    customer_db_uri: Optional[str],
+) -> None:
+    """
+    Shard worker, runs in its own process with its own web3 connection and db session.
+    """
+    checkpoint = _read_json(checkpoint_path)
+    start_block = shard_start_block
+    if checkpoint is not None:
+        start_block = min(checkpoint["next_block"], shard_start_block)
+
+    if start_block < shard_end_block:
+        logger.info(
+            f"Shard {shard_index} [{shard_start_block}, {shard_end_block}] already crawled"
+        )
+        return
+
+    logger.info(f"Shard {shard_index} crawling from {start_block} to {shard_end_block}")
+
+    def save_shard_checkpoint(batch_end_block: int) -> None:
+        _write_json(checkpoint_path, {"next_block": batch_end_block - 1})
+
+    web3 = _retry_connect_web3(blockchain_type, web3_uri=web3_uri)
+
+    if version == 3:
+        if customer_db_uri is None:
+            raise ValueError("customer_db_uri is required for version 3")
+        db_session_ctx = MoonstreamCustomDBEngine(
+            customer_db_uri
+        ).yield_db_session_ctx()
+    else:
+        db_session_ctx = yield_db_session_ctx()
+
+    with db_session_ctx as db_session:
+        historical_crawler(
+            db_session,
+            blockchain_type,
+            web3,
+            event_crawl_jobs,
+            function_call_crawl_jobs,
+            start_block,
+            shard_end_block,
+            max_blocks_batch,
+            min_sleep_time,
+            web3_uri=web3_uri,
+            max_insert_batch=max_insert_batch,
+            version=version,
+            on_batch_committed=save_shard_checkpoint,
+            save_checkpoint=False,
+        )
+
+
+def sharded_historical_crawler(
+    blockchain_type: AvailableBlockchainType,
+    event_crawl_jobs: List[EventCrawlJob],
+    function_call_crawl_jobs: List[FunctionCallCrawlJob],
+    start_block: int,
+    end_block: int,
+    shards: int,
+    checkpoint_dir: str,
+    max_blocks_batch: int = 100,
+    min_sleep_time: float = 0.1,
+    web3_uri: Optional[str] = None,
+    max_insert_batch: int = 10000,
+    version: int = 2,
+    customer_db_uri: Optional[str] = None,
+    restart: bool = False,
+    addresses_deployment_blocks: Optional[Dict[ChecksumAddress, int]] = None,
+    progress_interval: float = 60.0,
+) -> None:
+    """
+    Splits [end_block, start_block] into shards and crawls each of them
+    in a separate process.
+
+    Shards plan and progress of every shard are checkpointed in checkpoint_dir
+    under the jobs set hash, so the killed crawl resumes from the last committed
+    batch of each shard. Existing plan is resumed only for the same block range.
+    Set restart to drop existing checkpoints.
+
+    With addresses_deployment_blocks, jobs progress tags are updated from shards
+    checkpoints every progress_interval seconds.
+    """
+    assert start_block >= end_block, "start_block must be greater than end_block"
+
+    jobs_checkpoint_dir = _jobs_checkpoint_dir(
+        checkpoint_dir, blockchain_type, event_crawl_jobs, function_call_crawl_jobs
+    )
+    os.makedirs(jobs_checkpoint_dir, exist_ok=True)
+    plan_path = os.path.join(jobs_checkpoint_dir, "plan.json")
+
+    plan = None if restart else _read_json(plan_path)
+    if plan is not None:
+        if plan["start_block"] != start_block or plan["end_block"] != end_block:
+            raise ValueError(
+                f"Sharded crawl plan {plan_path} is for blocks {plan['start_block']} to {plan['end_block']}, "
+                f"requested {start_block} to {end_block}. Pass the same range to resume or restart the crawl."
+            )
+        ranges = [(shard[0], shard[1]) for shard in plan["shards"]]
+        logger.info(
+            f"Resuming sharded crawl from {plan_path}: {plan['start_block']} to {plan['end_block']}"
+        )
+    else:
+        ranges = split_block_range(start_block, end_block, shards)
+        for file_name in os.listdir(jobs_checkpoint_dir):
+            os.remove(os.path.join(jobs_checkpoint_dir, file_name))
+        _write_json(
+            plan_path,
+            {"start_block": start_block, "end_block": end_block, "shards": ranges},
+        )
+
+    # Spawn to not share inherited db connections pool and web3 sessions
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    checkpoint_paths = []
+    for shard_index, (shard_start_block, shard_end_block) in enumerate(ranges):
+        checkpoint_path = os.path.join(jobs_checkpoint_dir, f"shard-{shard_index}.json")
+        checkpoint_paths.append(checkpoint_path)
+        process = context.Process(
+            target=_historical_crawler_shard,
+            name=f"historical-crawler-shard-{shard_index}",
+            kwargs={
+                "shard_index": shard_index,
+                "shard_start_block": shard_start_block,
+                "shard_end_block": shard_end_block,
+                "checkpoint_path": checkpoint_path,
+                "blockchain_type": blockchain_type,
+                "event_crawl_jobs": event_crawl_jobs,
+                "function_call_crawl_jobs": function_call_crawl_jobs,
+                "max_blocks_batch": max_blocks_batch,
+                "min_sleep_time": min_sleep_time,
+                "web3_uri": web3_uri,
+                "max_insert_batch": max_insert_batch,
+                "version": version,
+                "customer_db_uri": customer_db_uri,
+            },
+        )
+        process.start()
+        processes.append(process)
+
+    def report_progress() -> None:
+        nonlocal event_crawl_jobs, function_call_crawl_jobs
+        if not addresses_deployment_blocks:
+            return
+        next_blocks: List[Optional[int]] = []
+        for checkpoint_path in checkpoint_paths:
+            checkpoint = _read_json(checkpoint_path)
+            next_blocks.append(checkpoint["next_block"] if checkpoint else None)
+        progress_map = _shards_progress(
+            start_block, ranges, next_blocks, addresses_deployment_blocks
+        )
+        try:
+            if len(function_call_crawl_jobs) > 0:
+                function_call_crawl_jobs = update_entries_status_and_progress(  # type: ignore
+                    events=function_call_crawl_jobs,
+                    progess_map=progress_map,
+                )
+            if len(event_crawl_jobs) > 0:
+                event_crawl_jobs = update_entries_status_and_progress(  # type: ignore
+                    events=event_crawl_jobs,
+                    progess_map=progress_map,
+                )
+        except Exception as e:
+            logger.error(f"Could not update progress of sharded crawl: {e}")
+
+    while any(process.is_alive() for process in processes):
+        for process in processes:
+            process.join(timeout=progress_interval)
+            if process.is_alive():
+                break
+        report_progress()
+
+    failed_shards = []
+    for shard_index, process in enumerate(processes):
+        process.join()
+        if process.exitcode != 0:
+            failed_shards.append(shard_index)
+
+    if len(failed_shards) > 0:
+        raise Exception(
+            f"Shards {failed_shards} failed, rerun to resume from checkpoints in {jobs_checkpoint_dir}"
+        )
+
+    logger.info(f"Sharded crawl from {start_block} to {end_block} finished")
@@ -0,0 +1,472 @@
+"""
+Crawl jobs registry of the continuous crawler.
+
+Keeps event and function call crawl jobs indexed by ABI hash (selector) and by
+contract address together with the eth_getLogs routing index, and refreshes
+them incrementally:
+- v2: only bugout journal entries created since the last seen job are fetched.
+- v3: only abi_jobs rows created or updated since the watermark are fetched,
+    removed rows are detected with ids only query when rows count changes.
+"""
+
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple, cast
+from uuid import UUID
+
+from eth_typing.evm import ChecksumAddress
+from moonstreamdbv3.models_indexes import AbiJobs
+from moonstreamtypes.blockchain import AvailableBlockchainType
+from moonstreamtypes.subscriptions import blockchain_type_to_subscription_type
+from sqlalchemy import or_
+from sqlalchemy.orm.session import Session
+from web3 import Web3
+
+from .crawler import (
+    EventCrawlJob,
+    FunctionCallCrawlJob,
+    crawl_jobs_hash,
+    encode_function_signature,
+    event_crawl_job_records_query,
+    function_call_crawl_job_records_query,
+    get_crawl_job_entries,
+    make_event_crawl_jobs,
+    make_function_call_crawl_jobs,
+    moonworm_crawler_update_job_as_pickedup,
+)
+from .event_crawler import EventRoutes
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Rows committed by concurrent transactions could have updated_at a bit older
+# than already seen ones, so watermark query looks back for this interval.
+JOBS_WATERMARK_OVERLAP = timedelta(seconds=60)
+
+EVENT_RECORD = "event"
+FUNCTION_RECORD = "function"
+
+
+class CrawlJobsRegistry:
+    """
+    Crawl jobs with incremental refresh and in place updates of the routing index.
+
+    Jobs lists and jobs hash are cached and rebuilt only after jobs change.
+    """
+
+    def __init__(
+        self,
+        blockchain_type: AvailableBlockchainType,
+        event_crawl_jobs: List[EventCrawlJob],
+        function_call_crawl_jobs: List[FunctionCallCrawlJob],
+        version: int = 2,
+        index_db_session: Optional[Session] = None,
+        customer_id: Optional[str] = None,
+    ) -> None:
+        self.blockchain_type = blockchain_type
+        self.version = version
+        self.index_db_session = index_db_session
+        self.customer_id = customer_id
+
+        self._event_jobs: Dict[str, EventCrawlJob] = {}
+        for event_job in event_crawl_jobs:
+            self._event_jobs[event_job.event_abi_hash] = event_job
+        self._function_call_jobs: Dict[str, FunctionCallCrawlJob] = {}
+        for function_call_job in function_call_crawl_jobs:
+            self._function_call_jobs[function_call_job.contract_address] = (
+                function_call_job
+            )
+        self.event_routes = EventRoutes.from_jobs(list(self._event_jobs.values()))
+
+        # v2 watermarks are created_at of the newest known bugout entries
+        self._event_created_at: Optional[int] = max(
+            (job.created_at for job in event_crawl_jobs), default=None
+        )
+        self._function_call_created_at: Optional[int] = max(
+            (job.created_at for job in function_call_crawl_jobs), default=None
+        )
+
+        # v3 index of abi_jobs rows, filled with the first refresh
+        self._watermark: Optional[datetime] = None
+        self._records: Dict[UUID, Tuple[str, str, str]] = {}
+        self._record_ids: Dict[Tuple[str, str, str], Set[UUID]] = {}
+
+        self._event_jobs_list: Optional[List[EventCrawlJob]] = None
+        self._function_call_jobs_list: Optional[List[FunctionCallCrawlJob]] = None
+        self._jobs_hash: Optional[str] = None
+
+    @property
+    def event_crawl_jobs(self) -> List[EventCrawlJob]:
+        if self._event_jobs_list is None:
+            self._event_jobs_list = list(self._event_jobs.values())
+        return self._event_jobs_list
+
+    @property
+    def function_call_crawl_jobs(self) -> List[FunctionCallCrawlJob]:
+        if self._function_call_jobs_list is None:
+            self._function_call_jobs_list = list(self._function_call_jobs.values())
+        return self._function_call_jobs_list
+
+    @property
+    def jobs_hash(self) -> str:
+        if self._jobs_hash is None:
+            self._jobs_hash = crawl_jobs_hash(
+                self.event_crawl_jobs, self.function_call_crawl_jobs
+            )
+        return self._jobs_hash
+
+    def _invalidate(self) -> None:
+        self._event_jobs_list = None
+        self._function_call_jobs_list = None
+        self._jobs_hash = None
+
+    def refresh(self) -> bool:
+        """
+        Applies jobs changes since the last refresh. Returns True if jobs set changed.
+        """
+        if self.version == 2:
+            changed = self._refresh_v2()
+        elif self.version == 3 and self.index_db_session is not None:
+            try:
+                changed = self._refresh_v3(self.index_db_session)
+            except Exception:
+                self.index_db_session.rollback()
+                raise
+        else:
+            raise ValueError("Invalid version")
+
+        if changed:
+            self._invalidate()
+        logger.info(
+            f"Crawl jobs refreshed, changed: {changed}, event jobs: {len(self._event_jobs)}, "
+            f"function call jobs: {len(self._function_call_jobs)}"
+        )
+        return changed
+
+    def _refresh_v2(self) -> bool:
+        subscription_type = blockchain_type_to_subscription_type(self.blockchain_type)
+
+        logger.info("Looking for new event crawl jobs.")
+        new_event_jobs = make_event_crawl_jobs(
+            get_crawl_job_entries(
+                subscription_type=subscription_type,
+                crawler_type="event",
+                created_at_filter=self._event_created_at,
+            )
+        )
+        logger.info("Looking for new function call crawl jobs.")
+        new_function_call_jobs = make_function_call_crawl_jobs(
+            get_crawl_job_entries(
+                subscription_type=subscription_type,
+                crawler_type="function",
+                created_at_filter=self._function_call_created_at,
+            )
+        )
+
+        # Only new jobs, known ones were picked up on previous refreshes
+        (
+            new_event_jobs,
+            new_function_call_jobs,
+        ) = moonworm_crawler_update_job_as_pickedup(
+            event_crawl_jobs=new_event_jobs,
+            function_call_crawl_jobs=new_function_call_jobs,
+        )
+
+        changed = False
+        touched: Dict[int, EventCrawlJob] = {}
+        for new_event_job in new_event_jobs:
+            event_job = self._event_jobs.get(new_event_job.event_abi_hash)
+            if event_job is None:
+                self._event_jobs[new_event_job.event_abi_hash] = new_event_job
+                touched[id(new_event_job)] = new_event_job
+                changed = True
+            else:
+                known_contracts = set(event_job.contracts)
+                new_contracts = [
+                    contract
+                    for contract in new_event_job.contracts
+                    if contract not in known_contracts
+                ]
+                if new_contracts:
+                    self._touch_event_job(event_job, touched)
+                    event_job.contracts.extend(new_contracts)
+                    changed = True
+                for contract, entries in new_event_job.address_entries.items():
+                    event_job.address_entries.setdefault(contract, {}).update(entries)
+
+            self._event_created_at = max(
+                self._event_created_at or 0, new_event_job.created_at
+            )
+        self._add_touched_to_routes(touched)
+
+        for new_function_call_job in new_function_call_jobs:
+            function_call_job = self._function_call_jobs.get(
+                new_function_call_job.contract_address
+            )
+            if function_call_job is None:
+                self._function_call_jobs[new_function_call_job.contract_address] = (
+                    new_function_call_job
+                )
+                changed = True
+            else:
+                known_selectors = {
+                    encode_function_signature(function_abi)
+                    for function_abi in function_call_job.contract_abi
+                }
+                for function_abi in new_function_call_job.contract_abi:
+                    if encode_function_signature(function_abi) not in known_selectors:
+                        function_call_job.contract_abi.append(function_abi)
+                        changed = True
+                function_call_job.entries_tags.update(
+                    new_function_call_job.entries_tags
+                )
+
+            self._function_call_created_at = max(
+                self._function_call_created_at or 0,
+                new_function_call_job.created_at,
+            )
+
+        logger.info(
+            f"Found {len(new_event_jobs)} new event crawl jobs and "
+            f"{len(new_function_call_jobs)} new function call crawl jobs."
+        )
+        return changed
+
+    def _refresh_v3(self, db_session: Session) -> bool:
+        """
+        Rows are deleted from abi_jobs without a trace, so removals could not be
+        fetched by watermark. Rows count is compared with known records after
+        changes are applied and ids of all rows are fetched only if they differ.
+        """
+        if self._watermark is None:
+            return self._load_v3(db_session)
+
+        since = self._watermark - JOBS_WATERMARK_OVERLAP
+        changed_filter = or_(AbiJobs.updated_at > since, AbiJobs.created_at > since)
+
+        event_query = event_crawl_job_records_query(
+            db_session, self.blockchain_type, self.customer_id
+        )
+        function_query = function_call_crawl_job_records_query(
+            db_session, self.blockchain_type, self.customer_id
+        )
+        changed_event_records = event_query.filter(changed_filter).all()
+        changed_function_records = function_query.filter(changed_filter).all()
+
+        touched: Dict[int, EventCrawlJob] = {}
+        changed = False
+        for record in changed_event_records:
+            changed |= self._add_event_record(record, touched)
+        for record in changed_function_records:
+            changed |= self._add_function_record(record, touched)
+
+        removed_ids: List[UUID] = []
+        if event_query.count() + function_query.count() != len(self._records):
+            current_ids = {
+                record_id
+                for (record_id,) in event_crawl_job_records_query(
+                    db_session, self.blockchain_type, self.customer_id, [AbiJobs.id]
+                )
+            }
+            current_ids.update(
+                record_id
+                for (record_id,) in function_call_crawl_job_records_query(
+                    db_session, self.blockchain_type, self.customer_id, [AbiJobs.id]
+                )
+            )
+            removed_ids = [
+                record_id for record_id in self._records if record_id not in current_ids
+            ]
+        for record_id in removed_ids:
+            changed |= self._remove_record(record_id, touched)
+        self._add_touched_to_routes(touched)
+
+        self._advance_watermark(changed_event_records + changed_function_records)
+
+        logger.info(
+            f"Jobs changes since {since}: {len(changed_event_records)} event and "
+            f"{len(changed_function_records)} function call records, "
+            f"{len(removed_ids)} removed"
+        )
+        return changed
+
+    def _load_v3(self, db_session: Session) -> bool:
+        """
+        Full load of abi_jobs rows, replaces initial jobs.
+        """
+        event_records = event_crawl_job_records_query(
+            db_session, self.blockchain_type, self.customer_id
+        ).all()
+        function_records = function_call_crawl_job_records_query(
+            db_session, self.blockchain_type, self.customer_id
+        ).all()
+
+        previous_hash = self.jobs_hash
+
+        self._event_jobs = {}
+        self._function_call_jobs = {}
+        self._records = {}
+        self._record_ids = {}
+        touched: Dict[int, EventCrawlJob] = {}
+        for record in event_records:
+            self._add_event_record(record, touched)
+        for record in function_records:
+            self._add_function_record(record, touched)
+        self.event_routes = EventRoutes.from_jobs(list(self._event_jobs.values()))
+
+        self._watermark = datetime.now(timezone.utc)
+        self._advance_watermark(event_records + function_records)
+
+        self._invalidate()
+        return self.jobs_hash != previous_hash
+
+    def _advance_watermark(self, records: List[Any]) -> None:
+        for record in records:
+            for timestamp in (record.created_at, record.updated_at):
+                if timestamp is None:
+                    continue
+                if timestamp.tzinfo is None:
+                    timestamp = timestamp.replace(tzinfo=timezone.utc)
+                if self._watermark is None or timestamp > self._watermark:
+                    self._watermark = timestamp
+
+    def _touch_event_job(
+        self, event_job: EventCrawlJob, touched: Dict[int, EventCrawlJob]
+    ) -> None:
+        """
+        Removes job from routes before its contracts are modified,
+        it is added back by _add_touched_to_routes.
+        """
+        if id(event_job) not in touched:
+            self.event_routes.remove_job(event_job)
+            touched[id(event_job)] = event_job
+
+    def _add_touched_to_routes(self, touched: Dict[int, EventCrawlJob]) -> None:
+        for event_job in touched.values():
+            if self._event_jobs.get(event_job.event_abi_hash) is event_job:
+                self.event_routes.add_job(event_job)
+
+    def _add_record_id(self, record_id: UUID, key: Tuple[str, str, str]) -> bool:
+        """
+        Returns True if key is new.
+        """
+        self._records[record_id] = key
+        record_ids = self._record_ids.setdefault(key, set())
+        is_new = len(record_ids) == 0
+        record_ids.add(record_id)
+        return is_new
+
+    def _add_event_record(
+        self, record: AbiJobs, touched: Dict[int, EventCrawlJob]
+    ) -> bool:
+        record_id = UUID(str(record.id))
+        selector = str(record.abi_selector)
+        address = Web3.toChecksumAddress("0x" + record.address.hex())
+        key = (EVENT_RECORD, selector, address)
+
+        changed = False
+        if self._records.get(record_id, key) != key:
+            changed = self._remove_record(record_id, touched)
+
+        status = [str(record.status), str(record.progress)]
+        event_job = self._event_jobs.get(selector)
+        if event_job is None:
+            event_job = EventCrawlJob(
+                event_abi_hash=selector,
+                event_abi=json.loads(str(record.abi)),
+                contracts=[],
+                address_entries={},
+                created_at=int(record.created_at.timestamp()),
+            )
+            self._event_jobs[selector] = event_job
+            touched[id(event_job)] = event_job
+
+        event_job.address_entries.setdefault(record.address.hex(), {})[
+            record_id
+        ] = status
+
+        if self._add_record_id(record_id, key):
+            self._touch_event_job(event_job, touched)
+            event_job.contracts.append(address)
+            changed = True
+        return changed
+
+    def _add_function_record(
+        self, record: AbiJobs, touched: Dict[int, EventCrawlJob]
+    ) -> bool:
+        record_id = UUID(str(record.id))
+        selector = str(record.abi_selector)
+        address = Web3.toChecksumAddress("0x" + record.address.hex())
+        key = (FUNCTION_RECORD, address, selector)
+
+        changed = False
+        if self._records.get(record_id, key) != key:
+            changed = self._remove_record(record_id, touched)
+
+        function_call_job = self._function_call_jobs.get(address)
+        if function_call_job is None:
+            function_call_job = FunctionCallCrawlJob(
+                contract_abi=[],
+                contract_address=address,
+                entries_tags={},
+                created_at=int(record.created_at.timestamp()),
+            )
+            self._function_call_jobs[address] = function_call_job
+
+        function_call_job.entries_tags[record_id] = [
+            str(record.status),
+            str(record.progress),
+        ]
+
+        if self._add_record_id(record_id, key):
+            function_call_job.contract_abi.append(json.loads(str(record.abi)))
+            function_call_job.existing_selectors.append(selector)
+            changed = True
+        return changed
+
+    def _remove_record(
+        self, record_id: UUID, touched: Dict[int, EventCrawlJob]
+    ) -> bool:
+        """
+        Removes abi_jobs row from jobs. Returns True if jobs changed.
+        """
+        key = self._records.pop(record_id, None)
+        if key is None:
+            return False
+
+        record_type, job_key, item = key
+        if record_type == EVENT_RECORD:
+            event_job = self._event_jobs[job_key]
+            # v3 address entries are keyed by address hex without 0x
+            entries_address = cast(ChecksumAddress, item[2:].lower())
+            entries: Dict[UUID, List[str]] = event_job.address_entries.get(
+                entries_address, {}
+            )
+            entries.pop(record_id, None)
+            if len(entries) == 0:
+                event_job.address_entries.pop(entries_address, None)
+        else:
+            self._function_call_jobs[job_key].entries_tags.pop(record_id, None)
+
+        record_ids = self._record_ids.get(key, set())
+        record_ids.discard(record_id)
+        if len(record_ids) > 0:
+            return False
+        self._record_ids.pop(key, None)
+
+        if record_type == EVENT_RECORD:
+            self._touch_event_job(event_job, touched)
+            event_job.contracts.remove(cast(ChecksumAddress, item))
+            # Job without contracts would crawl events of all addresses
+            if len(event_job.contracts) == 0:
+                del self._event_jobs[job_key]
+        else:
+            function_call_job = self._function_call_jobs[job_key]
+            index = function_call_job.existing_selectors.index(item)
+            del function_call_job.existing_selectors[index]
+            del function_call_job.contract_abi[index]
+            if len(function_call_job.contract_abi) == 0:
+                del self._function_call_jobs[job_key]
+        return True
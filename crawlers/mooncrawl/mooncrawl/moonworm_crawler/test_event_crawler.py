@@ -0,0 +1,108 @@
+import unittest
+from typing import Any, Dict, List
+
+from .crawler import EventCrawlJob
+from .event_crawler import EventRoutes, _event_abi_topic
+
+TRANSFER_ABI = {
+    "anonymous": False,
+    "inputs": [
+        {"indexed": True, "name": "from", "type": "address"},
+        {"indexed": True, "name": "to", "type": "address"},
+        {"indexed": False, "name": "value", "type": "uint256"},
+    ],
+    "name": "Transfer",
+    "type": "event",
+}
+
+APPROVAL_ABI = {
+    "anonymous": False,
+    "inputs": [
+        {"indexed": True, "name": "owner", "type": "address"},
+        {"indexed": True, "name": "spender", "type": "address"},
+        {"indexed": False, "name": "value", "type": "uint256"},
+    ],
+    "name": "Approval",
+    "type": "event",
+}
+
+ADDRESS_A = "0x000000000000000000000000000000000000000A"
+ADDRESS_B = "0x000000000000000000000000000000000000000B"
+ADDRESS_C = "0x000000000000000000000000000000000000000C"
+
+
+def event_job(event_abi: Dict[str, Any], contracts: List[str]) -> EventCrawlJob:
+    return EventCrawlJob(
+        event_abi_hash=event_abi["name"],
+        event_abi=event_abi,
+        contracts=contracts,  # type: ignore
+        address_entries={},
+        created_at=0,
+    )
+
+
+class TestEventRoutes(unittest.TestCase):
+    def setUp(self):
+        self.transfer_topic = _event_abi_topic(TRANSFER_ABI)
+        self.approval_topic = _event_abi_topic(APPROVAL_ABI)
+
+    def test_routes_topics_to_jobs(self):
+        transfer_job = event_job(TRANSFER_ABI, [ADDRESS_A, ADDRESS_B])
+        approval_job = event_job(APPROVAL_ABI, [ADDRESS_B])
+        routes = EventRoutes.from_jobs([transfer_job, approval_job])
+
+        self.assertEqual(
+            routes.topics[self.transfer_topic], [(transfer_job, {ADDRESS_A, ADDRESS_B})]
+        )
+        self.assertEqual(
+            routes.topics[self.approval_topic], [(approval_job, {ADDRESS_B})]
+        )
+        self.assertEqual(routes.address_counts[ADDRESS_B], 2)
+
+        routes.remove_job(approval_job)
+        self.assertNotIn(self.approval_topic, routes.topics)
+        self.assertEqual(routes.address_counts[ADDRESS_B], 1)
+
+    def test_request_groups_chunk_topics_and_addresses(self):
+        routes = EventRoutes.from_jobs(
+            [
+                event_job(TRANSFER_ABI, [ADDRESS_A, ADDRESS_B]),
+                event_job(APPROVAL_ABI, [ADDRESS_C]),
+            ]
+        )
+
+        groups = routes.request_groups(max_topics=1, max_addresses=2)
+        self.assertEqual(
+            groups,
+            [
+                ([self.transfer_topic], [ADDRESS_A, ADDRESS_B]),
+                ([self.transfer_topic], [ADDRESS_C]),
+                ([self.approval_topic], [ADDRESS_A, ADDRESS_B]),
+                ([self.approval_topic], [ADDRESS_C]),
+            ],
+        )
+
+    def test_any_address_job_keeps_address_filter_of_other_topics(self):
+        any_address_job = event_job(APPROVAL_ABI, [])
+        routes = EventRoutes.from_jobs(
+            [event_job(TRANSFER_ABI, [ADDRESS_A]), any_address_job]
+        )
+
+        groups = routes.request_groups(max_topics=10, max_addresses=10)
+        self.assertEqual(
+            groups,
+            [
+                ([self.approval_topic], None),
+                ([self.transfer_topic], [ADDRESS_A]),
+            ],
+        )
+
+        routes.remove_job(any_address_job)
+        self.assertEqual(
+            routes.request_groups(max_topics=10, max_addresses=10),
+            [([self.transfer_topic], [ADDRESS_A])],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from . import cli, historical_crawler
+from .crawler import EventCrawlJob
+from .historical_crawler import _shards_progress, split_block_range
+
+
+class TestSplitBlockRange(unittest.TestCase):
+    def assert_covers(self, start_block, end_block, ranges):
+        blocks = []
+        for shard_start_block, shard_end_block in ranges:
+            self.assertGreaterEqual(shard_start_block, shard_end_block)
+            blocks.extend(range(shard_start_block, shard_end_block - 1, -1))
+        self.assertEqual(blocks, list(range(start_block, end_block - 1, -1)))
+
+    def test_split_block_range(self):
+        ranges = split_block_range(100, 1, 3)
+        self.assertEqual(len(ranges), 3)
+        self.assert_covers(100, 1, ranges)
+
+        sizes = [start - end + 1 for start, end in ranges]
+        self.assertLessEqual(max(sizes) - min(sizes), 1)
+
+    def test_split_block_range_single_shard(self):
+        self.assertEqual(split_block_range(100, 1, 1), [(100, 1)])
+
+    def test_split_block_range_more_shards_than_blocks(self):
+        ranges = split_block_range(12, 10, 5)
+        self.assertEqual(ranges, [(12, 12), (11, 11), (10, 10)])
+        self.assert_covers(12, 10, ranges)
+
+
+class TestShardsProgress(unittest.TestCase):
+    def test_shards_progress(self):
+        ranges = split_block_range(100, 1, 2)  # (100, 51), (50, 1)
+        progress = _shards_progress(
+            100,
+            ranges,
+            [75, None],
+            {"0xA": 1, "0xB": 51, "0xC": 101},  # type: ignore
+        )
+        self.assertEqual(progress["0xA"], 25 / 100)
+        self.assertEqual(progress["0xB"], 25 / 50)
+        self.assertEqual(progress["0xC"], 1.0)
+
+        progress = _shards_progress(100, ranges, [50, 0], {"0xA": 1})  # type: ignore
+        self.assertEqual(progress["0xA"], 1.0)
+
+
+class FakeProcess:
+    """
+    Runs shard in the test process, exception marks shard as failed.
+    """
+
+    def __init__(self, target, name, kwargs):
+        self.target = target
+        self.kwargs = kwargs
+        self.exitcode = None
+
+    def start(self):
+        try:
+            self.target(**self.kwargs)
+            self.exitcode = 0
+        except Exception:
+            self.exitcode = 1
+
+    def is_alive(self):
+        return False
+
+    def join(self, timeout=None):
+        pass
+
+
+class TestShardedHistoricalCrawlResume(unittest.TestCase):
+    ADDRESS = "0x000000000000000000000000000000000000000A"
+
+    def setUp(self):
+        self.checkpoint_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.checkpoint_dir.cleanup)
+
+        job = EventCrawlJob(
+            event_abi_hash="Transfer",
+            event_abi={"name": "Transfer", "type": "event", "inputs": []},
+            contracts=[self.ADDRESS],  # type: ignore
+            address_entries={},
+            created_at=0,
+        )
+        self.web3 = mock.MagicMock()
+        self.first_labeled_block = mock.MagicMock()
+
+        patches = [
+            mock.patch.object(cli, "MoonstreamDBIndexesEngine"),
+            mock.patch.object(cli, "MoonstreamCustomDBEngine"),
+            mock.patch.object(
+                cli, "get_event_crawl_job_records", return_value={"Transfer": job}
+            ),
+            mock.patch.object(
+                cli, "get_function_call_crawl_job_records", return_value={}
+            ),
+            mock.patch.object(cli, "_retry_connect_web3", return_value=self.web3),
+            mock.patch.object(cli, "_get_checkpoint_block", return_value=None),
+            mock.patch.object(
+                cli, "get_first_labeled_block_number", self.first_labeled_block
+            ),
+            mock.patch.object(
+                cli, "find_all_deployed_blocks", return_value={self.ADDRESS: 1}
+            ),
+            mock.patch.object(
+                historical_crawler.multiprocessing,
+                "get_context",
+                return_value=mock.MagicMock(Process=FakeProcess),
+            ),
+            mock.patch.object(historical_crawler, "update_entries_status_and_progress"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def run_cli(self):
+        argv = [
+            "moonworm-crawler",
+            "historical-crawl-v3",
+            "--blockchain-type",
+            "ethereum",
+            "--customer-uuid",
+            "00000000-0000-0000-0000-000000000001",
+            "--customer-uri",
+            "postgresql://localhost/customer",
+            "--find-deployed-blocks",
+            "--shards",
+            "2",
+            "--checkpoint-dir",
+            self.checkpoint_dir.name,
+        ]
+        with mock.patch.object(sys, "argv", argv):
+            cli.main()
+
+    def test_killed_crawl_resumes_with_same_arguments(self):
+        def killed_shard(shard_start_block, checkpoint_path, **kwargs):
+            historical_crawler._write_json(
+                checkpoint_path, {"next_block": shard_start_block - 10}
+            )
+            raise Exception("Killed")
+
+        resumed_shards = []
+
+        def resumed_shard(
+            shard_start_block, shard_end_block, checkpoint_path, **kwargs
+        ):
+            checkpoint = historical_crawler._read_json(checkpoint_path)
+            resumed_shards.append(
+                (shard_start_block, shard_end_block, checkpoint["next_block"])  # type: ignore
+            )
+
+        # Nothing labeled on first run, killed shards labeled blocks down to 490
+        self.web3.eth.blockNumber = 1000
+        self.first_labeled_block.return_value = None
+        with mock.patch.object(
+            historical_crawler, "_historical_crawler_shard", killed_shard
+        ):
+            with self.assertRaisesRegex(Exception, "rerun to resume"):
+                self.run_cli()
+
+        self.web3.eth.blockNumber = 1100
+        self.first_labeled_block.return_value = 490
+        with mock.patch.object(
+            historical_crawler, "_historical_crawler_shard", resumed_shard
+        ):
+            self.run_cli()
+
+        self.assertEqual(resumed_shards, [(999, 500, 989), (499, 1, 489)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -285,6 +285,35 @@ except:
         f"Could not parse MOONSTREAM_CRAWL_WORKERS as int: {MOONSTREAM_CRAWL_WORKERS_RAW}"
     )
 
+# eth_getLogs request limits used by multiplexed events fetching
+MOONSTREAM_CRAWLER_GET_LOGS_MAX_TOPICS = 100
+MOONSTREAM_CRAWLER_GET_LOGS_MAX_TOPICS_RAW = os.environ.get(
+    "MOONSTREAM_CRAWLER_GET_LOGS_MAX_TOPICS"
+)
+try:
+    if MOONSTREAM_CRAWLER_GET_LOGS_MAX_TOPICS_RAW is not None:
+        MOONSTREAM_CRAWLER_GET_LOGS_MAX_TOPICS = int(
+            MOONSTREAM_CRAWLER_GET_LOGS_MAX_TOPICS_RAW
+        )
+except:
+    raise Exception(
+        f"Could not parse MOONSTREAM_CRAWLER_GET_LOGS_MAX_TOPICS as int: {MOONSTREAM_CRAWLER_GET_LOGS_MAX_TOPICS_RAW}"
+    )
+
+MOONSTREAM_CRAWLER_GET_LOGS_MAX_ADDRESSES = 1000
+MOONSTREAM_CRAWLER_GET_LOGS_MAX_ADDRESSES_RAW = os.environ.get(
+    "MOONSTREAM_CRAWLER_GET_LOGS_MAX_ADDRESSES"
+)
+try:
+    if MOONSTREAM_CRAWLER_GET_LOGS_MAX_ADDRESSES_RAW is not None:
+        MOONSTREAM_CRAWLER_GET_LOGS_MAX_ADDRESSES = int(
+            MOONSTREAM_CRAWLER_GET_LOGS_MAX_ADDRESSES_RAW
+        )
+except:
+    raise Exception(
+        f"Could not parse MOONSTREAM_CRAWLER_GET_LOGS_MAX_ADDRESSES as int: {MOONSTREAM_CRAWLER_GET_LOGS_MAX_ADDRESSES_RAW}"
+    )
+
 # Etherscan
 MOONSTREAM_ETHERSCAN_TOKEN = os.environ.get("MOONSTREAM_ETHERSCAN_TOKEN")
 
@@ -472,6 +501,13 @@ HISTORICAL_CRAWLER_STATUS_TAG_PREFIXES = {
     "progress_status": "progress",
 }
 
+# Directory of sharded historical crawl plans and shards checkpoints, must survive
+# restarts of the host to resume killed crawl
+MOONSTREAM_HISTORICAL_CRAWL_CHECKPOINT_DIR = os.environ.get(
+    "MOONSTREAM_HISTORICAL_CRAWL_CHECKPOINT_DIR",
+    os.path.join(os.path.expanduser("~"), ".moonstream", "historical-crawl"),
+)
+
 
 # Leaderboard generator
 
@@ -517,6 +553,67 @@ MOONSTREAM_METADATA_TASKS_JOURNAL = os.environ.get(
     "MOONSTREAM_METADATA_TASKS_JOURNAL", ""
 )
 
+# Metadata crawler fetcher
+MOONSTREAM_METADATA_IPFS_GATEWAYS = [
+    "https://ipfs.io/ipfs/",
+    "https://dweb.link/ipfs/",
+    "https://gateway.pinata.cloud/ipfs/",
+]
+MOONSTREAM_METADATA_IPFS_GATEWAYS_RAW = os.environ.get(
+    "MOONSTREAM_METADATA_IPFS_GATEWAYS"
+)
+if MOONSTREAM_METADATA_IPFS_GATEWAYS_RAW is not None:
+    MOONSTREAM_METADATA_IPFS_GATEWAYS = [
+        gateway.strip().rstrip("/") + "/"
+        for gateway in MOONSTREAM_METADATA_IPFS_GATEWAYS_RAW.split(",")
+        if gateway.strip() != ""
+    ]
+
+MOONSTREAM_METADATA_MAX_CONNECTIONS_PER_HOST = 8
+MOONSTREAM_METADATA_MAX_CONNECTIONS_PER_HOST_RAW = os.environ.get(
+    "MOONSTREAM_METADATA_MAX_CONNECTIONS_PER_HOST"
+)
+try:
+    if MOONSTREAM_METADATA_MAX_CONNECTIONS_PER_HOST_RAW is not None:
+        MOONSTREAM_METADATA_MAX_CONNECTIONS_PER_HOST = int(
+            MOONSTREAM_METADATA_MAX_CONNECTIONS_PER_HOST_RAW
+        )
+except:
+    raise Exception(
+        f"Could not parse MOONSTREAM_METADATA_MAX_CONNECTIONS_PER_HOST as int: {MOONSTREAM_METADATA_MAX_CONNECTIONS_PER_HOST_RAW}"
+    )
+
+MOONSTREAM_METADATA_REQUEST_TIMEOUT_SECONDS = 10
+MOONSTREAM_METADATA_REQUEST_TIMEOUT_SECONDS_RAW = os.environ.get(
+    "MOONSTREAM_METADATA_REQUEST_TIMEOUT_SECONDS"
+)
+try:
+    if MOONSTREAM_METADATA_REQUEST_TIMEOUT_SECONDS_RAW is not None:
+        MOONSTREAM_METADATA_REQUEST_TIMEOUT_SECONDS = int(
+            MOONSTREAM_METADATA_REQUEST_TIMEOUT_SECONDS_RAW
+        )
+except:
+    raise Exception(
+        f"Could not parse MOONSTREAM_METADATA_REQUEST_TIMEOUT_SECONDS as int: {MOONSTREAM_METADATA_REQUEST_TIMEOUT_SECONDS_RAW}"
+    )
+
+# Directory of metadata documents cache, empty to use temporary directory
+MOONSTREAM_METADATA_CACHE_DIR = os.environ.get("MOONSTREAM_METADATA_CACHE_DIR", "")
+
+MOONSTREAM_METADATA_CACHE_TTL_SECONDS = 3600
+MOONSTREAM_METADATA_CACHE_TTL_SECONDS_RAW = os.environ.get(
+    "MOONSTREAM_METADATA_CACHE_TTL_SECONDS"
+)
+try:
+    if MOONSTREAM_METADATA_CACHE_TTL_SECONDS_RAW is not None:
+        MOONSTREAM_METADATA_CACHE_TTL_SECONDS = int(
+            MOONSTREAM_METADATA_CACHE_TTL_SECONDS_RAW
+        )
+except:
+    raise Exception(
+        f"Could not parse MOONSTREAM_METADATA_CACHE_TTL_SECONDS as int: {MOONSTREAM_METADATA_CACHE_TTL_SECONDS_RAW}"
+    )
+
 
 ### MOONSTREAM_PUBLIC_QUERIES_USER_TOKEN
 
@@ -527,3 +624,45 @@ if MOONSTREAM_PUBLIC_QUERIES_DATA_ACCESS_TOKEN == "":
     raise ValueError(
         "MOONSTREAM_PUBLIC_QUERIES_DATA_ACCESS_TOKEN environment variable must be set"
     )
+
+
+### Crawlers API background jobs
+
+# Optional Redis shared by API workers (uvicorn --workers). With Redis, jobs limits,
+# deduplication, statuses and stats are global. Without it they are per API worker
+# process, e.g. 4 workers run up to 4 * MOONSTREAM_JOBS_MAX_WORKERS jobs at once.
+MOONSTREAM_REDIS_URL = os.environ.get("MOONSTREAM_REDIS_URL")
+MOONSTREAM_REDIS_PASSWORD = os.environ.get("MOONSTREAM_REDIS_PASSWORD")
+
+# Number of worker processes running query and stats jobs
+MOONSTREAM_JOBS_MAX_WORKERS = 4
+MOONSTREAM_JOBS_MAX_WORKERS_RAW = os.environ.get("MOONSTREAM_JOBS_MAX_WORKERS")
+try:
+    if MOONSTREAM_JOBS_MAX_WORKERS_RAW is not None:
+        MOONSTREAM_JOBS_MAX_WORKERS = int(MOONSTREAM_JOBS_MAX_WORKERS_RAW)
+except:
+    raise Exception(
+        f"Could not parse MOONSTREAM_JOBS_MAX_WORKERS as int: {MOONSTREAM_JOBS_MAX_WORKERS_RAW}"
+    )
+
+# Max number of queued jobs, new jobs are rejected when queue is full
+MOONSTREAM_JOBS_MAX_QUEUE_SIZE = 200
+MOONSTREAM_JOBS_MAX_QUEUE_SIZE_RAW = os.environ.get("MOONSTREAM_JOBS_MAX_QUEUE_SIZE")
+try:
+    if MOONSTREAM_JOBS_MAX_QUEUE_SIZE_RAW is not None:
+        MOONSTREAM_JOBS_MAX_QUEUE_SIZE = int(MOONSTREAM_JOBS_MAX_QUEUE_SIZE_RAW)
+except:
+    raise Exception(
+        f"Could not parse MOONSTREAM_JOBS_MAX_QUEUE_SIZE as int: {MOONSTREAM_JOBS_MAX_QUEUE_SIZE_RAW}"
+    )
+
+# How long statuses of finished jobs are kept in Redis
+MOONSTREAM_JOBS_HISTORY_SECONDS = 3600
+MOONSTREAM_JOBS_HISTORY_SECONDS_RAW = os.environ.get("MOONSTREAM_JOBS_HISTORY_SECONDS")
+try:
+    if MOONSTREAM_JOBS_HISTORY_SECONDS_RAW is not None:
+        MOONSTREAM_JOBS_HISTORY_SECONDS = int(MOONSTREAM_JOBS_HISTORY_SECONDS_RAW)
+except:
+    raise Exception(
+        f"Could not parse MOONSTREAM_JOBS_HISTORY_SECONDS as int: {MOONSTREAM_JOBS_HISTORY_SECONDS_RAW}"
+    )
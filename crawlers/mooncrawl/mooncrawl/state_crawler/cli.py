@@ -3,11 +3,14 @@ import hashlib
 import itertools
 import json
 import logging
+import math
 import time
-from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from concurrent.futures._base import TimeoutError
+from dataclasses import dataclass
 from pprint import pprint
-from typing import Any, Dict, List, Optional
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
 import requests
 from uuid import UUID
 from web3 import Web3
@@ -20,6 +23,7 @@ from ..actions import recive_S3_data_from_query, get_all_entries_from_search
 from ..blockchain import connect
 from ..data import ViewTasks
 from ..db import PrePing_SessionLocal, create_moonstream_engine, sessionmaker
+from ..labels_copy import copy_labels, label_to_record
 from ..settings import (
     bugout_client as bc,
     INFURA_PROJECT_ID,
@@ -132,11 +136,18 @@ def execute_query(query: Dict[str, Any], token: str) -> Any:
 
 
 def encode_calls(calls: List[Dict[str, Any]]) -> List[tuple]:
-    """Encodes the call data for multicall."""
+    """
+    Encodes the call data for multicall.
+
+    Encoded data is kept in the call, so retried chunks are not encoded again.
+    """
     multicall_calls = []
     for call in calls:
         try:
-            encoded_data = call["method"].encode_data(call["inputs"]).hex()
+            encoded_data = call.get("call_data")
+            if encoded_data is None:
+                encoded_data = call["method"].encode_data(call["inputs"]).hex()
+                call["call_data"] = encoded_data
             multicall_calls.append((call["address"], encoded_data))
         except Exception as e:
             logger.error(
@@ -233,55 +244,86 @@ def make_multicall(
     return results
 
 
+def get_function_signature(
+    function_signatures: Dict[Tuple[str, str], FunctionSignature],
+    interfaces: Dict[str, Any],
+    address: str,
+    name: str,
+) -> FunctionSignature:
+    """Returns cached encoding/decoding plan of the contract function."""
+    function_signature = function_signatures.get((address, name))
+    if function_signature is None:
+        function_signature = FunctionSignature(
+            interfaces[address].get_function_by_name(name)
+        )
+        function_signatures[(address, name)] = function_signature
+    return function_signature
+
+
 def generate_calls_of_level(
     calls: List[Dict[str, Any]],
     responses: Dict[str, Any],
     contracts_ABIs: Dict[str, Any],
     interfaces: Dict[str, Any],
-) -> List[Dict[str, Any]]:
-    """Generates the calls for the current level."""
-    calls_of_level = []
+    function_signatures: Optional[Dict[Tuple[str, str], FunctionSignature]] = None,
+) -> Tuple[int, Iterator[Dict[str, Any]]]:
+    """
+    Generates the calls for the current level.
+
+    Returns number of calls and iterator which yields them lazily. Calls to skip
+    and parameters are resolved before iteration, so responses added while the
+    level is crawled do not change it.
+    """
+    if function_signatures is None:
+        function_signatures = {}
+    calls_plan: List[Tuple[Dict[str, Any], FunctionSignature, List[Sequence[Any]]]] = []
+    calls_count = 0
     for call in calls:
         if call["generated_hash"] in responses:
             continue
-        parameters = []
+        method = get_function_signature(
+            function_signatures, interfaces, call["address"], call["name"]
+        )
+        parameters: List[Sequence[Any]] = []
         for input in call["inputs"]:
-            if isinstance(input["value"], (str, int)):
-                if input["value"] not in responses:
-                    parameters.append([input["value"]])
+            value = input["value"]
+            if isinstance(value, str) and value in responses:
+                if (
+                    value in contracts_ABIs[call["address"]]
+                    and contracts_ABIs[call["address"]][value]["name"] == "totalSupply"
+                ):
+                    # Hack for totalSupply
+                    parameters.append(range(1, responses[value][0][0] + 1))
                 else:
-                    if (
-                        input["value"] in contracts_ABIs[call["address"]]
-                        and contracts_ABIs[call["address"]][input["value"]]["name"]
-                        == "totalSupply"
-                    ):
-                        # Hack for totalSupply
-                        parameters.append(
-                            list(range(1, responses[input["value"]][0][0] + 1))
-                        )
-                    else:
-                        parameters.append(responses[input["value"]])
-            elif isinstance(input["value"], list):
-                parameters.append(input["value"])
+                    parameters.append(responses[value])
+            elif isinstance(value, (str, int)):
+                parameters.append([value])
+            elif isinstance(value, list):
+                parameters.append(value)
             else:
                 raise Exception("Unknown input value type")
+        calls_plan.append((call, method, parameters))
+        calls_count += math.prod(len(values) for values in parameters)
+
+    return calls_count, _iterate_calls_of_level(calls_plan)
+
+
+def _iterate_calls_of_level(
+    calls_plan: List[Tuple[Dict[str, Any], FunctionSignature, List[Sequence[Any]]]],
+) -> Iterator[Dict[str, Any]]:
+    for call, method, parameters in calls_plan:
         for call_parameters in itertools.product(*parameters):
             if len(call_parameters) == 1 and isinstance(call_parameters[0], tuple):
                 call_parameters = call_parameters[0]
-            calls_of_level.append(
-                {
-                    "address": call["address"],
-                    "method": FunctionSignature(
-                        interfaces[call["address"]].get_function_by_name(call["name"])
-                    ),
-                    "hash": call["generated_hash"],
-                    "inputs": call_parameters,
-                    "v3": call.get("v3", False),
-                    "customer_id": call.get("customer_id"),
-                    "instance_id": call.get("instance_id"),
-                }
-            )
-    return calls_of_level
+            yield {
+                "address": call["address"],
+                "method": method,
+                "hash": call["generated_hash"],
+                "inputs": call_parameters,
+                "v3": call.get("v3", False),
+                "customer_id": call.get("customer_id"),
+                "instance_id": call.get("instance_id"),
+            }
 
 
 def process_results(
@@ -292,7 +334,8 @@ def process_results(
 ) -> int:
     """Processes the results and adds them to the appropriate database sessions."""
     add_to_session_count = 0
-    sessions_to_commit = set()
+    labels_by_session: Dict[Any, List[Dict[str, Any]]] = {}
+    label_model_by_session: Dict[Any, Any] = {}
     for result in make_multicall_result:
         v3 = result.get("v3", False)
         if v3:
@@ -305,19 +348,52 @@ def process_results(
             logger.error(f"No db_session found for result {result}")
             continue
         db_view = view_call_to_label(blockchain_type, result, v3)
-        db_session.add(db_view)
-        sessions_to_commit.add(db_session)
+        labels_by_session.setdefault(db_session, []).append(label_to_record(db_view))
+        label_model_by_session[db_session] = type(db_view)
         add_to_session_count += 1
         if result["hash"] not in responses:
             responses[result["hash"]] = []
         responses[result["hash"]].append(result["result"])
-    # Commit all sessions
-    for session in sessions_to_commit:
+    # Copy labels and commit all sessions
+    for session, labels in labels_by_session.items():
+        copy_labels(session, label_model_by_session[session], labels)
         commit_session(session)
     logger.info(f"{add_to_session_count} labels committed to database.")
     return add_to_session_count
 
 
+@dataclass
+class _MulticallChunk:
+    calls: List[Dict[str, Any]]
+    retry: int = 0
+    # Set by executor thread when multicall starts, queued chunks have no deadline
+    started_at: Optional[float] = None
+
+
+def _run_multicall_chunk(chunk: _MulticallChunk, *args: Any) -> Any:
+    chunk.started_at = time.monotonic()
+    return make_multicall(*args)
+
+
+def _retry_chunk(
+    chunk: _MulticallChunk,
+    batch_size: int,
+    retry_chunks: Deque[_MulticallChunk],
+    error: Exception,
+    max_retries: int = 5,
+) -> None:
+    """
+    Splits failed chunk to the new batch size and puts it in front of the retry queue.
+    """
+    if chunk.retry >= max_retries:
+        raise error
+    sub_chunks = [
+        _MulticallChunk(chunk.calls[i : i + batch_size], chunk.retry + 1)
+        for i in range(0, len(chunk.calls), batch_size)
+    ]
+    retry_chunks.extendleft(reversed(sub_chunks))
+
+
 def crawl_calls_level(
     web3_client: Web3,
     db_sessions: Dict[Any, Any],
@@ -333,53 +409,125 @@ def crawl_calls_level(
     max_batch_size: int = 3000,
     min_batch_size: int = 4,
     block_hash: Optional[str] = None,
+    max_in_flight: int = 4,
+    call_timeout: float = 20,
+    function_signatures: Optional[Dict[Tuple[str, str], FunctionSignature]] = None,
 ) -> int:
-    """Crawls calls at a specific level."""
-    calls_of_level = generate_calls_of_level(
-        calls, responses, contracts_ABIs, interfaces
+    """
+    Crawls calls at a specific level.
+
+    Keeps up to max_in_flight multicall chunks in flight and writes results as they
+    arrive. Chunk size and number of chunks in flight grow while calls succeed fast
+    and shrink on node errors and timeouts.
+    """
+    assert max_in_flight > 0, "max_in_flight must be greater than 0"
+
+    calls_count, calls_of_level = generate_calls_of_level(
+        calls, responses, contracts_ABIs, interfaces, function_signatures
     )
-    retry = 0
-    while len(calls_of_level) > 0:
-        make_multicall_result = []
-        try:
-            call_chunk = calls_of_level[:batch_size]
-            logger.info(
-                f"Calling multicall2 with {len(call_chunk)} calls at block {block_number}"
-            )
-            with ThreadPoolExecutor(max_workers=1) as executor:
+    position = 0
+    retry_chunks: Deque[_MulticallChunk] = deque()
+    in_flight_limit = max(max_in_flight // 2, 1)
+    futures: Dict[Future, _MulticallChunk] = {}
+
+    # Extra workers for timed out calls, running thread could not be interrupted
+    executor = ThreadPoolExecutor(max_workers=max_in_flight * 2)
+    try:
+        while futures or retry_chunks or position < calls_count:
+            while len(futures) < in_flight_limit and (
+                retry_chunks or position < calls_count
+            ):
+                if retry_chunks:
+                    chunk = retry_chunks.popleft()
+                else:
+                    chunk = _MulticallChunk(
+                        list(itertools.islice(calls_of_level, batch_size))
+                    )
+                    if len(chunk.calls) == 0:
+                        position = calls_count
+                        break
+                    position += len(chunk.calls)
+                logger.info(
+                    f"Calling multicall2 with {len(chunk.calls)} calls at block {block_number}, "
+                    f"in flight: {len(futures) + 1}/{in_flight_limit}"
+                )
                 future = executor.submit(
-                    make_multicall,
+                    _run_multicall_chunk,
+                    chunk,
                     multicall_method,
-                    call_chunk,
+                    chunk.calls,
                     block_timestamp,
                     block_number,
                     block_hash,
                 )
-                make_multicall_result = future.result(timeout=20)
-            retry = 0
-            calls_of_level = calls_of_level[batch_size:]
-            logger.info(f"Length of tasks left: {len(calls_of_level)}.")
-            batch_size = min(batch_size * 2, max_batch_size)
-        except ValueError as e:
-            logger.error(f"ValueError: {e}, retrying")
-            retry += 1
-            if "missing trie node" in str(e):
-                time.sleep(4)
-            if retry > 5:
-                raise e
-            batch_size = max(batch_size // 4, min_batch_size)
-        except TimeoutError as e:
-            logger.error(f"TimeoutError: {e}, retrying")
-            retry += 1
-            if retry > 5:
-                raise e
-            batch_size = max(batch_size // 3, min_batch_size)
-        except Exception as e:
-            logger.error(f"Exception: {e}")
-            raise e
-        time.sleep(2)
-        logger.debug(f"Retry: {retry}")
-        process_results(make_multicall_result, db_sessions, responses, blockchain_type)
+                futures[future] = chunk
+
+            if not futures:
+                continue
+
+            started = [
+                chunk.started_at
+                for chunk in futures.values()
+                if chunk.started_at is not None
+            ]
+            # Chunks could wait for a thread behind timed out calls
+            nearest_deadline = (
+                min(started) + call_timeout
+                if started
+                else time.monotonic() + call_timeout
+            )
+            done, _ = wait(
+                list(futures.keys()),
+                timeout=max(nearest_deadline - time.monotonic(), 0),
+                return_when=FIRST_COMPLETED,
+            )
+            now = time.monotonic()
+
+            for future in done:
+                chunk = futures.pop(future)
+                try:
+                    make_multicall_result = future.result()
+                except ValueError as e:
+                    logger.error(f"ValueError: {e}, retrying")
+                    if "missing trie node" in str(e):
+                        time.sleep(4)
+                    batch_size = max(batch_size // 4, min_batch_size)
+                    in_flight_limit = max(in_flight_limit // 2, 1)
+                    _retry_chunk(chunk, batch_size, retry_chunks, e)
+                    continue
+                except Exception as e:
+                    logger.error(f"Exception: {e}")
+                    raise e
+
+                process_results(
+                    make_multicall_result, db_sessions, responses, blockchain_type
+                )
+                batch_size = min(batch_size * 2, max_batch_size)
+                if (
+                    chunk.started_at is not None
+                    and now - chunk.started_at < call_timeout / 4
+                ):
+                    in_flight_limit = min(in_flight_limit + 1, max_in_flight)
+                logger.info(
+                    f"Length of tasks left: {calls_count - position + sum(len(retry_chunk.calls) for retry_chunk in retry_chunks)}."
+                )
+
+            for future, chunk in list(futures.items()):
+                if chunk.started_at is None or now - chunk.started_at < call_timeout:
+                    continue
+                # Result of the timed out call is dropped
+                futures.pop(future)
+                future.cancel()
+                error = TimeoutError(
+                    f"Multicall of {len(chunk.calls)} calls took more than {call_timeout} seconds"
+                )
+                logger.error(f"TimeoutError: {error}, retrying")
+                batch_size = max(batch_size // 3, min_batch_size)
+                in_flight_limit = max(in_flight_limit // 2, 1)
+                _retry_chunk(chunk, batch_size, retry_chunks, error)
+    finally:
+        executor.shutdown(wait=False)
+
     return batch_size
 
 
@@ -564,6 +712,8 @@ def parse_jobs(
     moonstream_token: str,
     web3_uri: Optional[str] = None,
     customer_db_uri: Optional[str] = None,
+    max_in_flight: int = 4,
+    call_timeout: float = 20,
 ):
     """
     Parses jobs from a list and generates web3 interfaces for each contract.
@@ -573,6 +723,8 @@ def parse_jobs(
     calls: Dict[int, List[Any]] = {0: []}
     responses: Dict[str, Any] = {}
     db_sessions: Dict[Any, Any] = {}
+    # Encoding/decoding plans shared by all levels
+    function_signatures: Dict[Tuple[str, str], FunctionSignature] = {}
 
     web3_client = connect_to_web3(blockchain_type, web3_provider_uri, web3_uri)
     block_number, block_timestamp, block_hash = get_block_info(
@@ -676,6 +828,9 @@ def parse_jobs(
             blockchain_type=blockchain_type,
             block_timestamp=block_timestamp,
             block_hash=block_hash,
+            max_in_flight=max_in_flight,
+            call_timeout=call_timeout,
+            function_signatures=function_signatures,
         )
 
         for level in call_tree_levels:
@@ -693,6 +848,9 @@ def parse_jobs(
                 blockchain_type=blockchain_type,
                 block_timestamp=block_timestamp,
                 block_hash=block_hash,
+                max_in_flight=max_in_flight,
+                call_timeout=call_timeout,
+                function_signatures=function_signatures,
             )
     finally:
         # Close all sessions
@@ -772,6 +930,8 @@ def handle_crawl(args: argparse.Namespace) -> None:
         args.moonstream_token,
         args.web3_uri,
         args.customer_db_uri,
+        args.max_in_flight,
+        args.call_timeout,
     )
 
 
@@ -958,6 +1118,18 @@ def main() -> None:
         default=500,
         help="Size of chunks wich send to Multicall2 contract.",
     )
+    view_state_crawler_parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=4,
+        help="Maximum number of Multicall2 chunks requested concurrently.",
+    )
+    view_state_crawler_parser.add_argument(
+        "--call-timeout",
+        type=float,
+        default=20,
+        help="Timeout in seconds of one Multicall2 chunk call.",
+    )
     view_state_crawler_parser.add_argument(
         "--customer-db-uri",
         type=str,
@@ -2,7 +2,8 @@ import getpass
 import os
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
-from eth_abi import decode_single, encode_single
+from eth_abi.decoding import ContextFramesBytesIO
+from eth_abi.registry import registry as abi_registry
 from eth_account.account import Account  # type: ignore
 from eth_typing.evm import ChecksumAddress
 from eth_utils import function_signature_to_4byte_selector
@@ -188,6 +189,13 @@ class FunctionInput:
 
 
 class FunctionSignature:
+    """
+    Encoding and decoding plan of contract function calls.
+
+    Selector, input encoder and output decoder are resolved once, so one
+    instance should be reused for all calls of the function.
+    """
+
     def __init__(self, function: ContractFunction):
         self.name = function.abi["name"]
         self.inputs = [
@@ -212,12 +220,15 @@ class FunctionSignature:
 
         self.fourbyte = function_signature_to_4byte_selector(self.signature)
 
+        self._encoder = abi_registry.get_encoder(self.input_types_signature)
+        self._decoder = abi_registry.get_decoder(self.output_types_signature)
+
     def encode_data(self, args=None) -> bytes:
-        return (
-            self.fourbyte + encode_single(self.input_types_signature, args)
-            if args
-            else self.fourbyte
-        )
+        return self.fourbyte + self._encoder(args) if args else self.fourbyte
 
     def decode_data(self, output):
-        return decode_single(self.output_types_signature, output)
+        if not isinstance(output, (bytes, bytearray)):
+            raise TypeError(
+                f"The `output` value must be of bytes type. Got {type(output)}"
+            )
+        return self._decoder(ContextFramesBytesIO(output))
@@ -0,0 +1,198 @@
+"""
+Columnar encoding of query results to Parquet and Arrow IPC files.
+
+Columns types are taken from the PostgreSQL types of cursor description.
+Requires pyarrow, install mooncrawl with "columnar" extra.
+"""
+
+import json
+import logging
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.engine import Result
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+PARQUET_FILE_TYPE = "parquet"
+ARROW_FILE_TYPE = "arrow"
+COLUMNAR_FILE_TYPES = {
+    PARQUET_FILE_TYPE: "application/vnd.apache.parquet",
+    ARROW_FILE_TYPE: "application/vnd.apache.arrow.file",
+}
+
+# Max precision of Arrow decimal types, numbers with bigger precision are stored
+# as strings to keep them exact
+DECIMAL128_MAX_PRECISION = 38
+DECIMAL256_MAX_PRECISION = 76
+
+# PostgreSQL types OIDs
+PG_BOOL = 16
+PG_BYTEA = 17
+PG_INT8 = 20
+PG_INT2 = 21
+PG_INT4 = 23
+PG_JSON = 114
+PG_FLOAT4 = 700
+PG_FLOAT8 = 701
+PG_DATE = 1082
+PG_TIMESTAMP = 1114
+PG_TIMESTAMPTZ = 1184
+PG_NUMERIC = 1700
+PG_JSONB = 3802
+
+
+class ChunksSink:
+    """
+    Writable file-like object, written data is taken out with drain().
+    """
+
+    def __init__(self) -> None:
+        self.closed = False
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data: Any) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def to_string(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    elif isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def to_binary(value: Any) -> Optional[bytes]:
+    if value is None:
+        return None
+    return bytes(value)
+
+
+def to_decimal(value: Any) -> Optional[Decimal]:
+    if value is None or isinstance(value, Decimal):
+        return value
+    return Decimal(value)
+
+
+def column_type(pa: Any, description: Any) -> Tuple[Any, Callable[[Any], Any]]:
+    """
+    Returns Arrow type of column and converter of its values.
+    """
+    type_code = description[1]
+    if type_code == PG_BOOL:
+        return pa.bool_(), lambda value: value
+    elif type_code == PG_INT2:
+        return pa.int16(), lambda value: value
+    elif type_code == PG_INT4:
+        return pa.int32(), lambda value: value
+    elif type_code == PG_INT8:
+        return pa.int64(), lambda value: value
+    elif type_code == PG_FLOAT4:
+        return pa.float32(), lambda value: value
+    elif type_code == PG_FLOAT8:
+        return pa.float64(), lambda value: value
+    elif type_code == PG_BYTEA:
+        return pa.binary(), to_binary
+    elif type_code == PG_DATE:
+        return pa.date32(), lambda value: value
+    elif type_code == PG_TIMESTAMP:
+        return pa.timestamp("us"), lambda value: value
+    elif type_code == PG_TIMESTAMPTZ:
+        return pa.timestamp("us", tz="UTC"), lambda value: value
+    elif type_code == PG_NUMERIC:
+        precision, scale = description[4], description[5]
+        if precision is not None and precision <= DECIMAL128_MAX_PRECISION:
+            return pa.decimal128(precision, scale or 0), to_decimal
+        elif precision is not None and precision <= DECIMAL256_MAX_PRECISION:
+            return pa.decimal256(precision, scale or 0), to_decimal
+    return pa.string(), to_string
+
+
+def columnar_chunks(
+    result: Result,
+    file_type: str,
+    yield_per: int,
+    metadata: Optional[Dict[str, str]] = None,
+) -> Iterator[bytes]:
+    """
+    Encodes query result to Parquet or Arrow IPC file, one record batch is
+    written per partition of rows and written bytes are yielded right away.
+    """
+    try:
+        import pyarrow as pa  # type: ignore
+        import pyarrow.parquet as pq  # type: ignore
+    except ImportError:
+        raise Exception(
+            f"pyarrow is required for {file_type} file type, install mooncrawl[columnar]"
+        )
+
+    columns = list(result.keys())
+    sink = ChunksSink()
+    writer: Any = None
+    schema: Any = None
+    converters: List[Callable[[Any], Any]] = []
+
+    def open_writer(descriptions: Optional[List[Any]]) -> None:
+        nonlocal writer, schema, converters
+        fields = []
+        converters = []
+        for i, name in enumerate(columns):
+            if descriptions is not None:
+                arrow_type, converter = column_type(pa, descriptions[i])
+            else:
+                arrow_type, converter = pa.string(), to_string
+            fields.append(pa.field(name, arrow_type))
+            converters.append(converter)
+        schema = pa.schema(fields, metadata=metadata)
+
+        if file_type == PARQUET_FILE_TYPE:
+            writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        else:
+            writer = pa.ipc.new_file(
+                sink, schema, options=pa.ipc.IpcWriteOptions(compression="zstd")
+            )
+
+    for rows in result.partitions(yield_per):
+        if writer is None:
+            # Description of server side cursor is available after the first fetch
+            open_writer(result.cursor.description)  # type: ignore
+        batch = pa.record_batch(
+            [
+                pa.array(
+                    [converters[i](row[i]) for row in rows], type=schema.field(i).type
+                )
+                for i in range(len(columns))
+            ],
+            schema=schema,
+        )
+        if file_type == PARQUET_FILE_TYPE:
+            writer.write_batch(batch)
+        else:
+            writer.write(batch)
+        yield sink.drain()
+
+    if writer is None:
+        open_writer(None)
+    writer.close()
+    yield sink.drain()
@@ -3,21 +3,26 @@ import hashlib
 import json
 import logging
 import re
+import threading
+import zlib
 from collections import OrderedDict
 from io import StringIO
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
 
-from sqlalchemy.orm import sessionmaker
+import boto3  # type: ignore
+from botocore.exceptions import ClientError  # type: ignore
+from sqlalchemy.engine import Engine, Result
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.sql import text
 from sqlalchemy.sql.expression import TextClause
 
-from ..actions import push_data_to_bucket, get_customer_db_uri
+from ..actions import push_stream_to_bucket, get_customer_db_uri
 from ..db import (
     RO_pre_ping_query_engine,
-    MOONSTREAM_DB_URI_READ_ONLY,
     DBEngine,
 )
 from ..reporter import reporter
+from .columnar import COLUMNAR_FILE_TYPES, columnar_chunks
 from ..settings import (
     CRAWLER_LABEL,
     SEER_CRAWLER_LABEL,
@@ -29,6 +34,12 @@ logger = logging.getLogger(__name__)
 
 QUERY_REGEX = re.compile(r"[\[\]@#$%^&?;`]|/\*|\*/")
 
+# Rows fetched from server side cursor at once
+QUERY_YIELD_PER = 5000
+
+_customer_engines: Dict[Tuple[str, str], Engine] = {}
+_customer_engines_lock = threading.Lock()
+
 
 class QueryNotValid(Exception):
     """
@@ -64,6 +75,146 @@ def from_json_types(value):
         return str(value)
 
 
+def csv_chunks(result: Result, yield_per: int = QUERY_YIELD_PER) -> Iterator[str]:
+    """
+    Encodes query result to CSV, yields one chunk per partition of rows.
+    """
+    buffer = StringIO()
+    writer = csv.writer(buffer, delimiter=";")
+    writer.writerow(result.keys())
+    for rows in result.partitions(yield_per):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def json_chunks(
+    result: Result,
+    block_number: Optional[int],
+    block_timestamp: Optional[int],
+    yield_per: int = QUERY_YIELD_PER,
+) -> Iterator[str]:
+    """
+    Encodes query result to the same JSON as json.dumps of whole data does,
+    yields one chunk per partition of rows.
+    """
+    yield f'{{"block_number": {json.dumps(block_number)}, "block_timestamp": {json.dumps(block_timestamp)}, "data": ['
+    separator = ""
+    for rows in result.partitions(yield_per):
+        yield separator + ", ".join(
+            json.dumps(
+                {key: to_json_types(value) for key, value in row._asdict().items()}
+            )
+            for row in rows
+        )
+        separator = ", "
+    yield "]}"
+
+
+def gzip_chunks(chunks: Iterable[str]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode("utf-8"))
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def get_query_engine(
+    customer_id: Optional[str] = None, instance_id: Optional[str] = None
+) -> Tuple[Engine, str]:
+    """
+    Returns database engine to run query on and label of crawled blocks.
+
+    Engines of customer databases are created once per process.
+    """
+    if customer_id is None or instance_id is None:
+        return RO_pre_ping_query_engine, CRAWLER_LABEL
+
+    with _customer_engines_lock:
+        engine = _customer_engines.get((customer_id, instance_id))
+        if engine is None:
+            db_uri = get_customer_db_uri(customer_id, instance_id, "customer")
+            engine = DBEngine(url=db_uri, schema=MOONSTREAM_DB_V3_SCHEMA_NAME).engine
+            _customer_engines[(customer_id, instance_id)] = engine
+    return engine, SEER_CRAWLER_LABEL
+
+
+def get_latest_block(
+    db_session: Session, blockchain_table: str, label: str
+) -> Tuple[Any, Any]:
+    """
+    Returns number and timestamp of the latest labeled block, watermark of query result.
+    """
+    row = db_session.execute(
+        text(
+            f"SELECT block_number, block_timestamp FROM {blockchain_table} WHERE label='{label}' ORDER BY block_number DESC LIMIT 1"
+        ),
+    ).one()
+    return row[0], row[1]
+
+
+def query_hash(query: TextClause) -> str:
+    return hashlib.sha256(str(query).encode("utf-8")).hexdigest()
+
+
+def is_result_up_to_date(
+    bucket: str,
+    key: str,
+    query: TextClause,
+    customer_id: Optional[str] = None,
+    instance_id: Optional[str] = None,
+    blockchain_table: Optional[str] = None,
+) -> bool:
+    """
+    Checks if result of the query in bucket was generated by the same query at the
+    current latest labeled block, so query execution could be skipped.
+    """
+    if blockchain_table is None:
+        return False
+
+    try:
+        response = boto3.client("s3").head_object(Bucket=bucket, Key=key)
+    except ClientError:
+        return False
+    result_metadata = response.get("Metadata", {})
+    if result_metadata.get("query_hash") != query_hash(query):
+        return False
+
+    engine, label = get_query_engine(customer_id, instance_id)
+    db_session = sessionmaker(bind=engine)()
+    try:
+        block_number, _ = get_latest_block(db_session, blockchain_table, label)
+    finally:
+        db_session.close()
+
+    return result_metadata.get("block_number") == json.dumps(block_number)
+
+
+def refresh_result(bucket: str, key: str) -> None:
+    """
+    Updates Last-Modified of up to date query result without re-execution, so
+    clients waiting for result with If-Modified-Since get it.
+    """
+    s3 = boto3.client("s3")
+    response = s3.head_object(Bucket=bucket, Key=key)
+    object_kwargs: Dict[str, Any] = {
+        "ContentType": response["ContentType"],
+        "Metadata": response.get("Metadata", {}),
+    }
+    if response.get("ContentEncoding") is not None:
+        object_kwargs["ContentEncoding"] = response["ContentEncoding"]
+    s3.copy_object(
+        Bucket=bucket,
+        Key=key,
+        CopySource={"Bucket": bucket, "Key": key},
+        MetadataDirective="REPLACE",
+        **object_kwargs,
+    )
+
+
 def data_generate(
     query_id: str,
     file_type: str,
@@ -78,16 +229,15 @@ def data_generate(
 ):
     """
     Generate query and push it to S3
-    """
-    label = CRAWLER_LABEL
-    db_uri = MOONSTREAM_DB_URI_READ_ONLY
-    if customer_id is not None and instance_id is not None:
-        db_uri = get_customer_db_uri(customer_id, instance_id, "customer")
-        label = SEER_CRAWLER_LABEL
 
-        engine = DBEngine(url=db_uri, schema=MOONSTREAM_DB_V3_SCHEMA_NAME).engine
-    else:
-        engine = RO_pre_ping_query_engine
+    Rows are fetched with server side cursor, encoded and compressed on the fly and
+    uploaded with multipart upload, so memory usage does not depend on result size.
+    file_type is one of json, csv, parquet or arrow.
+
+    Latest labeled block and hash of query are stored in result metadata, see
+    is_result_up_to_date.
+    """
+    engine, label = get_query_engine(customer_id, instance_id)
 
     process_session = sessionmaker(bind=engine)
     db_session = process_session()
@@ -98,6 +248,7 @@ def data_generate(
         "file_type": file_type,
         "params_hash": params_hash,
         "params": json.dumps(params),
+        "query_hash": query_hash(query),
     }
 
     block_number = None
@@ -106,45 +257,39 @@ def data_generate(
     try:
         ### If blockchain is provided, we need to get the latest block number and timestamp
         if blockchain_table is not None:
-            block_number, block_timestamp = db_session.execute(
-                text(
-                    f"SELECT block_number, block_timestamp FROM {blockchain_table} WHERE label='{label}' ORDER BY block_number DESC LIMIT 1"
-                ),
-            ).one()
-        if file_type == "csv":
-            csv_buffer = StringIO()
-            csv_writer = csv.writer(csv_buffer, delimiter=";")
-
-            query_instance = db_session.execute(query, params)  # type: ignore
-
-            csv_writer.writerow(query_instance.keys())
-            csv_writer.writerows(query_instance.fetchall())
-
-            metadata["block_number"] = block_number  # type: ignore
-            metadata["block_timestamp"] = block_timestamp  # type: ignore
-
-            data = csv_buffer.getvalue().encode("utf-8")
+            block_number, block_timestamp = get_latest_block(
+                db_session, blockchain_table, label
+            )
+        metadata["block_number"] = json.dumps(block_number)
+        metadata["block_timestamp"] = json.dumps(block_timestamp)
 
+        query_instance = db_session.execute(
+            query, params, execution_options={"yield_per": QUERY_YIELD_PER}  # type: ignore
+        )
+        content_encoding: Optional[str] = "gzip"
+        if file_type in COLUMNAR_FILE_TYPES:
+            # Parquet and Arrow files are compressed by their writers
+            chunks = columnar_chunks(
+                query_instance, file_type, QUERY_YIELD_PER, metadata=metadata
+            )
+            content_type = COLUMNAR_FILE_TYPES[file_type]
+            content_encoding = None
+        elif file_type == "csv":
+            chunks = gzip_chunks(csv_chunks(query_instance))
+            content_type = "text/csv"
         else:
+            chunks = gzip_chunks(
+                json_chunks(query_instance, block_number, block_timestamp)
+            )
+            content_type = "application/json"
 
-            data = json.dumps(
-                {
-                    "block_number": block_number,
-                    "block_timestamp": block_timestamp,
-                    "data": [
-                        {
-                            key: to_json_types(value)
-                            for key, value in row._asdict().items()
-                        }
-                        for row in db_session.execute(query, params).all()
-                    ],
-                }
-            ).encode("utf-8")
-        push_data_to_bucket(
-            data=data,
+        push_stream_to_bucket(
+            chunks=chunks,
             key=key,
             bucket=bucket,
             metadata=metadata,
+            content_type=content_type,
+            content_encoding=content_encoding,
         )
     except Exception as err:
         logger.error(f"Error while generating data: {err}")
@@ -157,5 +302,7 @@ def data_generate(
                 f"query_id:{query_id}" f"file_type:{file_type}",
             ],
         )
+        # Fails job in executor, so waiting clients get the error
+        raise
     finally:
         db_session.close()
@@ -37,8 +37,8 @@ setup(
         "bugout>=0.2.13",
         "chardet",
         "fastapi",
-        "moonstreamdb>=0.4.6",
-        "moonstreamdb-v3>=0.1.4",
+        "moonstreamdb>=0.4.7",
+        "moonstreamdb-v3>=0.1.7",
         "moonstream-types>=0.0.11",
         "moonstream>=0.1.2",
         "moonworm[moonstream]>=0.9.3",
@@ -53,6 +53,8 @@ setup(
     extras_require={
         "dev": ["black", "isort", "mypy", "types-requests", "types-python-dateutil"],
         "distribute": ["build", "twine"],
+        "columnar": ["pyarrow"],
+        "redis": ["redis"],
     },
     entry_points={
         "console_scripts": [
@@ -4,9 +4,10 @@ import json
 import logging
 import uuid
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from itertools import chain
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import boto3  # type: ignore
 from bugout.data import (
@@ -23,6 +24,10 @@ from bugout.data import (
 from bugout.exceptions import BugoutResponseException
 from bugout.journal import SearchOrder
 from ens.utils import is_valid_ens_name  # type: ignore
+from eth_abi import encode_single
+from eth_abi.decoding import ContextFramesBytesIO
+from eth_abi.registry import registry as abi_registry
+from eth_utils import function_signature_to_4byte_selector
 from eth_utils.address import is_address  # type: ignore
 from moonstreamdb.blockchain import AvailableBlockchainType
 from moonstreamdb.models import EthereumLabel
@@ -38,6 +43,7 @@ from web3._utils.validation import validate_abi
 
 from . import data
 from .admin.subscription_types import CANONICAL_SUBSCRIPTION_TYPES
+from .cache import interfaces_cache
 from .middleware import MoonstreamHTTPException
 from .reporter import reporter
 from .selectors_storage import selectors
@@ -52,8 +58,8 @@ from .settings import (
     MOONSTREAM_S3_SMARTCONTRACTS_ABI_PREFIX,
 )
 from .settings import bugout_client as bc
-from .settings import multicall_contracts, supportsInterface_abi
-from .web3_provider import FunctionSignature, connect, multicall
+from .settings import multicall_contracts
+from .web3_provider import connect, multicall
 
 logger = logging.getLogger(__name__)
 
@@ -987,6 +993,54 @@ def get_moonworm_tasks(
     return moonworm_tasks
 
 
+# Interfaces probed on blockchains without multicall contract
+GENERAL_INTERFACES = ["IERC165", "IERC721", "IERC1155", "IERC20"]
+
+SUPPORTS_INTERFACE_SELECTOR = function_signature_to_4byte_selector(
+    "supportsInterface(bytes4)"
+)
+supports_interface_decoder = abi_registry.get_decoder("(bool)")
+
+# Sorted (selector, supportsInterface calldata) pairs of all known interfaces
+_supports_interface_calls: Optional[List[Tuple[str, str]]] = None
+
+
+def supports_interface_call_data(selector: str) -> str:
+    return (
+        SUPPORTS_INTERFACE_SELECTOR
+        + encode_single("(bytes4)", [bytes.fromhex(selector)])
+    ).hex()
+
+
+def get_supports_interface_calls() -> List[Tuple[str, str]]:
+    """
+    Returns supportsInterface calldata of all known interfaces, built once per process.
+    """
+    global _supports_interface_calls
+    if _supports_interface_calls is None:
+        _supports_interface_calls = [
+            (selector, supports_interface_call_data(selector))
+            for selector in sorted(selectors.keys())
+        ]
+    return _supports_interface_calls
+
+
+def decode_supports_interface(output: bytes) -> bool:
+    return supports_interface_decoder(ContextFramesBytesIO(output))[0]
+
+
+def get_address_code(
+    web3_client: Web3, blockchain_type: AvailableBlockchainType, address: str
+) -> bytes:
+    try:
+        return web3_client.eth.getCode(address)
+    except Exception as e:
+        logger.warning(
+            f"Error while getting code of address: {e} in blockchain: {blockchain_type}"
+        )
+        return b""
+
+
 def get_list_of_support_interfaces(
     blockchain_type: AvailableBlockchainType,
     address: str,
@@ -995,85 +1049,86 @@ def get_list_of_support_interfaces(
 ):
     """
     Returns list of interfaces supported by given address
+
+    Results are cached by blockchain, address and hash of contract code.
     """
 
-    result = {}
+    result: Dict[str, Any] = {}
 
     try:
-        _, _, is_contract = check_if_smart_contract(
-            blockchain_type=blockchain_type, address=address, user_token=user_token
-        )
+        web3_client = connect(blockchain_type, user_token=user_token)
 
-        if not is_contract:
+        code = get_address_code(web3_client, blockchain_type, address)
+        if code == b"":
             raise AddressNotSmartContractException(f"Address not are smart contract")
 
-        web3_client = connect(blockchain_type, user_token=user_token)
+        code_hash = hashlib.sha256(code).hexdigest()
+        cache_key = f"{blockchain_type.value}:{address.lower()}:{code_hash}"
+        cached_result = interfaces_cache.get(cache_key)
+        if cached_result is not None:
+            return cached_result
 
-        contract = web3_client.eth.contract(
-            address=Web3.toChecksumAddress(address),
-            abi=supportsInterface_abi,
-        )
+        checksum_address = Web3.toChecksumAddress(address)
 
         if blockchain_type in multicall_contracts:
-            calls = []
+            supports_interface_calls = get_supports_interface_calls()
+
+            multicall_result = multicall(
+                web3_client=web3_client,
+                blockchain_type=blockchain_type,
+                calls=[
+                    (checksum_address, call_data)
+                    for _, call_data in supports_interface_calls
+                ],
+                method=multicall_method,
+            )
 
-            list_of_interfaces = list(selectors.keys())
+            for (selector, _), (success, output) in zip(
+                supports_interface_calls, multicall_result
+            ):
+                if not success:
+                    continue
+                try:
+                    supported = decode_supports_interface(output)
+                except Exception:
+                    continue
+
+                if supported:
+                    result[selectors[selector]["name"]] = {  # type: ignore
+                        "selector": selector,
+                        "abi": selectors[selector]["abi"],  # type: ignore
+                    }
 
-            list_of_interfaces.sort()
+        else:
+            basic_selectors = {
+                selectors.name(selector): selector
+                for selector in selectors
+                if selectors.name(selector) in GENERAL_INTERFACES
+            }
 
-            for interface in list_of_interfaces:
-                calls.append(
-                    (
-                        contract.address,
-                        FunctionSignature(
-                            contract.get_function_by_name("supportsInterface")
-                        )
-                        .encode_data([bytes.fromhex(interface)])
-                        .hex(),
-                    )
+            def supports_interface(selector: str) -> bool:
+                output = web3_client.eth.call(
+                    {
+                        "to": checksum_address,
+                        "data": "0x" + supports_interface_call_data(selector),
+                    }
                 )
+                return decode_supports_interface(output)
 
-            try:
-                multicall_result = multicall(
-                    web3_client=web3_client,
-                    blockchain_type=blockchain_type,
-                    calls=calls,
-                    method=multicall_method,
+            with ThreadPoolExecutor(max_workers=len(GENERAL_INTERFACES)) as executor:
+                selectors_results = executor.map(
+                    supports_interface, basic_selectors.values()
                 )
-            except Exception as e:
-                logger.error(f"Error while getting list of support interfaces: {e}")
-
-            for i, selector in enumerate(list_of_interfaces):
-                if multicall_result[i][0]:
-                    supported = FunctionSignature(
-                        contract.get_function_by_name("supportsInterface")
-                    ).decode_data(multicall_result[i][1])
-
-                    if supported[0]:
-                        result[selectors[selector]["name"]] = {  # type: ignore
-                            "selector": selector,
-                            "abi": selectors[selector]["abi"],  # type: ignore
+                for interface_name, selector_result in zip(
+                    basic_selectors.keys(), selectors_results
+                ):
+                    if selector_result:
+                        result[interface_name] = {
+                            "selector": basic_selectors[interface_name],
+                            "abi": selectors[basic_selectors[interface_name]]["abi"],
                         }
 
-        else:
-            general_interfaces = ["IERC165", "IERC721", "IERC1155", "IERC20"]
-
-            basic_selectors = {
-                interface["name"]: selector
-                for selector, interface in selectors.items()
-                if interface["name"] in general_interfaces
-            }
-
-            for interface_name, selector in basic_selectors.items():
-                selector_result = contract.functions.supportsInterface(
-                    bytes.fromhex(selector)
-                ).call()  # returns bool
-
-                if selector_result:
-                    result[interface_name] = {
-                        "selector": basic_selectors[interface_name],
-                        "abi": selectors[basic_selectors[interface_name]]["abi"],
-                    }
+        interfaces_cache.set(cache_key, result)
     except Exception as err:
         logger.error(f"Error while getting list of support interfaces: {err}")
         MoonstreamHTTPException(status_code=500, internal_error=err)
@@ -1092,13 +1147,7 @@ def check_if_smart_contract(
     web3_client = connect(blockchain_type, user_token=user_token)
 
     is_contract = False
-    try:
-        code = web3_client.eth.getCode(address)
-    except Exception as e:
-        logger.warning(
-            f"Error while getting code of address: {e} in blockchain: {blockchain_type}"
-        )
-        code = b""
+    code = get_address_code(web3_client, blockchain_type, address)
 
     if code != b"":
         is_contract = True
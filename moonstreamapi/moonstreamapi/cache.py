@@ -0,0 +1,200 @@
+"""
+Caches of Brood responses used on every authenticated request and of
+contracts interfaces.
+
+Entries live in Redis when MOONSTREAM_REDIS_URL is set, so they are shared and
+invalidated across API workers, otherwise in process memory (TTL + LRU) of
+the worker. Keys never contain raw tokens.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+from bugout.data import BugoutResource, BugoutUser
+
+from .settings import (
+    MOONSTREAM_AUTH_CACHE_MAX_SIZE,
+    MOONSTREAM_AUTH_CACHE_TTL_SECONDS,
+    MOONSTREAM_INTERFACES_CACHE_TTL_SECONDS,
+    MOONSTREAM_REDIS_PASSWORD,
+    MOONSTREAM_REDIS_URL,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+REDIS_KEY_PREFIX = "moonstreamapi"
+
+
+def create_redis_client() -> Optional[Any]:
+    """
+    Returns Redis client if MOONSTREAM_REDIS_URL is set and redis package is installed.
+    """
+    if not MOONSTREAM_REDIS_URL:
+        return None
+    try:
+        import redis
+    except ImportError:
+        logger.warning("MOONSTREAM_REDIS_URL is set, but redis is not installed")
+        return None
+
+    pool = redis.ConnectionPool.from_url(
+        MOONSTREAM_REDIS_URL,
+        password=MOONSTREAM_REDIS_PASSWORD,
+        decode_responses=True,
+        socket_timeout=0.5,
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+class TTLCache(Generic[T]):
+    """
+    Thread safe cache with per entry TTL and LRU eviction.
+
+    With Redis client entries are kept only in Redis, local entries of one worker
+    could not be deleted by other workers. Errors of Redis are logged and treated
+    as cache misses.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        dumps: Callable[[T], str],
+        loads: Callable[[str], T],
+        ttl: int = MOONSTREAM_AUTH_CACHE_TTL_SECONDS,
+        max_size: int = MOONSTREAM_AUTH_CACHE_MAX_SIZE,
+        redis_client: Optional[Any] = None,
+    ) -> None:
+        self.namespace = namespace
+        self.dumps = dumps
+        self.loads = loads
+        self.ttl = ttl
+        self.max_size = max_size
+        self.redis_client = redis_client
+
+        self._entries: "OrderedDict[str, Tuple[float, T]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _redis_key(self, key: str) -> str:
+        return f"{REDIS_KEY_PREFIX}:{self.namespace}:{key}"
+
+    def get(self, key: str) -> Optional[T]:
+        if self.ttl <= 0:
+            return None
+
+        if self.redis_client is not None:
+            try:
+                raw_value = self.redis_client.get(self._redis_key(key))
+                if raw_value is None:
+                    return None
+                return self.loads(raw_value)
+            except Exception as e:
+                logger.warning(
+                    f"Could not get {self.namespace} cache entry from Redis: {e}"
+                )
+                return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+        return None
+
+    def set(self, key: str, value: T) -> None:
+        if self.ttl <= 0:
+            return
+
+        if self.redis_client is not None:
+            try:
+                self.redis_client.set(
+                    self._redis_key(key), self.dumps(value), ex=self.ttl
+                )
+            except Exception as e:
+                logger.warning(
+                    f"Could not set {self.namespace} cache entry in Redis: {e}"
+                )
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.redis_client is not None:
+            try:
+                self.redis_client.delete(self._redis_key(key))
+            except Exception as e:
+                logger.warning(
+                    f"Could not delete {self.namespace} cache entry in Redis: {e}"
+                )
+
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def dumps_subscriptions(subscriptions: Dict[str, List[BugoutResource]]) -> str:
+    return json.dumps(
+        {
+            subscription_type: [json.loads(resource.json()) for resource in resources]
+            for subscription_type, resources in subscriptions.items()
+        }
+    )
+
+
+def loads_subscriptions(raw_subscriptions: str) -> Dict[str, List[BugoutResource]]:
+    return {
+        subscription_type: [BugoutResource(**resource) for resource in resources]
+        for subscription_type, resources in json.loads(raw_subscriptions).items()
+    }
+
+
+redis_client = create_redis_client()
+
+# Token hash -> Brood user
+users_cache: TTLCache[BugoutUser] = TTLCache(
+    namespace="users",
+    dumps=lambda user: user.json(),
+    loads=BugoutUser.parse_raw,
+    redis_client=redis_client,
+)
+
+# User id -> subscriptions grouped by subscription type
+subscriptions_cache: TTLCache[Dict[str, List[BugoutResource]]] = TTLCache(
+    namespace="subscriptions",
+    dumps=dumps_subscriptions,
+    loads=loads_subscriptions,
+    redis_client=redis_client,
+)
+
+# "<blockchain>:<address>:<code hash>" -> interfaces supported by contract, TTL is
+# kept because proxies change implementation without changing their code
+interfaces_cache: TTLCache[Dict[str, Any]] = TTLCache(
+    namespace="interfaces",
+    dumps=json.dumps,
+    loads=json.loads,
+    ttl=MOONSTREAM_INTERFACES_CACHE_TTL_SECONDS,
+    redis_client=redis_client,
+)
+
+
+def invalidate_user_subscriptions(user_id: Any) -> None:
+    """
+    Drops cached subscriptions of the user, should be called after subscriptions change.
+    """
+    subscriptions_cache.delete(str(user_id))
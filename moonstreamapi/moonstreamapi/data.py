@@ -320,6 +320,19 @@ class PreapprovedQuery(BaseModel):
 
 class QueryPresignUrl(BaseModel):
     url: str
+    # Result at the URL is up to date and query was not executed again
+    up_to_date: bool = False
+    # Job generating result, its status is available at /queries/jobs/{job_id}
+    job_id: Optional[str] = None
+
+
+class QueryJobStatusResponse(BaseModel):
+    job_id: str
+    status: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
 
 
 class QueryInfoResponse(BaseModel):
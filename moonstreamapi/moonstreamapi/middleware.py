@@ -6,6 +6,7 @@ from bugout.exceptions import BugoutResponseException
 from fastapi import HTTPException, Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from .cache import token_key, users_cache
 from .reporter import reporter
 from .settings import MOONSTREAM_APPLICATION_ID
 from .settings import bugout_client as bc
@@ -64,7 +65,13 @@ class BroodAuthMiddleware(BaseHTTPMiddleware):
         user_token: str = user_token_list[-1]
 
         try:
-            user: BugoutUser = bc.get_user(user_token)
+            user_key = token_key(user_token)
+            cached_user = users_cache.get(user_key)
+            if cached_user is not None:
+                user: BugoutUser = cached_user
+            else:
+                user = bc.get_user(user_token)
+                users_cache.set(user_key, user)
             if not user.verified:
                 logger.info(
                     f"Attempted journal access by unverified Brood account: {user.id}"
@@ -5,6 +5,7 @@ Available providers are exposed through the `event_providers` dictionary.
 
 Exposes all the standard event provider methods:
 - get_events
+- iter_events (streaming version of get_events, merges providers streams latest first)
 - latest_events
 - next_event
 - previous_event
@@ -22,11 +23,16 @@ return data to the caller. (Default: False)
 - sort_events - Set this to True to sort the events that come in from different providers. Set it to False
 if the order does not matter and you would rather emphasize speed. Only available for method which involve
 lists of events. (Default: True)
+
+Instead of database session these methods take session factory (e.g. sessionmaker bound to pooled engine),
+each provider gets its own session, because sessions can not be shared between threads.
 """
 
+import heapq
 import logging
-from concurrent.futures import Future, ThreadPoolExecutor
-from typing import Any, Dict, List, Optional, Tuple
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 from bugout.app import Bugout
 from bugout.data import BugoutResource
@@ -94,8 +100,77 @@ event_providers: Dict[str, Any] = {
 }
 
 
+def _call_provider(
+    session_factory: Callable[[], Session],
+    provider: Any,
+    method_name: str,
+    *args: Any,
+) -> Any:
+    """
+    Calls provider method with its own database session.
+    """
+    db_session = session_factory()
+    try:
+        return getattr(provider, method_name)(db_session, *args)
+    finally:
+        db_session.close()
+
+
+def _map_providers(
+    session_factory: Callable[[], Session],
+    method_name: str,
+    query: StreamQuery,
+    args: Tuple[Any, ...],
+    max_threads: Optional[int],
+    result_timeout: float,
+    raise_on_error: bool,
+) -> Dict[str, Any]:
+    """
+    Calls method of all queried providers in parallel and returns not None results by provider name.
+
+    result_timeout is shared by all providers, so it takes as long as the slowest provider.
+    """
+    # Filter our not queried event_types
+    event_providers_filtered = {
+        key: value
+        for (key, value) in event_providers.items()
+        if value.event_type in query.subscription_types
+    }
+
+    executor = ThreadPoolExecutor(
+        max_workers=max_threads, thread_name_prefix="event_providers_"
+    )
+    results: Dict[str, Any] = {}
+    try:
+        futures = {
+            provider_name: executor.submit(
+                _call_provider, session_factory, provider, method_name, *args
+            )
+            for provider_name, provider in event_providers_filtered.items()
+        }
+
+        deadline = time.monotonic() + result_timeout
+        for provider_name, future in futures.items():
+            try:
+                result = future.result(timeout=max(deadline - time.monotonic(), 0))
+                if result is not None:
+                    results[provider_name] = result
+            except Exception as e:
+                if not raise_on_error:
+                    logger.warn(
+                        f"Error receiving events from provider: {provider_name}:\n{repr(e)}"
+                    )
+                else:
+                    raise ReceivingEventsException(e)
+    finally:
+        # Do not wait for timed out providers
+        executor.shutdown(wait=False)
+
+    return results
+
+
 def get_events(
-    db_session: Session,
+    session_factory: Callable[[], Session],
     bugout_client: Bugout,
     data_journal_id: str,
     data_access_token: str,
@@ -111,42 +186,22 @@ def get_events(
     Gets events from all providers and sends them back with the stream boundary.
     """
 
-    futures: Dict[str, Future] = {}
-    with ThreadPoolExecutor(
-        max_workers=max_threads, thread_name_prefix="event_providers_"
-    ) as executor:
-        # Filter our not queried event_types
-        event_providers_filtered = {
-            key: value
-            for (key, value) in event_providers.items()
-            if value.event_type in query.subscription_types
-        }
-
-        for provider_name, provider in event_providers_filtered.items():
-            futures[provider_name] = executor.submit(
-                provider.get_events,
-                db_session,
-                bugout_client,
-                data_journal_id,
-                data_access_token,
-                stream_boundary,
-                query,
-                user_subscriptions,
-            )
-
-    results: Dict[str, Tuple[data.StreamBoundary, List[data.Event]]] = {}
-    for provider_name, future in futures.items():
-        try:
-            result = future.result(timeout=result_timeout)
-            if result is not None:
-                results[provider_name] = result
-        except Exception as e:
-            if not raise_on_error:
-                logger.warn(
-                    f"Error receiving events from provider: {provider_name}:\n{repr(e)}"
-                )
-            else:
-                raise ReceivingEventsException(e)
+    results: Dict[str, Tuple[data.StreamBoundary, List[data.Event]]] = _map_providers(
+        session_factory,
+        "get_events",
+        query,
+        (
+            bugout_client,
+            data_journal_id,
+            data_access_token,
+            stream_boundary,
+            query,
+            user_subscriptions,
+        ),
+        max_threads,
+        result_timeout,
+        raise_on_error,
+    )
 
     stream_boundary = [boundary for boundary, _ in results.values()][0]
     events = [event for _, event_list in results.values() for event in event_list]
@@ -161,8 +216,91 @@ def get_events(
     return (stream_boundary, events)
 
 
+def _merge_events(
+    streams: List[Iterator[data.Event]], db_sessions: List[Session]
+) -> Iterator[data.Event]:
+    try:
+        yield from heapq.merge(
+            *streams, key=lambda event: event.event_timestamp, reverse=True
+        )
+    finally:
+        for db_session in db_sessions:
+            db_session.close()
+
+
+def iter_events(
+    session_factory: Callable[[], Session],
+    bugout_client: Bugout,
+    data_journal_id: str,
+    data_access_token: str,
+    stream_boundary: data.StreamBoundary,
+    query: StreamQuery,
+    user_subscriptions: Dict[str, List[BugoutResource]],
+    page_size: int = 1000,
+    raise_on_error: bool = False,
+) -> Iterator[data.Event]:
+    """
+    Streams events from all providers, latest first.
+
+    Providers with iter_events method are read page by page and k-way merged with a heap, events of
+    other providers are loaded with get_events. Database sessions of providers stay open until the
+    returned iterator is exhausted or closed.
+    """
+    # Filter our not queried event_types
+    event_providers_filtered = {
+        key: value
+        for (key, value) in event_providers.items()
+        if value.event_type in query.subscription_types
+    }
+
+    streams: List[Iterator[data.Event]] = []
+    db_sessions: List[Session] = []
+    try:
+        for provider_name, provider in event_providers_filtered.items():
+            db_session = session_factory()
+            db_sessions.append(db_session)
+            args = (
+                db_session,
+                bugout_client,
+                data_journal_id,
+                data_access_token,
+                stream_boundary.copy(),
+                query,
+                user_subscriptions,
+            )
+            try:
+                if hasattr(provider, "iter_events"):
+                    events = provider.iter_events(*args, page_size=page_size)
+                else:
+                    result = provider.get_events(*args)
+                    events = None
+                    if result is not None:
+                        events = iter(
+                            sorted(
+                                result[1],
+                                key=lambda event: event.event_timestamp,
+                                reverse=True,
+                            )
+                        )
+            except Exception as e:
+                if not raise_on_error:
+                    logger.warn(
+                        f"Error receiving events from provider: {provider_name}:\n{repr(e)}"
+                    )
+                    continue
+                raise ReceivingEventsException(e)
+            if events is not None:
+                streams.append(events)
+    except Exception:
+        for db_session in db_sessions:
+            db_session.close()
+        raise
+
+    return _merge_events(streams, db_sessions)
+
+
 def latest_events(
-    db_session: Session,
+    session_factory: Callable[[], Session],
     bugout_client: Bugout,
     data_journal_id: str,
     data_access_token: str,
@@ -182,42 +320,22 @@ def latest_events(
     events per individual event provider!
     """
 
-    futures: Dict[str, Future] = {}
-    with ThreadPoolExecutor(
-        max_workers=max_threads, thread_name_prefix="event_providers_"
-    ) as executor:
-        # Filter our not queried event_types
-        event_providers_filtered = {
-            key: value
-            for (key, value) in event_providers.items()
-            if value.event_type in query.subscription_types
-        }
-
-        for provider_name, provider in event_providers_filtered.items():
-            futures[provider_name] = executor.submit(
-                provider.latest_events,
-                db_session,
-                bugout_client,
-                data_journal_id,
-                data_access_token,
-                query,
-                num_events,
-                user_subscriptions,
-            )
-
-    results: Dict[str, List[data.Event]] = {}
-    for provider_name, future in futures.items():
-        try:
-            result = future.result(timeout=result_timeout)
-            if result is not None:
-                results[provider_name] = result
-        except Exception as e:
-            if not raise_on_error:
-                logger.warn(
-                    f"Error receiving events from provider: {provider_name}:\n{repr(e)}"
-                )
-            else:
-                raise ReceivingEventsException(e)
+    results: Dict[str, List[data.Event]] = _map_providers(
+        session_factory,
+        "latest_events",
+        query,
+        (
+            bugout_client,
+            data_journal_id,
+            data_access_token,
+            query,
+            num_events,
+            user_subscriptions,
+        ),
+        max_threads,
+        result_timeout,
+        raise_on_error,
+    )
     events = [event for event_list in results.values() for event in event_list]
     if sort_events:
         events.sort(key=lambda event: event.event_timestamp, reverse=True)
@@ -226,7 +344,7 @@ def latest_events(
 
 
 def next_event(
-    db_session: Session,
+    session_factory: Callable[[], Session],
     bugout_client: Bugout,
     data_journal_id: str,
     data_access_token: str,
@@ -241,42 +359,22 @@ def next_event(
     Get earliest event after stream boundary across all available providers.
     """
 
-    futures: Dict[str, Future] = {}
-    with ThreadPoolExecutor(
-        max_workers=max_threads, thread_name_prefix="event_providers_"
-    ) as executor:
-        # Filter our not queried event_types
-        event_providers_filtered = {
-            key: value
-            for (key, value) in event_providers.items()
-            if value.event_type in query.subscription_types
-        }
-
-        for provider_name, provider in event_providers_filtered.items():
-            futures[provider_name] = executor.submit(
-                provider.next_event,
-                db_session,
-                bugout_client,
-                data_journal_id,
-                data_access_token,
-                stream_boundary,
-                query,
-                user_subscriptions,
-            )
-
-    results: Dict[str, data.Event] = {}
-    for provider_name, future in futures.items():
-        try:
-            result = future.result(timeout=result_timeout)
-            if result is not None:
-                results[provider_name] = result
-        except Exception as e:
-            if not raise_on_error:
-                logger.warn(
-                    f"Error receiving events from provider: {provider_name}:\n{repr(e)}"
-                )
-            else:
-                raise ReceivingEventsException(e)
+    results: Dict[str, data.Event] = _map_providers(
+        session_factory,
+        "next_event",
+        query,
+        (
+            bugout_client,
+            data_journal_id,
+            data_access_token,
+            stream_boundary,
+            query,
+            user_subscriptions,
+        ),
+        max_threads,
+        result_timeout,
+        raise_on_error,
+    )
 
     event: Optional[data.Event] = None
     for candidate in results.values():
@@ -289,7 +387,7 @@ def next_event(
 
 
 def previous_event(
-    db_session: Session,
+    session_factory: Callable[[], Session],
     bugout_client: Bugout,
     data_journal_id: str,
     data_access_token: str,
@@ -304,42 +402,22 @@ def previous_event(
     Get latest event before stream boundary across all available providers.
     """
 
-    futures: Dict[str, Future] = {}
-    with ThreadPoolExecutor(
-        max_workers=max_threads, thread_name_prefix="event_providers_"
-    ) as executor:
-        # Filter our not queried event_types
-        event_providers_filtered = {
-            key: value
-            for (key, value) in event_providers.items()
-            if value.event_type in query.subscription_types
-        }
-
-        for provider_name, provider in event_providers_filtered.items():
-            futures[provider_name] = executor.submit(
-                provider.previous_event,
-                db_session,
-                bugout_client,
-                data_journal_id,
-                data_access_token,
-                stream_boundary,
-                query,
-                user_subscriptions,
-            )
-
-    results: Dict[str, data.Event] = {}
-    for provider_name, future in futures.items():
-        try:
-            result = future.result(timeout=result_timeout)
-            if result is not None:
-                results[provider_name] = result
-        except Exception as e:
-            if not raise_on_error:
-                logger.warn(
-                    f"Error receiving events from provider: {provider_name}:\n{repr(e)}"
-                )
-            else:
-                raise ReceivingEventsException(e)
+    results: Dict[str, data.Event] = _map_providers(
+        session_factory,
+        "previous_event",
+        query,
+        (
+            bugout_client,
+            data_journal_id,
+            data_access_token,
+            stream_boundary,
+            query,
+            user_subscriptions,
+        ),
+        max_threads,
+        result_timeout,
+        raise_on_error,
+    )
 
     event: Optional[data.Event] = None
     for candidate in results.values():
@@ -1,11 +1,11 @@
 import logging
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple, cast
+from typing import Any, Dict, Iterator, List, Optional, Tuple, cast
 
 from bugout.app import Bugout
 from bugout.data import BugoutResource
 from moonstreamdb.blockchain import AvailableBlockchainType, get_label_model
-from sqlalchemy import and_, or_, text
+from sqlalchemy import and_, func, or_, text, tuple_
 from sqlalchemy.orm import Query, Session, query_expression
 from sqlalchemy.sql.expression import label
 
@@ -291,6 +291,75 @@ class MoonwormProvider:
 
         return stream_boundary, events
 
+    def iter_events(
+        self,
+        db_session: Session,
+        bugout_client: Bugout,
+        data_journal_id: str,
+        data_access_token: str,
+        stream_boundary: data.StreamBoundary,
+        query: StreamQuery,
+        user_subscriptions: Dict[str, List[BugoutResource]],
+        page_size: int = 1000,
+    ) -> Optional[Iterator[data.Event]]:
+        """
+        Streams blockchain events for the given addresses in the time period represented
+        by stream_boundary, latest first.
+
+        Events are read in pages with keyset pagination on (block_timestamp, log_index), so
+        every page is a short query and only one page is kept in memory.
+
+        If the query does not require any data from this provider, returns None.
+        """
+        assert page_size > 0, f"page_size ({page_size}) should be positive."
+
+        stream_boundary = self.stream_boundary_validator(stream_boundary)
+
+        parsed_filters = self.parse_filters(query, user_subscriptions)
+        if parsed_filters is None:
+            return None
+
+        return self._iter_events_pages(
+            db_session, stream_boundary, parsed_filters, page_size
+        )
+
+    def _iter_events_pages(
+        self,
+        db_session: Session,
+        stream_boundary: data.StreamBoundary,
+        parsed_filters: Filters,
+        page_size: int,
+    ) -> Iterator[data.Event]:
+        Labels = get_label_model(self.blockchain)
+
+        # Transaction call labels have no log_index, label id makes the key unique
+        keyset = (
+            Labels.block_timestamp,
+            func.coalesce(Labels.log_index, -1),
+            Labels.id,
+        )
+
+        last_key: Optional[Tuple[Any, ...]] = None
+        while True:
+            page_query = self.generate_events_query(
+                db_session, stream_boundary, parsed_filters
+            ).add_columns(*keyset[1:])
+            if last_key is not None:
+                page_query = page_query.filter(tuple_(*keyset) < tuple_(*last_key))
+            rows = (
+                page_query.order_by(*[column.desc() for column in keyset])
+                .limit(page_size)
+                .all()
+            )
+
+            for row in rows:
+                yield self.events(tuple(row[:-2]))
+
+            if len(rows) < page_size:
+                return
+            last_row = rows[-1]
+            last_key = (last_row.block_timestamp, last_row[-2], last_row[-1])
+
     def latest_events(
         self,
         db_session: Session,
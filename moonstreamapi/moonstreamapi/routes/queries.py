@@ -16,6 +16,7 @@ from bugout.data import (
 )
 from bugout.exceptions import BugoutResponseException
 from fastapi import APIRouter, Body, Path, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from moonstreamtypes.blockchain import AvailableBlockchainType
 from sqlalchemy import text
 
@@ -49,6 +50,18 @@ router = APIRouter(
     prefix="/queries",
 )
 
+MAX_QUERY_JOB_WAIT_SECONDS = 60
+
+# Query result file types chosen with ext:<file_type> tag, json by default
+QUERY_FILE_TYPES = ["csv", "parquet", "arrow"]
+
+
+def query_file_type(tags: List[str]) -> str:
+    for file_type in QUERY_FILE_TYPES:
+        if f"ext:{file_type}" in tags:
+            return file_type
+    return "json"
+
 
 @router.get("/list", tags=["queries"])
 async def get_list_of_queries_handler(request: Request) -> List[Dict[str, Any]]:
@@ -227,6 +240,41 @@ def get_suggested_queries(
     )
 
 
+@router.get(
+    "/jobs/{job_id}", tags=["queries"], response_model=data.QueryJobStatusResponse
+)
+async def get_query_job_status_handler(
+    job_id: UUID = Path(..., description="Job id from update_data response"),
+    wait: float = Query(
+        0,
+        ge=0,
+        le=MAX_QUERY_JOB_WAIT_SECONDS,
+        description="Seconds to wait until job is finished",
+    ),
+) -> data.QueryJobStatusResponse:
+    """
+    Status of query data update job, with wait responds when job is finished.
+    """
+    try:
+        response = await run_in_threadpool(
+            requests.get,
+            f"{MOONSTREAM_CRAWLERS_SERVER_URL}:{MOONSTREAM_CRAWLERS_SERVER_PORT}/jobs/{job_id}/status",
+            params={"wait": wait},
+            timeout=wait + MOONSTREAM_INTERNAL_REQUEST_TIMEOUT_SECONDS,
+        )
+    except Exception as e:
+        logger.error(f"Error interaction with crawlers: {str(e)}")
+        raise MoonstreamHTTPException(status_code=500, internal_error=e)
+
+    if response.status_code != 200:
+        raise MoonstreamHTTPException(
+            status_code=response.status_code,
+            detail=response.text,
+        )
+
+    return data.QueryJobStatusResponse(**response.json())
+
+
 @router.get("/{query_name}/query", tags=["queries"])
 async def get_query_handler(
     request: Request, query_name: str = Path(..., description="Query name")
@@ -476,10 +524,7 @@ async def update_query_data_handler(
         tags = entries_results[0].tags
 
     if content:
-        file_type = "json"
-
-        if "ext:csv" in tags:
-            file_type = "csv"
+        file_type = query_file_type(tags)
 
         json_payload["query"] = content
         json_payload["params"] = request_update.params
@@ -583,10 +628,7 @@ async def get_access_link_handler(
     try:
         passed_params = dict(request_update.params)
 
-        file_type = "json"
-
-        if "ext:csv" in tags:
-            file_type = "csv"
+        file_type = query_file_type(tags)
 
         params_hash = query_parameter_hash(passed_params)
 
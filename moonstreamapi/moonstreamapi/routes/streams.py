@@ -3,19 +3,22 @@ The Moonstream subscriptions HTTP API
 """
 
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Union
 
 from bugout.data import BugoutResource
-from fastapi import APIRouter, Depends, Query, Request
+from fastapi import APIRouter, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from moonstreamdb import db
-from sqlalchemy.orm import Session
 
 from .. import data, stream_queries
+from ..cache import subscriptions_cache
 from ..middleware import MoonstreamHTTPException
 from ..providers import (
     ReceivingEventsException,
     event_providers,
     get_events,
+    iter_events,
     latest_events,
     next_event,
     previous_event,
@@ -34,11 +37,22 @@ router = APIRouter(
     prefix="/streams",
 )
 
+NDJSON_CHUNK_SIZE = 100
 
-def get_user_subscriptions(token: str) -> Dict[str, List[BugoutResource]]:
+
+def get_user_subscriptions(
+    token: str, user_id: Optional[Any] = None
+) -> Dict[str, List[BugoutResource]]:
     """
     Returns the given user's subscriptions grouped by subscription type.
+
+    Result is cached by user_id if it is passed.
     """
+    if user_id is not None:
+        cached_subscriptions = subscriptions_cache.get(str(user_id))
+        if cached_subscriptions is not None:
+            return cached_subscriptions
+
     response = bc.list_resources(
         token=token,
         params={
@@ -57,9 +71,28 @@ def get_user_subscriptions(token: str) -> Dict[str, List[BugoutResource]]:
             user_subscriptions[subscription_type] = []
         user_subscriptions[subscription_type].append(subscription)
 
+    if user_id is not None:
+        subscriptions_cache.set(str(user_id), user_subscriptions)
+
     return user_subscriptions
 
 
+def events_ndjson_chunks(
+    events: Iterator[data.Event], chunk_size: int = NDJSON_CHUNK_SIZE
+) -> Iterator[str]:
+    """
+    Serializes events to newline delimited JSON, chunk_size events per chunk.
+    """
+    lines: List[str] = []
+    for event in events:
+        lines.append(event.json())
+        if len(lines) >= chunk_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
 @router.get("/info", tags=["streams"])
 async def info_handler() -> Dict[str, Any]:
     info = {
@@ -81,16 +114,20 @@ async def stream_handler(
     end_time: Optional[int] = Query(None),
     include_start: bool = Query(False),
     include_end: bool = Query(False),
-    db_session: Session = Depends(db.yield_db_session),
-) -> data.GetEventsResponse:
+    stream: bool = Query(False),
+) -> Union[data.GetEventsResponse, StreamingResponse]:
     """
     Gets all events in the client's stream subject to the constraints defined by the following query
     parameters:
     - q: Query string which filters over subscriptions
     - start_time, end_time, include_start, include_end: These define the window of time from which
     we want to retrieve events.
+    - stream: Stream events latest first as newline delimited JSON (application/x-ndjson) instead
+    of loading all of them in memory.
 
     All times must be given as seconds since the Unix epoch.
+
+    Providers are queried in parallel threads with their own database sessions, off the event loop.
     """
 
     stream_boundary = data.StreamBoundary(
@@ -100,16 +137,43 @@ async def stream_handler(
         include_end=include_end,
     )
 
-    user_subscriptions = get_user_subscriptions(request.state.token)
+    user_subscriptions = await run_in_threadpool(
+        get_user_subscriptions, request.state.token, request.state.user.id
+    )
     query = stream_queries.StreamQuery(
         subscription_types=[subtype for subtype in event_providers], subscriptions=[]
     )
     if q.strip() != "":
         query = stream_queries.parse_query_string(q)
 
+    if stream:
+        try:
+            events_iterator = await run_in_threadpool(
+                iter_events,
+                db.SessionLocal,
+                bc,
+                MOONSTREAM_DATA_JOURNAL_ID,
+                MOONSTREAM_ADMIN_ACCESS_TOKEN,
+                stream_boundary,
+                query,
+                user_subscriptions,
+                raise_on_error=True,
+            )
+        except ReceivingEventsException as e:
+            logger.error("Error receiving events from provider")
+            raise MoonstreamHTTPException(status_code=500, internal_error=e)
+        except Exception as e:
+            logger.error("Unable to get events")
+            raise MoonstreamHTTPException(status_code=500, internal_error=e)
+
+        return StreamingResponse(
+            events_ndjson_chunks(events_iterator), media_type="application/x-ndjson"
+        )
+
     try:
-        _, events = get_events(
-            db_session,
+        _, events = await run_in_threadpool(
+            get_events,
+            db.SessionLocal,
             bc,
             MOONSTREAM_DATA_JOURNAL_ID,
             MOONSTREAM_ADMIN_ACCESS_TOKEN,
@@ -131,9 +195,7 @@ async def stream_handler(
 
 
 @router.get("/latest", tags=["streams"])
-async def latest_events_handler(
-    request: Request, q=Query(""), db_session: Session = Depends(db.yield_db_session)
-) -> List[data.Event]:
+async def latest_events_handler(request: Request, q=Query("")) -> List[data.Event]:
     """
     Gets the latest events in the client's stream subject to the constraints defined by the following query
     parameters:
@@ -142,7 +204,9 @@ async def latest_events_handler(
     All times must be given as seconds since the Unix epoch.
     """
 
-    user_subscriptions = get_user_subscriptions(request.state.token)
+    user_subscriptions = await run_in_threadpool(
+        get_user_subscriptions, request.state.token, request.state.user.id
+    )
     query = stream_queries.StreamQuery(
         subscription_types=[subtype for subtype in event_providers], subscriptions=[]
     )
@@ -150,8 +214,9 @@ async def latest_events_handler(
         query = stream_queries.parse_query_string(q)
 
     try:
-        events = latest_events(
-            db_session,
+        events = await run_in_threadpool(
+            latest_events,
+            db.SessionLocal,
             bc,
             MOONSTREAM_DATA_JOURNAL_ID,
             MOONSTREAM_ADMIN_ACCESS_TOKEN,
@@ -180,7 +245,6 @@ async def next_event_handler(
     end_time: Optional[int] = Query(None),
     include_start: bool = Query(False),
     include_end: bool = Query(False),
-    db_session: Session = Depends(db.yield_db_session),
 ) -> Optional[data.Event]:
     """
     Gets the next event in the client's stream subject to the constraints defined by the following query
@@ -198,7 +262,9 @@ async def next_event_handler(
         include_end=include_end,
     )
 
-    user_subscriptions = get_user_subscriptions(request.state.token)
+    user_subscriptions = await run_in_threadpool(
+        get_user_subscriptions, request.state.token, request.state.user.id
+    )
     query = stream_queries.StreamQuery(
         subscription_types=[subtype for subtype in event_providers], subscriptions=[]
     )
@@ -206,8 +272,9 @@ async def next_event_handler(
         query = stream_queries.parse_query_string(q)
 
     try:
-        event = next_event(
-            db_session,
+        event = await run_in_threadpool(
+            next_event,
+            db.SessionLocal,
             bc,
             MOONSTREAM_DATA_JOURNAL_ID,
             MOONSTREAM_ADMIN_ACCESS_TOKEN,
@@ -235,7 +302,6 @@ async def previous_event_handler(
     end_time: Optional[int] = Query(None),
     include_start: bool = Query(False),
     include_end: bool = Query(False),
-    db_session: Session = Depends(db.yield_db_session),
 ) -> Optional[data.Event]:
     """
     Gets the previous event in the client's stream subject to the constraints defined by the following query
@@ -253,7 +319,9 @@ async def previous_event_handler(
         include_end=include_end,
     )
 
-    user_subscriptions = get_user_subscriptions(request.state.token)
+    user_subscriptions = await run_in_threadpool(
+        get_user_subscriptions, request.state.token, request.state.user.id
+    )
     query = stream_queries.StreamQuery(
         subscription_types=[subtype for subtype in event_providers], subscriptions=[]
     )
@@ -261,8 +329,9 @@ async def previous_event_handler(
         query = stream_queries.parse_query_string(q)
 
     try:
-        event = previous_event(
-            db_session,
+        event = await run_in_threadpool(
+            previous_event,
+            db.SessionLocal,
             bc,
             MOONSTREAM_DATA_JOURNAL_ID,
             MOONSTREAM_ADMIN_ACCESS_TOKEN,
@@ -29,6 +29,7 @@ from ..actions import (
     delete_seer_subscription,
 )
 from ..admin import subscription_types
+from ..cache import invalidate_user_subscriptions
 from ..middleware import MoonstreamHTTPException
 from ..reporter import reporter
 from ..settings import (
@@ -222,6 +223,7 @@ async def add_subscription_handler(
             internal_error=e,
             detail="Currently unable to get journal id",
         )
+
     entity_required_fields = (
         entity.required_fields if entity.required_fields is not None else []
     )
@@ -250,6 +252,8 @@ async def add_subscription_handler(
             subscription_type=subscription_type_id,
         )
 
+    invalidate_user_subscriptions(user.id)
+
     return data.SubscriptionResourceData(
         id=str(entity.id),
         user_id=str(user.id),
@@ -340,6 +344,8 @@ async def delete_subscription_handler(
         subscription_id=subscription_id,
     )
 
+    invalidate_user_subscriptions(user.id)
+
     return data.SubscriptionResourceData(
         id=str(deleted_entity.id),
         user_id=str(user.id),
@@ -632,6 +638,8 @@ async def update_subscriptions_handler(
             subscription_id=subscription_id,
         )
 
+    invalidate_user_subscriptions(user.id)
+
     subscription_required_fields = (
         subscription.required_fields if subscription.required_fields is not None else {}
     )
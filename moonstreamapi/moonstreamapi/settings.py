@@ -435,6 +435,47 @@ except:
         f"Could not parse MOONSTREAM_INTERNAL_REQUEST_TIMEOUT_SECONDS as int: {MOONSTREAM_INTERNAL_REQUEST_TIMEOUT_SECONDS_RAW}"
     )
 
+# Cache of Brood users and user subscriptions
+MOONSTREAM_AUTH_CACHE_TTL_SECONDS_RAW = os.environ.get(
+    "MOONSTREAM_AUTH_CACHE_TTL_SECONDS"
+)
+MOONSTREAM_AUTH_CACHE_TTL_SECONDS = 60
+try:
+    if MOONSTREAM_AUTH_CACHE_TTL_SECONDS_RAW is not None:
+        MOONSTREAM_AUTH_CACHE_TTL_SECONDS = int(MOONSTREAM_AUTH_CACHE_TTL_SECONDS_RAW)
+except:
+    raise Exception(
+        f"Could not parse MOONSTREAM_AUTH_CACHE_TTL_SECONDS as int: {MOONSTREAM_AUTH_CACHE_TTL_SECONDS_RAW}"
+    )
+
+MOONSTREAM_AUTH_CACHE_MAX_SIZE_RAW = os.environ.get("MOONSTREAM_AUTH_CACHE_MAX_SIZE")
+MOONSTREAM_AUTH_CACHE_MAX_SIZE = 10000
+try:
+    if MOONSTREAM_AUTH_CACHE_MAX_SIZE_RAW is not None:
+        MOONSTREAM_AUTH_CACHE_MAX_SIZE = int(MOONSTREAM_AUTH_CACHE_MAX_SIZE_RAW)
+except:
+    raise Exception(
+        f"Could not parse MOONSTREAM_AUTH_CACHE_MAX_SIZE as int: {MOONSTREAM_AUTH_CACHE_MAX_SIZE_RAW}"
+    )
+
+MOONSTREAM_INTERFACES_CACHE_TTL_SECONDS_RAW = os.environ.get(
+    "MOONSTREAM_INTERFACES_CACHE_TTL_SECONDS"
+)
+MOONSTREAM_INTERFACES_CACHE_TTL_SECONDS = 3600
+try:
+    if MOONSTREAM_INTERFACES_CACHE_TTL_SECONDS_RAW is not None:
+        MOONSTREAM_INTERFACES_CACHE_TTL_SECONDS = int(
+            MOONSTREAM_INTERFACES_CACHE_TTL_SECONDS_RAW
+        )
+except:
+    raise Exception(
+        f"Could not parse MOONSTREAM_INTERFACES_CACHE_TTL_SECONDS as int: {MOONSTREAM_INTERFACES_CACHE_TTL_SECONDS_RAW}"
+    )
+
+# Optional, caches are shared between workers through Redis if set
+MOONSTREAM_REDIS_URL = os.environ.get("MOONSTREAM_REDIS_URL")
+MOONSTREAM_REDIS_PASSWORD = os.environ.get("MOONSTREAM_REDIS_PASSWORD")
+
 MOONSTREAM_PUBLIC_QUERIES_DATA_ACCESS_TOKEN = os.environ.get(
     "MOONSTREAM_PUBLIC_QUERIES_DATA_ACCESS_TOKEN", ""
 )
@@ -1,10 +1,14 @@
 import logging
-from typing import Any, Callable, Dict, Optional, Union
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple, Union
 from uuid import UUID
 
+import requests
 from eth_abi import decode_single, encode_single
 from eth_utils import function_signature_to_4byte_selector
 from moonstreamdb.blockchain import AvailableBlockchainType
+from requests.adapters import HTTPAdapter
 from web3 import Web3
 from web3._utils.abi import normalize_event_input_types
 from web3.contract import ContractFunction
@@ -56,11 +60,62 @@ def yield_web3_provider() -> Web3:
 
 
 WEB3_CLIENT_REQUEST_TIMEOUT_SECONDS = 10
+# Max number of clients kept in pool, clients are created per credentials
+WEB3_CLIENTS_POOL_MAX_SIZE = 256
+WEB3_HTTP_POOL_MAXSIZE = 32
 
+WEB3_PROVIDER_URIS: Dict[AvailableBlockchainType, str] = {
+    AvailableBlockchainType.ETHEREUM: MOONSTREAM_ETHEREUM_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.SEPOLIA: MOONSTREAM_SEPOLIA_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.POLYGON: MOONSTREAM_POLYGON_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.MUMBAI: MOONSTREAM_MUMBAI_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.AMOY: MOONSTREAM_AMOY_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.XDAI: MOONSTREAM_XDAI_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.WYRM: MOONSTREAM_WYRM_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.ZKSYNC_ERA_TESTNET: MOONSTREAM_ZKSYNC_ERA_TESTNET_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.ZKSYNC_ERA: MOONSTREAM_ZKSYNC_ERA_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.ZKSYNC_ERA_SEPOLIA: MOONSTREAM_ZKSYNC_ERA_SEPOLIA_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.ARBITRUM_ONE: MOONSTREAM_ARBITRUM_ONE_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.ARBITRUM_NOVA: MOONSTREAM_ARBITRUM_NOVA_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.ARBITRUM_SEPOLIA: MOONSTREAM_ARBITRUM_SEPOLIA_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.XAI: MOONSTREAM_XAI_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.XAI_SEPOLIA: MOONSTREAM_XAI_SEPOLIA_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.AVALANCHE: MOONSTREAM_AVALANCHE_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.AVALANCHE_FUJI: MOONSTREAM_AVALANCHE_FUJI_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.BLAST: MOONSTREAM_BLAST_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.BLAST_SEPOLIA: MOONSTREAM_BLAST_SEPOLIA_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.PROOFOFPLAY_APEX: MOONSTREAM_PROOFOFPLAY_APEX_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.MANTLE: MOONSTREAM_MANTLE_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.MANTLE_SEPOLIA: MOONSTREAM_MANTLE_SEPOLIA_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.IMX_ZKEVM: MOONSTREAM_IMX_ZKEVM_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.IMX_ZKEVM_SEPOLIA: MOONSTREAM_IMX_ZKEVM_SEPOLIA_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.GAME7_TESTNET: MOONSTREAM_GAME7_TESTNET_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.B3: MOONSTREAM_B3_WEB3_PROVIDER_URI,
+    AvailableBlockchainType.B3_SEPOLIA: MOONSTREAM_B3_SEPOLIA_WEB3_PROVIDER_URI,
+}
 
-def connect(
+Web3ClientKey = Tuple[AvailableBlockchainType, str, Optional[str], Optional[str]]
+
+# Keep-alive HTTP sessions, one per provider URI and shared by all clients of the URI
+_http_sessions: Dict[str, requests.Session] = {}
+_web3_clients: "OrderedDict[Web3ClientKey, Web3]" = OrderedDict()
+_web3_clients_lock = threading.Lock()
+
+
+def _get_http_session(web3_uri: str) -> requests.Session:
+    session = _http_sessions.get(web3_uri)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=WEB3_HTTP_POOL_MAXSIZE)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _http_sessions[web3_uri] = session
+    return session
+
+
+def _create_web3_client(
     blockchain_type: AvailableBlockchainType,
-    web3_uri: Optional[str] = None,
+    web3_uri: str,
     access_id: Optional[UUID] = None,
     user_token: Optional[UUID] = None,
 ) -> Web3:
@@ -78,67 +133,15 @@ def connect(
         elif user_token is not None:
             request_kwargs["headers"]["Authorization"] = f"Bearer {user_token}"
 
-    if web3_uri is None:
-        if blockchain_type == AvailableBlockchainType.ETHEREUM:
-            web3_uri = MOONSTREAM_ETHEREUM_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.SEPOLIA:
-            web3_uri = MOONSTREAM_SEPOLIA_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.POLYGON:
-            web3_uri = MOONSTREAM_POLYGON_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.MUMBAI:
-            web3_uri = MOONSTREAM_MUMBAI_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.AMOY:
-            web3_uri = MOONSTREAM_AMOY_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.XDAI:
-            web3_uri = MOONSTREAM_XDAI_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.WYRM:
-            web3_uri = MOONSTREAM_WYRM_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.ZKSYNC_ERA_TESTNET:
-            web3_uri = MOONSTREAM_ZKSYNC_ERA_TESTNET_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.ZKSYNC_ERA:
-            web3_uri = MOONSTREAM_ZKSYNC_ERA_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.ZKSYNC_ERA_SEPOLIA:
-            web3_uri = MOONSTREAM_ZKSYNC_ERA_SEPOLIA_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.ARBITRUM_ONE:
-            web3_uri = MOONSTREAM_ARBITRUM_ONE_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.ARBITRUM_NOVA:
-            web3_uri = MOONSTREAM_ARBITRUM_NOVA_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.ARBITRUM_SEPOLIA:
-            web3_uri = MOONSTREAM_ARBITRUM_SEPOLIA_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.XAI:
-            web3_uri = MOONSTREAM_XAI_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.XAI_SEPOLIA:
-            web3_uri = MOONSTREAM_XAI_SEPOLIA_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.AVALANCHE:
-            web3_uri = MOONSTREAM_AVALANCHE_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.AVALANCHE_FUJI:
-            web3_uri = MOONSTREAM_AVALANCHE_FUJI_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.BLAST:
-            web3_uri = MOONSTREAM_BLAST_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.BLAST_SEPOLIA:
-            web3_uri = MOONSTREAM_BLAST_SEPOLIA_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.PROOFOFPLAY_APEX:
-            web3_uri = MOONSTREAM_PROOFOFPLAY_APEX_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.MANTLE:
-            web3_uri = MOONSTREAM_MANTLE_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.MANTLE_SEPOLIA:
-            web3_uri = MOONSTREAM_MANTLE_SEPOLIA_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.IMX_ZKEVM:
-            web3_uri = MOONSTREAM_IMX_ZKEVM_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.IMX_ZKEVM_SEPOLIA:
-            web3_uri = MOONSTREAM_IMX_ZKEVM_SEPOLIA_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.GAME7_TESTNET:
-            web3_uri = MOONSTREAM_GAME7_TESTNET_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.B3:
-            web3_uri = MOONSTREAM_B3_WEB3_PROVIDER_URI
-        elif blockchain_type == AvailableBlockchainType.B3_SEPOLIA:
-            web3_uri = MOONSTREAM_B3_SEPOLIA_WEB3_PROVIDER_URI
-        else:
-            raise Exception("Wrong blockchain type provided for web3 URI")
-
     if web3_uri.startswith("http://") or web3_uri.startswith("https://"):
         request_kwargs["timeout"] = WEB3_CLIENT_REQUEST_TIMEOUT_SECONDS
-        web3_client = Web3(HTTPProvider(web3_uri, request_kwargs=request_kwargs))  # type: ignore
+        web3_client = Web3(
+            HTTPProvider(
+                web3_uri,
+                request_kwargs=request_kwargs,
+                session=_get_http_session(web3_uri),
+            )  # type: ignore
+        )
     else:
         web3_client = Web3(Web3.IPCProvider(web3_uri))
 
@@ -148,6 +151,43 @@ def connect(
     return web3_client
 
 
+def connect(
+    blockchain_type: AvailableBlockchainType,
+    web3_uri: Optional[str] = None,
+    access_id: Optional[UUID] = None,
+    user_token: Optional[UUID] = None,
+) -> Web3:
+    """
+    Returns Web3 client from the process wide pool, client is created on first use
+    of blockchain, URI and credentials.
+    """
+    if web3_uri is None:
+        web3_uri = WEB3_PROVIDER_URIS.get(blockchain_type)
+        if web3_uri is None:
+            raise Exception("Wrong blockchain type provided for web3 URI")
+
+    key: Web3ClientKey = (
+        blockchain_type,
+        web3_uri,
+        str(access_id) if access_id is not None else None,
+        str(user_token) if user_token is not None else None,
+    )
+    with _web3_clients_lock:
+        web3_client = _web3_clients.get(key)
+        if web3_client is not None:
+            _web3_clients.move_to_end(key)
+            return web3_client
+
+        web3_client = _create_web3_client(
+            blockchain_type, web3_uri, access_id=access_id, user_token=user_token
+        )
+        _web3_clients[key] = web3_client
+        while len(_web3_clients) > WEB3_CLIENTS_POOL_MAX_SIZE:
+            _web3_clients.popitem(last=False)
+
+    return web3_client
+
+
 def multicall(
     web3_client: Web3,
     blockchain_type: AvailableBlockchainType,
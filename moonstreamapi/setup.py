@@ -31,8 +31,9 @@ setup(
     extras_require={
         "dev": ["black", "isort", "mypy", "types-requests", "types-python-dateutil"],
         "distribute": ["build", "twine"],
+        "redis": ["redis"],
     },
-    package_data={"moonstreamapi": ["py.typed"]},
+    package_data={"moonstreamapi": ["py.typed", "selectors.jsonl"]},
     zip_safe=False,
     description="The Bugout blockchain inspector API.",
     long_description=long_description,
@@ -2436,3 +2436,30 @@ class OpenSeaCrawlingState(Base):  # type: ignore
     )
 
     total_count = Column(Integer, nullable=False)
+
+
+class CrawlerCheckpoint(Base):  # type: ignore
+    """
+    Last fully committed block of crawler instance for the given set of crawl jobs.
+
+    Updated in the same transaction as crawled labels, so crawler could resume
+    from it without scanning labels tables.
+    """
+
+    __tablename__ = "crawler_checkpoints"
+
+    blockchain = Column(VARCHAR(128), primary_key=True, nullable=False)
+    crawler_type = Column(VARCHAR(128), primary_key=True, nullable=False)
+    instance = Column(VARCHAR(256), primary_key=True, nullable=False, default="")
+    jobs_hash = Column(VARCHAR(32), primary_key=True, nullable=False)
+    last_block = Column(BigInteger, nullable=False)
+
+    created_at = Column(
+        DateTime(timezone=True), server_default=utcnow(), nullable=False
+    )
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=utcnow(),
+        onupdate=utcnow(),
+        nullable=False,
+    )
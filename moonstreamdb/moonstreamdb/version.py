@@ -2,4 +2,4 @@
 Moonstream database version.
 """
 
-MOONSTREAMDB_VERSION = "0.4.6"
+MOONSTREAMDB_VERSION = "0.4.7"